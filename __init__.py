@@ -1,12 +0,0 @@
-print("🔄 Initializing system...")
-
-
-
-
-from startup import on_startup
-on_startup()
-
-
-
-
-print("dsddsddsdsd")
\ No newline at end of file
@@ -1,54 +1,92 @@
 from dotenv import load_dotenv
 from flask import Flask, jsonify, request
-from flask_session import Session
 import os
-from flask_cors import CORS
-import logging
-from logging.handlers import RotatingFileHandler
 from time import strftime
 import traceback
-from startup import on_startup
-from routes import user_bp, game_bp, category_bp, leaderboard_bp
+from startup import StartupTimer, on_startup
 
 def create_app(config_name='default'):
+    # Extensions and blueprints are imported inside their step, so importing
+    # this module stays cheap and each step's time includes its imports.
+    # Nothing here connects to the database; pools and query files are
+    # created on first use.
+    timer = StartupTimer()
     load_dotenv()
     app = Flask(__name__)
 
     # Load configuration
-    from config import config
-    app.config.from_object(config[config_name])
+    with timer.step('config'):
+        from config import config
+        app.config.from_object(config[config_name])
+
+    # orjson-backed jsonify (stdlib fallback)
+    with timer.step('json'):
+        from utils.serialization import FastJSONProvider
+        app.json = FastJSONProvider(app)
+
+    # Connection pool settings and per-request ORM session cleanup
+    with timer.step('database'):
+        from db.database import init_db
+        init_db(app)
 
     # Enable CORS
-    CORS(app, supports_credentials=True, origins=app.config.get('CORS_ORIGINS', '*'))
+    with timer.step('cors'):
+        from flask_cors import CORS
+        CORS(app, supports_credentials=True, origins=app.config.get('CORS_ORIGINS', '*'))
 
     # Enable server-side sessions
-    Session(app)
+    with timer.step('sessions'):
+        from utils.sessions import init_sessions
+        init_sessions(app)
+
+    # Response cache
+    with timer.step('cache'):
+        from utils.cache import cache_manager
+        cache_manager.init_app(app)
+
+    # Password hashing pool
+    with timer.step('passwords'):
+        from security.passwords import init_password_hashing
+        init_password_hashing(app)
+
+    # Query timing and slow-query log
+    with timer.step('query_instrumentation'):
+        from db.instrumentation import init_query_instrumentation
+        init_query_instrumentation(app)
+
+    # Request timing and /metrics
+    with timer.step('metrics'):
+        from utils.monitoring import init_metrics
+        init_metrics(app)
+
+    # On-demand per-request cProfile (armed from /admin/profile/requests)
+    with timer.step('profiling'):
+        from utils.profiler import init_profiling
+        init_profiling(app)
+
+    # Optional request trace for the benchmark harness
+    with timer.step('trace_recording'):
+        from bench.trace import init_trace_recording
+        init_trace_recording(app)
 
     # Logging setup
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
-    file_handler = RotatingFileHandler('logs/app.log', maxBytes=10240, backupCount=10)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    ))
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(logging.INFO)
-    app.logger.info('Application startup')
+    with timer.step('logging'):
+        from utils.log_pipeline import init_logging
+        init_logging(app)
 
     # Register blueprints
-    app.register_blueprint(category_bp)
-    app.register_blueprint(user_bp)
-    app.register_blueprint(game_bp)
-    app.register_blueprint(leaderboard_bp)
-
-    # Any startup routines
-    on_startup()
-
-    # Request logging
-    @app.before_request
-    def before_request():
-        app.logger.info(f'Request: {request.method} {request.url} - {dict(request.headers)}')
+    with timer.step('blueprints'):
+        from routes import user_bp, game_bp, category_bp, leaderboard_bp, admin_bp
+        app.register_blueprint(category_bp)
+        app.register_blueprint(user_bp)
+        app.register_blueprint(game_bp)
+        app.register_blueprint(leaderboard_bp)
+        app.register_blueprint(admin_bp)
+
+    app.extensions['startup'] = timer
+    slowest = max(timer.steps, key=lambda step: step[1])
+    app.logger.info('Application startup in %.1f ms (slowest step: %s, %.1f ms)',
+                    timer.total * 1000, slowest[0], slowest[1] * 1000)
 
     # Security headers
     @app.after_request
@@ -121,4 +159,5 @@ def create_app(config_name='default'):
 
 if __name__ == '__main__':
     app = create_app(os.getenv('FLASK_ENV', 'default'))
+    on_startup()
     app.run(debug=app.config['DEBUG'], host='0.0.0.0', port=int(os.getenv('PORT', 5000)))
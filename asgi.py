@@ -0,0 +1,31 @@
+"""ASGI entry point: one process serves thousands of concurrent connections.
+
+    uvicorn asgi:app --workers 4
+
+The game state, answer submission, matchmaking wait and leaderboard
+endpoints (routes/async_routes.py) run as coroutines on an asyncpg pool;
+every other route is the unchanged Flask app, run on a thread pool. Needs
+``asyncpg``, ``asgiref`` and ``uvicorn``, which the WSGI deployment does not.
+"""
+import asyncio
+import os
+
+from app import create_app
+from db.async_pool import close_pool, open_pool
+from routes.async_routes import init_async_routes
+from startup import on_startup
+from utils.asgi import AsgiApp
+
+flask_app = create_app(os.getenv('FLASK_ENV', 'production'))
+
+
+async def startup():
+    await asyncio.to_thread(on_startup)
+    await open_pool(
+        min_size=flask_app.config['ASYNC_DB_POOL_MIN_SIZE'],
+        max_size=flask_app.config['ASYNC_DB_POOL_MAX_SIZE'],
+        timeout=flask_app.config['DB_POOL_TIMEOUT']
+    )
+
+
+app = AsgiApp(flask_app, init_async_routes(flask_app), startup=startup, shutdown=close_pool)
@@ -0,0 +1,179 @@
+"""Benchmark harness.
+
+    python -m bench generate full_games --count 50 --out bench/traces/games.jsonl
+    python -m bench replay bench/traces/games.jsonl --concurrency 16 --local-pg
+    python -m bench run leaderboard_polling --count 100 --local-pg --json report.json
+    python -m bench datagen --users 1000000 --games 2500000 --workers 8 --seed 7
+    python -m bench micro --threshold 0.2
+    python -m bench startup --top 20
+
+``--local-pg`` starts a throwaway PostgreSQL (see bench/postgres.py) and
+points the app at it; without it the DB_* environment is used as-is.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.scenarios import SCENARIOS  # noqa: E402
+from bench.trace import read_trace, write_trace  # noqa: E402
+
+
+def _generate(args):
+    return SCENARIOS[args.scenario](args.count) if args.count else SCENARIOS[args.scenario]()
+
+
+def _populate(args, users, games=None):
+    from bench.datagen import DatasetSpec, load
+    from config import DB_CONFIG
+    spec = DatasetSpec(users=users, games=games or int(users * 2.5), seed=args.seed)
+    for key in ('rounds', 'questions', 'days', 'until'):
+        value = getattr(args, key, None)
+        if value:
+            setattr(spec, 'rounds_per_game' if key == 'rounds' else key, value)
+    load(DB_CONFIG, spec, workers=args.workers, chunk_size=getattr(args, 'chunk_size', 10_000),
+         log=lambda message: print(message, file=sys.stderr))
+
+
+@contextlib.contextmanager
+def _database(args):
+    if not args.local_pg:
+        yield
+        return
+    from bench.postgres import LocalPostgres
+    with LocalPostgres(keep=args.keep_pg) as pg:
+        os.environ.update(pg.env)
+        print(f"PostgreSQL on port {pg.port} ({pg.datadir})", file=sys.stderr)
+        yield pg
+        if args.keep_pg:
+            print(f"keeping data directory {pg.datadir}", file=sys.stderr)
+
+
+def _replay(flows, args):
+    with _database(args):
+        if args.populate:
+            _populate(args, args.populate)
+        # imported late: config reads DB_* at import time
+        from app import create_app
+        from bench.replay import Replayer, format_report
+
+        app = create_app(args.config)
+        replayer = Replayer(app, concurrency=args.concurrency, pace=args.pace)
+        report = replayer.run(flows)
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0 if report['overall']['errors'] == 0 else 1
+
+
+def _micro(args):
+    from bench import micro
+
+    results = micro.run(args.names or None, rounds=args.rounds, min_time=args.min_time)
+    baseline = micro.load_baseline(args.baseline)
+    print(micro.format_results(results, baseline))
+    if args.save:
+        micro.save_baseline(results, args.baseline)
+        print(f"saved baseline to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"no baseline at {args.baseline}; run with --save to record one")
+        return 0
+    regressions = micro.compare(results, baseline, args.threshold)
+    for name, before, after, ratio in regressions:
+        print(f"REGRESSION {name}: {before * 1e6:.3f}us -> {after * 1e6:.3f}us ({ratio:.2f}x)")
+    return 1 if regressions else 0
+
+
+def _startup(args):
+    from bench import startup
+
+    report = startup.profile(args.config)
+    print(startup.format_report(report, args.top))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help='write a scenario trace')
+    generate.add_argument('scenario', choices=sorted(SCENARIOS))
+    generate.add_argument('--count', type=int, help='users/games/clients (scenario default if unset)')
+    generate.add_argument('--out', required=True)
+
+    for name, help_text in (('replay', 'replay a JSONL trace'), ('run', 'generate and replay a scenario')):
+        command = commands.add_parser(name, help=help_text)
+        if name == 'replay':
+            command.add_argument('trace')
+        else:
+            command.add_argument('scenario', choices=sorted(SCENARIOS))
+            command.add_argument('--count', type=int)
+        command.add_argument('--concurrency', type=int, default=8)
+        command.add_argument('--pace', type=float, help='honour recorded timing at this speed-up')
+        command.add_argument('--config', default='benchmark')
+        command.add_argument('--local-pg', action='store_true', help='start a throwaway PostgreSQL')
+        command.add_argument('--keep-pg', action='store_true', help='keep its data directory')
+        command.add_argument('--json', help='also write the report here')
+        command.add_argument('--populate', type=int, metavar='USERS',
+                             help='load a synthetic dataset of this many users first')
+        command.add_argument('--seed', type=int, default=42)
+        command.add_argument('--workers', type=int)
+
+    datagen = commands.add_parser('datagen', help='load a synthetic dataset with COPY')
+    datagen.add_argument('--users', type=int, default=100_000)
+    datagen.add_argument('--games', type=int, help='default: 2.5 per user')
+    datagen.add_argument('--rounds', type=int, help='rounds per game (default 5)')
+    datagen.add_argument('--questions', type=int, help='question bank size (default 20000)')
+    datagen.add_argument('--days', type=int, help='history length (default 365)')
+    datagen.add_argument('--seed', type=int, default=42)
+    datagen.add_argument('--until', type=datetime.fromisoformat,
+                         help='end of the history, YYYY-MM-DD (default 2026-01-01)')
+    datagen.add_argument('--workers', type=int, help='default: one per CPU')
+    datagen.add_argument('--chunk-size', type=int, default=10_000)
+    datagen.add_argument('--local-pg', action='store_true', help='load into a throwaway PostgreSQL')
+    datagen.add_argument('--keep-pg', action='store_true', help='keep its data directory')
+
+    micro = commands.add_parser('micro', help='run model-layer micro-benchmarks')
+    micro.add_argument('names', nargs='*', help='benchmarks to run (default: all)')
+    micro.add_argument('--baseline', default=os.path.join('bench', 'results', 'micro_baseline.json'))
+    micro.add_argument('--save', action='store_true', help='record these results as the baseline')
+    micro.add_argument('--threshold', type=float, default=0.2,
+                       help='fail when slower than the baseline by this fraction')
+    micro.add_argument('--rounds', type=int, default=7)
+    micro.add_argument('--min-time', type=float, default=0.02, help='seconds per round')
+
+    startup = commands.add_parser('startup', help='report import and create_app cost per module')
+    startup.add_argument('--config', default='default', help='config name passed to create_app')
+    startup.add_argument('--top', type=int, default=15)
+    startup.add_argument('--json', help='also write the full report here')
+
+    args = parser.parse_args(argv)
+    if args.command == 'startup':
+        return _startup(args)
+    if args.command == 'micro':
+        return _micro(args)
+    if args.command == 'datagen':
+        with _database(args):
+            _populate(args, args.users, args.games)
+        return 0
+    if args.command == 'generate':
+        count = write_trace(_generate(args), args.out)
+        print(f"wrote {count} requests to {args.out}")
+        return 0
+    flows = read_trace(args.trace) if args.command == 'replay' else _generate(args)
+    return _replay(flows, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""Deterministic synthetic dataset for scale testing.
+
+Rows are streamed with COPY from a pool of worker processes. All randomness
+is derived from ``seed`` and the row's own id (one RNG per user / game), so
+the same seed produces the same database whatever the worker count or chunk
+size. Derived tables (``user_games``, ``user_stats``, ``leaderboards``) are
+then computed in SQL from the raw rows, exactly as production would see them.
+
+Distributions:
+- player activity is Zipf-like (a few heavy players, a long tail)
+- games grow towards the end date (more recent games than old ones)
+- per-player skill sets answer accuracy; response times are log-normal
+"""
+import bisect
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+POSITIONS = 'ABCD'
+COUNTRIES = (('US', 30), ('IR', 18), ('DE', 8), ('GB', 7), ('IN', 7), ('BR', 5), ('FR', 5),
+             ('CA', 4), ('TR', 4), ('JP', 3), ('NL', 3), ('SE', 2), ('AU', 2), ('ES', 2))
+TIMEZONES = {'US': 'America/New_York', 'IR': 'Asia/Tehran', 'DE': 'Europe/Berlin',
+             'GB': 'Europe/London', 'IN': 'Asia/Kolkata', 'BR': 'America/Sao_Paulo',
+             'FR': 'Europe/Paris', 'CA': 'America/Toronto', 'TR': 'Europe/Istanbul',
+             'JP': 'Asia/Tokyo', 'NL': 'Europe/Amsterdam', 'SE': 'Europe/Stockholm',
+             'AU': 'Australia/Sydney', 'ES': 'Europe/Madrid'}
+# Any valid hash works: generated users are for load, not for logging in
+PASSWORD_HASH = 'pbkdf2:sha256:1000$benchsalt$' + '0' * 64
+
+# Fixed so a seed gives the same timestamps and partitions on any day
+DEFAULT_UNTIL = datetime(2026, 1, 1)
+
+
+class DatasetSpec:
+    """Sizes and shape of a generated dataset"""
+
+    def __init__(self, users=100_000, games=250_000, rounds_per_game=5, categories=24,
+                 questions=20_000, days=365, seed=42, until=None, zipf=1.1):
+        self.users = users
+        self.games = games
+        self.rounds_per_game = rounds_per_game
+        self.categories = categories
+        self.questions = questions
+        self.days = days
+        self.seed = seed
+        self.zipf = zipf
+        self.until = until or DEFAULT_UNTIL
+
+    @property
+    def since(self):
+        return self.until - timedelta(days=self.days)
+
+    def rng(self, table, row_id):
+        # str seeds are hashed with SHA-512, so this is stable across runs
+        return random.Random(f'{self.seed}:{table}:{row_id}')
+
+    def row_counts(self):
+        """Expected rows per table; rounds and answers are upper bounds since
+        unfinished games stop early"""
+        rounds = self.games * self.rounds_per_game
+        return {
+            'users': self.users, 'user_profiles': self.users, 'games': self.games,
+            'game_participants': self.games * 2, 'game_rounds': rounds, 'round_answers': rounds * 2
+        }
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+class CopyBuffer:
+    """Accumulates rows as COPY text and flushes them per table"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, table, columns, row):
+        key = (table, columns)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = self.buffers[key] = []
+        buffer.append('\t'.join(_copy_value(value) for value in row))
+
+    def flush(self):
+        # dict order = first-seen order, which matches FK dependencies
+        for (table, columns), rows in self.buffers.items():
+            if rows:
+                data = io.StringIO('\n'.join(rows) + '\n')
+                self.cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", data)
+                self.counts[table] = self.counts.get(table, 0) + len(rows)
+                rows.clear()
+
+
+class _GameContext:
+    """Per-worker lookups shared by every generated game.
+
+    Player picks are Zipf-weighted by rank, and ranks are scattered over ids
+    by a multiplicative permutation so heavy players aren't simply the oldest
+    accounts. Skills and answer keys are cached because re-deriving them per
+    answer would dominate generation time.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.size = spec.users
+        self.cum_weights = list(itertools.accumulate(
+            1.0 / (rank ** spec.zipf) for rank in range(1, spec.users + 1)))
+        self.total = self.cum_weights[-1]
+        self.step = 2654435761 if math.gcd(2654435761, self.size) == 1 else 1
+        self.correct_positions = [None] + [spec.rng('question', question_id).randrange(4)
+                                           for question_id in range(1, spec.questions + 1)]
+        self._skills = {}
+
+    def pick(self, rng):
+        rank = bisect.bisect_left(self.cum_weights, rng.random() * self.total)
+        return (rank * self.step) % self.size + 1
+
+    def pair(self, rng):
+        first = self.pick(rng)
+        second = self.pick(rng)
+        while second == first:
+            second = self.pick(rng)
+        return first, second
+
+    def skill(self, user_id):
+        skill = self._skills.get(user_id)
+        if skill is None:
+            # accuracy in [0.25, 0.95], centred around 0.6
+            skill = min(0.95, max(0.25, self.spec.rng('skill', user_id).gauss(0.6, 0.15)))
+            self._skills[user_id] = skill
+        return skill
+
+
+def generate_reference(spec, out):
+    """Categories, game types, questions and choices the generated games refer to"""
+    out.add('game_types', 'id, name, description, min_players, max_players',
+            (1, 'classic', 'Two players, five rounds', 2, 2))
+    for category_id in range(1, spec.categories + 1):
+        out.add('categories', 'id, name, slug, difficulty_level',
+                (category_id, f'Category {category_id}', f'category-{category_id}',
+                 category_id % 5 + 1))
+    for question_id in range(1, spec.questions + 1):
+        rng = spec.rng('question-meta', question_id)
+        out.add('questions', 'id, text, category_id, difficulty, is_verified',
+                (question_id, f'Generated question #{question_id}?',
+                 rng.randrange(spec.categories) + 1, rng.choice(DIFFICULTIES), True))
+        correct = spec.rng('question', question_id).randrange(4)
+        for index, position in enumerate(POSITIONS):
+            out.add('question_choices', 'id, question_id, choice_text, is_correct, position',
+                    ((question_id - 1) * 4 + index + 1, question_id, f'Answer {position}',
+                     index == correct, position))
+
+
+def generate_users(spec, first_id, last_id, out):
+    countries = [code for code, _ in COUNTRIES]
+    weights = list(itertools.accumulate(weight for _, weight in COUNTRIES))
+    span = (spec.until - spec.since).total_seconds()
+    for user_id in range(first_id, last_id + 1):
+        rng = spec.rng('user', user_id)
+        # sign-ups accelerate over time: sqrt skews towards the end date
+        created = spec.since + timedelta(seconds=span * math.sqrt(rng.random()))
+        last_login = created + timedelta(seconds=(spec.until - created).total_seconds() * rng.random())
+        out.add('users', 'id, username, email, password_hash, created_at, last_login, role',
+                (user_id, f'user{user_id}', f'user{user_id}@example.com', PASSWORD_HASH,
+                 created, last_login, 'admin' if user_id <= 3 else 'user'))
+        country = rng.choices(countries, cum_weights=weights)[0]
+        out.add('user_profiles', 'user_id, display_name, country, timezone, preferences',
+                (user_id, f'Player {user_id}', country, TIMEZONES[country],
+                 json.dumps({'sound': rng.random() < 0.7, 'theme': rng.choice(('light', 'dark'))})))
+
+
+def generate_games(spec, first_id, last_id, out, context):
+    span = (spec.until - spec.since).total_seconds()
+    rounds = spec.rounds_per_game
+    for game_id in range(first_id, last_id + 1):
+        rng = spec.rng('game', game_id)
+        pair = context.pair(rng)
+        started = spec.since + timedelta(seconds=span * math.sqrt(rng.random()))
+        roll = rng.random()
+        status = 'completed' if roll < 0.9 else ('active' if roll < 0.95 else 'cancelled')
+        played = rounds if status == 'completed' else rng.randrange(1, rounds + 1)
+
+        scores = [0, 0]
+        round_rows, answer_rows = [], []
+        moment = started
+        for number in range(1, played + 1):
+            round_id = (game_id - 1) * rounds + number
+            question_id = rng.randrange(spec.questions) + 1
+            correct = context.correct_positions[question_id]
+            round_start = moment
+            round_status = 'active' if status == 'active' and number == played else 'completed'
+            slowest = 0
+            for seat, user_id in enumerate(pair):
+                response_ms = min(30_000, int(rng.lognormvariate(8.3, 0.5)))
+                slowest = max(slowest, response_ms)
+                is_correct = rng.random() < context.skill(user_id)
+                position = correct if is_correct else (correct + rng.randrange(1, 4)) % 4
+                points = int(100 * (1 - response_ms / 30_000)) if is_correct else 0
+                scores[seat] += points
+                answer_rows.append((round_id * 2 - 1 + seat, round_id, user_id,
+                                    (question_id - 1) * 4 + position + 1,
+                                    round_start + timedelta(milliseconds=response_ms),
+                                    response_ms, is_correct, points, started))
+            moment = round_start + timedelta(milliseconds=slowest + 2000)
+            round_rows.append((round_id, game_id, number, question_id, round_start,
+                               moment if round_status == 'completed' else None, round_status, 30, 100,
+                               started))
+
+        ended = moment if status != 'active' else None
+        winner = None
+        if status == 'completed' and scores[0] != scores[1]:
+            winner = pair[0] if scores[0] > scores[1] else pair[1]
+        out.add('games', 'id, game_type_id, status, start_time, end_time, game_config, winner_id, created_at',
+                (game_id, 1, status, started, ended, '{"rounds": %d}' % rounds, winner, started))
+        participant_status = 'active' if status == 'active' else 'finished'
+        for seat, user_id in enumerate(pair):
+            out.add('game_participants', 'game_id, user_id, join_time, score, status',
+                    (game_id, user_id, started, scores[seat], participant_status))
+        for row in round_rows:
+            out.add('game_rounds', 'id, game_id, round_number, question_id, start_time, end_time, '
+                    'status, time_limit_seconds, points_possible, game_created_at', row)
+        for row in answer_rows:
+            out.add('round_answers', 'id, round_id, user_id, choice_id, answer_time, '
+                    'response_time_ms, is_correct, points_earned, game_created_at', row)
+
+
+# --- worker processes --------------------------------------------------------
+
+_worker = {}
+
+
+def _init_worker(dsn, spec, needs_context):
+    _worker['conn'] = psycopg2.connect(**dsn)
+    _worker['spec'] = spec
+    if needs_context:
+        _worker['context'] = _GameContext(spec)
+
+
+def _load_chunk(task):
+    kind, first_id, last_id = task
+    conn, spec = _worker['conn'], _worker['spec']
+    with conn.cursor() as cur:
+        cur.execute("SET synchronous_commit = off")
+        out = CopyBuffer(cur)
+        if kind == 'users':
+            generate_users(spec, first_id, last_id, out)
+        else:
+            generate_games(spec, first_id, last_id, out, _worker['context'])
+        out.flush()
+    conn.commit()
+    return out.counts
+
+
+def _chunks(kind, total, size):
+    return [(kind, start, min(start + size - 1, total)) for start in range(1, total + 1, size)]
+
+
+# explicit ids were used, so move every sequence past them
+RESET_SEQUENCE_SQL = "SELECT setval(pg_get_serial_sequence('{t}', 'id'), GREATEST((SELECT MAX(id) FROM {t}), 1))"
+
+USER_STATS_SQL = """
+    INSERT INTO user_stats (user_id, games_played, games_won, games_lost, games_drawn, total_points,
+                            correct_answers, total_answers, average_response_time_ms, highest_score,
+                            last_played_at)
+    SELECT u.id,
+           COALESCE(p.games_played, 0), COALESCE(p.games_won, 0), COALESCE(p.games_lost, 0),
+           COALESCE(p.games_drawn, 0), COALESCE(p.total_points, 0),
+           COALESCE(a.correct_answers, 0), COALESCE(a.total_answers, 0), a.avg_ms,
+           COALESCE(p.highest_score, 0), p.last_played_at
+    FROM users u
+    LEFT JOIN (
+        SELECT gp.user_id, COUNT(*) AS games_played,
+               COUNT(*) FILTER (WHERE g.winner_id = gp.user_id) AS games_won,
+               COUNT(*) FILTER (WHERE g.winner_id <> gp.user_id) AS games_lost,
+               COUNT(*) FILTER (WHERE g.winner_id IS NULL) AS games_drawn,
+               SUM(gp.score) AS total_points, MAX(gp.score) AS highest_score,
+               MAX(g.start_time) AS last_played_at
+        FROM game_participants gp JOIN games g ON g.id = gp.game_id
+        WHERE g.status = 'completed'
+        GROUP BY gp.user_id
+    ) p ON p.user_id = u.id
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) FILTER (WHERE is_correct) AS correct_answers,
+               COUNT(*) AS total_answers, AVG(response_time_ms)::int AS avg_ms
+        FROM round_answers GROUP BY user_id
+    ) a ON a.user_id = u.id
+    ON CONFLICT (user_id) DO NOTHING
+"""
+
+USER_GAMES_SQL = """
+    INSERT INTO user_games (user_id, game_id, game_type, game_status, your_score, your_status,
+                            opponent_id, opponent_username, opponent_score, opponent_status,
+                            start_time, end_time, duration_seconds, updated_at)
+    SELECT me.user_id, g.id, gt.name, g.status, me.score, me.status,
+           o.user_id, u.username, o.score, o.status,
+           g.start_time, g.end_time, EXTRACT(EPOCH FROM g.end_time - g.start_time), g.start_time
+    FROM games g
+    JOIN game_types gt ON gt.id = g.game_type_id
+    JOIN game_participants me ON me.game_id = g.id
+    JOIN game_participants o ON o.game_id = g.id AND o.user_id <> me.user_id
+    JOIN users u ON u.id = o.user_id
+"""
+
+GAME_KEYS_SQL = "INSERT INTO game_keys (id, created_at) SELECT id, created_at FROM games ON CONFLICT DO NOTHING"
+
+LEADERBOARDS_SQL = """
+    INSERT INTO leaderboards (user_id, scope, rank, score, generated_at)
+    SELECT user_id, scope, rank, score, %(until)s FROM (
+        SELECT gp.user_id, s.scope, SUM(gp.score) AS score,
+               RANK() OVER (PARTITION BY s.scope ORDER BY SUM(gp.score) DESC) AS rank
+        FROM (VALUES ('daily', 1), ('weekly', 7), ('monthly', 30), ('alltime', 100000))
+             AS s(scope, days)
+        JOIN games g ON g.status = 'completed'
+                    AND g.start_time >= %(until)s::timestamp - make_interval(days => s.days)
+        JOIN game_participants gp ON gp.game_id = g.id
+        GROUP BY gp.user_id, s.scope
+    ) ranked
+    WHERE rank <= 1000
+"""
+
+
+def load(dsn, spec, workers=None, chunk_size=10_000, log=print):
+    """Populate an empty schema; returns rows written per table"""
+    workers = workers or multiprocessing.cpu_count()
+    counts = {}
+    started = time.monotonic()
+
+    # imported late: db.connection reads the app config
+    from db.partitions import add_months, ensure_partitions, month_start
+
+    conn = psycopg2.connect(**dsn)
+    try:
+        with conn.cursor() as cur:
+            # games are spread over [since, until]; every month needs its partitions
+            ensure_partitions(cur, month_start(spec.since), add_months(month_start(spec.until), 3))
+            out = CopyBuffer(cur)
+            generate_reference(spec, out)
+            out.flush()
+            counts.update(out.counts)
+        conn.commit()
+    finally:
+        conn.close()
+    log(f"reference data loaded in {time.monotonic() - started:.1f}s")
+
+    # users first: every game row references them
+    for kind, total, needs_context in (('users', spec.users, False), ('games', spec.games, True)):
+        phase_started = time.monotonic()
+        with multiprocessing.Pool(workers, _init_worker, (dsn, spec, needs_context)) as pool:
+            for chunk_counts in pool.imap_unordered(_load_chunk, _chunks(kind, total, chunk_size)):
+                for table, count in chunk_counts.items():
+                    counts[table] = counts.get(table, 0) + count
+        log(f"{kind} phase done in {time.monotonic() - phase_started:.1f}s")
+
+    conn = psycopg2.connect(**dsn)
+    try:
+        with conn.cursor() as cur:
+            for table in ('users', 'games', 'game_rounds', 'round_answers', 'categories',
+                          'game_types', 'questions', 'question_choices'):
+                cur.execute(RESET_SEQUENCE_SQL.format(t=table))
+            cur.execute(USER_GAMES_SQL)
+            counts['user_games'] = cur.rowcount
+            cur.execute(GAME_KEYS_SQL)
+            counts['game_keys'] = cur.rowcount
+            cur.execute(USER_STATS_SQL)
+            counts['user_stats'] = cur.rowcount
+            cur.execute(LEADERBOARDS_SQL, {'until': spec.until})
+            counts['leaderboards'] = cur.rowcount
+            cur.execute("REFRESH MATERIALIZED VIEW mv_top_players")
+        conn.commit()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    elapsed = time.monotonic() - started
+    log(f"{sum(counts.values()):,} rows in {elapsed:.1f}s")
+    return counts
@@ -0,0 +1,216 @@
+"""Micro-benchmarks for model-layer hot paths, with on-disk baselines.
+
+Each benchmark is a setup function returning the zero-argument callable to
+time. ``measure`` calibrates the loop count so one round takes at least
+``min_time`` seconds, then reports per-call statistics over ``rounds``.
+Comparisons use the fastest round, which is the least noisy figure on a
+shared machine.
+
+    python -m bench micro --save                 # record a baseline
+    python -m bench micro --threshold 0.2        # exit 1 if >20% slower
+"""
+import json
+import os
+import platform
+import random
+import statistics
+import time
+from datetime import datetime
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'micro_baseline.json')
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql')
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def measure(fn, rounds=7, min_time=0.02):
+    """Per-call timings in seconds: min, median, mean and stddev across rounds"""
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or iterations >= 1 << 24:
+            break
+        iterations *= 10 if elapsed < min_time / 10 else 2
+
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        timings.append((time.perf_counter() - started) / iterations)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'rounds': rounds,
+        'iterations': iterations,
+    }
+
+
+def run(names=None, rounds=7, min_time=0.02):
+    results = {}
+    for name in names or sorted(BENCHMARKS):
+        results[name] = measure(BENCHMARKS[name](), rounds=rounds, min_time=min_time)
+    return results
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    data = {
+        'machine': platform.node(),
+        'python': platform.python_version(),
+        'saved_at': datetime.now().isoformat(timespec='seconds'),
+        'benchmarks': results,
+    }
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def compare(results, baseline, threshold=0.2, stat='min'):
+    """Benchmarks slower than baseline by more than ``threshold``, as
+    (name, baseline, current, ratio); names missing from either side are skipped"""
+    regressions = []
+    previous = (baseline or {}).get('benchmarks', {})
+    for name, stats in sorted(results.items()):
+        if name not in previous or not previous[name].get(stat):
+            continue
+        ratio = stats[stat] / previous[name][stat]
+        if ratio > 1 + threshold:
+            regressions.append((name, previous[name][stat], stats[stat], ratio))
+    return regressions
+
+
+def format_results(results, baseline=None, stat='min'):
+    previous = (baseline or {}).get('benchmarks', {})
+    header = f"{'benchmark':<34}{'min us':>10}{'median us':>11}{'stddev':>9}{'vs base':>9}"
+    lines = [header, '-' * len(header)]
+    for name, stats in sorted(results.items()):
+        change = ''
+        if previous.get(name, {}).get(stat):
+            change = f"{(stats[stat] / previous[name][stat] - 1) * 100:+.1f}%"
+        lines.append(f"{name:<34}{stats['min'] * 1e6:>10.3f}{stats['median'] * 1e6:>11.3f}"
+                     f"{stats['stddev'] * 1e6:>9.3f}{change:>9}")
+    return '\n'.join(lines)
+
+
+def _user_row(i):
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    return (i, f'user{i}', f'user{i}@example.com', 'pbkdf2:sha256:600000$salt$hash', now, now,
+            True, 'user', i, f'User {i}', None, 'bio', 'US', 'UTC', {'theme': 'dark'}, now)
+
+
+@benchmark('round.calculate_points')
+def _calculate_points():
+    from models.round_model import Round
+    round_ = Round(game_id=1, round_number=1, question_id=1, time_limit_seconds=30)
+    rng = random.Random(1)
+    times = [rng.randrange(0, 35_000) for _ in range(64)]
+
+    def fn():
+        for ms in times:
+            round_.calculate_points(ms)
+    return fn
+
+
+@benchmark('user.from_row')
+def _user_from_row():
+    from models.user_model import User
+    row = _user_row(1)
+    return lambda: User._create_user_from_row(row)
+
+
+@benchmark('user.to_dict')
+def _user_to_dict():
+    from models.user_model import User
+    user = User._create_user_from_row(_user_row(1))
+    return user.to_dict
+
+
+@benchmark('category.from_rows')
+def _category_from_rows():
+    from models.category_model import Category
+    # Category.all on a full question bank
+    rows = [(i, f'Category {i}', i * 7) for i in range(500)]
+    return lambda: Category.from_rows(rows)
+
+
+@benchmark('user_stats.from_row')
+def _user_stats_from_row():
+    from models.user_stats_model import UserStats
+    row = (120, 70, 45, 5, 410, 600, 35_000, 1200, 812.5, 4210.25, 9, 3, 2, 9000, 1500,
+           datetime(2026, 1, 1, 12, 0, 0))
+    return lambda: UserStats.from_row(1, row)
+
+
+@benchmark('user_stats.to_dict')
+def _user_stats_to_dict():
+    from models.user_stats_model import UserStats
+    stats = UserStats(user_id=1, games_played=120, wins=70, losses=45, draws=5, correct_answers=410,
+                      total_answers=600, total_points=35_000, fastest_answer=812.5,
+                      average_answer_time=4210.25, xp=9000, rank_points=1500)
+    return stats.to_dict
+
+
+@benchmark('leaderboard.global_rows')
+def _global_leaderboard_rows():
+    from decimal import Decimal
+    from routes.leaderboard_route import GLOBAL_PLAYER
+    from utils.serialization import dumps
+    rows = [(f'player{i}', 50_000 - i, 120, 70, Decimal('58.33'), Decimal('68.50'), i + 1)
+            for i in range(100)]
+    return lambda: dumps({'status': 'success', 'data': GLOBAL_PLAYER.rows(rows)})
+
+
+@benchmark('query_loader.load_queries')
+def _load_queries():
+    from db.query_loader import load_queries
+    path = os.path.join(SQL_DIR, 'queries', 'category_queries.sql')
+    # Only files with --:<key> markers yield queries; time one that does
+    expected = {'get_all_categories_with_their_question_counts', 'get_a_specific_category_by_name',
+                'insert_a_new_category_and_return_its_id', 'get_category_by_id_with_question_count',
+                'update_category_name', 'delete_category'}
+    missing = expected - set(load_queries(path))
+    assert not missing, f"category_queries.sql is missing {sorted(missing)}"
+    return lambda: load_queries(path)
+
+
+@benchmark('games.user_game_from_row')
+def _user_game_from_row():
+    from models.game_model import _user_game_from_row
+    # one page of user_games rows
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    rows = [(i, 'classic', 'completed', now, now, 95.5, 300, 'finished',
+             1000 + i, f'opp{i}', 250, 'finished') for i in range(50)]
+
+    def fn():
+        for row in rows:
+            _user_game_from_row(row)
+    return fn
+
+
+@benchmark('importer.shuffle_choices')
+def _shuffle_choices():
+    from manager.save_questions import shuffle_choices
+    rng = random.Random(1)
+    incorrect = ['Paris', 'Rome', 'Madrid']
+    return lambda: shuffle_choices('Berlin', incorrect, rng)
@@ -0,0 +1,112 @@
+"""Throwaway PostgreSQL cluster for benchmarks (initdb + pg_ctl in a temp dir)."""
+import glob
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+
+import psycopg2
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'sql', 'migrations')
+
+# Durability is irrelevant for a scratch cluster; these keep WAL and fsync
+# from dominating write-heavy scenarios
+BENCH_SETTINGS = {
+    'fsync': 'off',
+    'synchronous_commit': 'off',
+    'full_page_writes': 'off',
+    'shared_buffers': '256MB',
+    'max_connections': '200',
+}
+
+
+def find_pg_bin():
+    """Directory holding initdb/pg_ctl: $PG_BIN, then PATH, then common install dirs"""
+    candidates = [os.getenv('PG_BIN')]
+    initdb = shutil.which('initdb')
+    if initdb:
+        candidates.append(os.path.dirname(initdb))
+    candidates += sorted(glob.glob('/usr/lib/postgresql/*/bin'), reverse=True)
+    candidates += ['/usr/local/pgsql/bin', '/opt/homebrew/bin', '/usr/local/bin']
+    for directory in candidates:
+        if directory and os.path.exists(os.path.join(directory, 'initdb')):
+            return directory
+    raise RuntimeError('PostgreSQL binaries not found; install PostgreSQL or set PG_BIN')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LocalPostgres:
+    """Start a private cluster, create the app database and load the schema.
+
+    Use as a context manager; ``env`` holds the DB_* variables the app's
+    config reads, so set them before importing ``app``/``config``.
+    """
+
+    def __init__(self, dbname='dbback_bench', user='bench', port=None, keep=False,
+                 settings=None, schema_dir=SCHEMA_DIR):
+        self.dbname = dbname
+        self.user = user
+        self.port = port or _free_port()
+        self.keep = keep
+        self.settings = dict(BENCH_SETTINGS, **(settings or {}))
+        self.schema_dir = schema_dir
+        self.bin = find_pg_bin()
+        self.datadir = None
+
+    @property
+    def env(self):
+        return {
+            'DB_NAME': self.dbname,
+            'DB_USER': self.user,
+            'DB_PASSWORD': '',
+            'DB_HOST': '127.0.0.1',
+            'DB_PORT': str(self.port),
+        }
+
+    def _run(self, tool, *args):
+        subprocess.run([os.path.join(self.bin, tool), *args], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def start(self):
+        self.datadir = tempfile.mkdtemp(prefix='dbback-pg-')
+        self._run('initdb', '-D', self.datadir, '-U', self.user, '-A', 'trust', '-E', 'UTF8')
+        options = ' '.join(f'-c {name}={value}' for name, value in self.settings.items())
+        self._run('pg_ctl', '-D', self.datadir, '-w', '-l', os.path.join(self.datadir, 'server.log'),
+                  '-o', f'-p {self.port} -k {self.datadir} -h 127.0.0.1 {options}', 'start')
+        self._run('createdb', '-h', '127.0.0.1', '-p', str(self.port), '-U', self.user, self.dbname)
+        self.load_schema()
+        return self
+
+    def connect(self):
+        return psycopg2.connect(dbname=self.dbname, user=self.user,
+                                host='127.0.0.1', port=self.port)
+
+    def load_schema(self):
+        """Apply sql/migrations/*.sql in order"""
+        # Imported here: config reads the DB_* variables on first import
+        from db.migrate import migrate
+        # Nothing else is connected, so there is no point building online
+        migrate(connect=self.connect, directory=self.schema_dir, concurrently=False, log=lambda line: None)
+
+    def stop(self):
+        if self.datadir is None:
+            return
+        try:
+            self._run('pg_ctl', '-D', self.datadir, '-m', 'fast', '-w', 'stop')
+        finally:
+            if not self.keep:
+                shutil.rmtree(self.datadir, ignore_errors=True)
+            self.datadir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
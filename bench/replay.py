@@ -0,0 +1,168 @@
+"""Replay trace flows against the Flask app in-process and summarise latency."""
+import queue
+import threading
+import time
+import uuid
+
+from werkzeug.exceptions import HTTPException
+
+from bench.trace import extract, substitute
+from db.instrumentation import queries_on_thread
+
+
+class Result:
+    __slots__ = ('endpoint', 'status', 'ok', 'latency', 'queries')
+
+    def __init__(self, endpoint, status, ok, latency, queries):
+        self.endpoint = endpoint
+        self.status = status
+        self.ok = ok
+        self.latency = latency
+        self.queries = queries
+
+
+class Replayer:
+    """Runs flows on ``concurrency`` threads, one Flask test client per flow client.
+
+    With ``pace`` set, steps wait for their recorded ``at`` offset divided by
+    ``pace`` (2.0 replays twice as fast); otherwise requests go back to back.
+    """
+
+    def __init__(self, app, concurrency=8, pace=None, password='Bench12345', run_id=None):
+        self.app = app
+        self.concurrency = concurrency
+        self.pace = pace
+        self.password = password
+        self.run_id = run_id or uuid.uuid4().hex[:8]
+        self.results = []
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._adapter = app.url_map.bind('localhost')
+
+    def _endpoint(self, step, path):
+        if step.get('name'):
+            return step['name']
+        try:
+            return self._adapter.match(path, method=step['method'])[0]
+        except HTTPException:
+            return f"{step['method']} {path}"
+
+    def run_flow(self, flow):
+        variables = {'run': self.run_id, 'password': self.password}
+        clients = {}
+        results, skipped = [], 0
+        started = time.perf_counter()
+        for index, step in enumerate(flow):
+            try:
+                path = substitute(step['path'], variables)
+                query = substitute(step.get('query'), variables)
+                body = substitute(step.get('json'), variables)
+            except KeyError:
+                # an earlier capture failed, so this step can't be built
+                skipped += len(flow) - index
+                break
+            if self.pace and 'at' in step:
+                delay = step['at'] / self.pace - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+            client = clients.get(step.get('client', 'c'))
+            if client is None:
+                client = clients[step.get('client', 'c')] = self.app.test_client()
+
+            queries_before = queries_on_thread()
+            request_started = time.perf_counter()
+            response = client.open(path, method=step['method'], query_string=query, json=body)
+            latency = time.perf_counter() - request_started
+            queries = queries_on_thread() - queries_before
+
+            expect = step.get('expect')
+            ok = response.status_code in expect if expect else response.status_code < 500
+            results.append(Result(self._endpoint(step, path), response.status_code, ok,
+                                  latency, queries))
+
+            for name, dotted in (step.get('capture') or {}).items():
+                try:
+                    variables[name] = extract(response.get_json(silent=True), dotted)
+                except (KeyError, IndexError, TypeError, ValueError):
+                    variables.pop(name, None)
+        with self._lock:
+            self.results.extend(results)
+            self.skipped += skipped
+
+    def run(self, flows):
+        pending = queue.Queue()
+        for flow in flows:
+            pending.put(flow)
+
+        def worker():
+            while True:
+                try:
+                    flow = pending.get_nowait()
+                except queue.Empty:
+                    return
+                self.run_flow(flow)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, name=f'replay-{i}')
+                   for i in range(max(1, self.concurrency))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(self.results, time.perf_counter() - started, self.skipped)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-int(q * 1000) * len(sorted_values) // 1000))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _stats(results, elapsed):
+    latencies = sorted(result.latency * 1000 for result in results)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': sum(1 for result in results if not result.ok),
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / count, 2) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'max_ms': round(latencies[-1], 2) if count else 0.0,
+        'queries_per_request': round(sum(r.queries for r in results) / count, 2) if count else 0.0
+    }
+
+
+def summarize(results, elapsed, skipped=0):
+    """Overall and per-endpoint throughput, latency percentiles and queries/request"""
+    by_endpoint = {}
+    for result in results:
+        by_endpoint.setdefault(result.endpoint, []).append(result)
+    statuses = {}
+    for result in results:
+        statuses[str(result.status)] = statuses.get(str(result.status), 0) + 1
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'skipped': skipped,
+        'statuses': statuses,
+        'overall': _stats(results, elapsed),
+        'endpoints': {name: _stats(items, elapsed) for name, items in sorted(by_endpoint.items())}
+    }
+
+
+def format_report(report):
+    """Render a summary as a fixed-width table"""
+    header = f"{'endpoint':<28}{'reqs':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'q/req':>7}"
+    lines = [header, '-' * len(header)]
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['overall'])]
+    for name, stats in rows:
+        lines.append(
+            f"{name[:27]:<28}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput_rps']:>9}"
+            f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['queries_per_request']:>7}"
+        )
+    lines.append(f"elapsed {report['elapsed_s']}s, skipped {report['skipped']}, statuses {report['statuses']}")
+    return '\n'.join(lines)
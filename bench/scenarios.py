@@ -0,0 +1,127 @@
+"""Synthetic traffic in the trace format of ``bench.trace``.
+
+Every generator returns a list of flows. Usernames embed ``${run}`` so one
+trace file can be replayed repeatedly against the same database.
+"""
+
+
+def _register(client, user, capture=None):
+    step = {
+        'client': client, 'name': 'register', 'method': 'POST', 'path': '/register',
+        'json': {'username': user, 'email': f'{user}@bench.local', 'password': '${password}'},
+        'expect': [201]
+    }
+    if capture:
+        step['capture'] = capture
+    return step
+
+
+def _login(client, user):
+    return {
+        'client': client, 'name': 'login', 'method': 'POST', 'path': '/login',
+        'json': {'username': user, 'password': '${password}'}, 'expect': [200]
+    }
+
+
+def _get(client, name, path, query=None, expect=(200,)):
+    step = {'client': client, 'name': name, 'method': 'GET', 'path': path, 'expect': list(expect)}
+    if query:
+        step['query'] = query
+    return step
+
+
+def _flow(name, steps):
+    return [dict(step, flow=name) for step in steps]
+
+
+def register_login_storm(users=200):
+    """Each flow signs up a fresh user, logs in and reads the profile"""
+    flows = []
+    for i in range(users):
+        user = f'b${{run}}r{i}'
+        flows.append(_flow(f'register-{i}', [
+            _register('c', user),
+            _login('c', user),
+            _get('c', 'profile', '/profile')
+        ]))
+    return flows
+
+
+def matchmaking_burst(players=100, game_type_id=1):
+    """Players all ask for a game without an opponent at once"""
+    flows = []
+    for i in range(players):
+        user = f'b${{run}}m{i}'
+        flows.append(_flow(f'match-{i}', [
+            _register('c', user),
+            _login('c', user),
+            {'client': 'c', 'name': 'create_game', 'method': 'POST', 'path': '/games/new',
+             'json': {'game_type_id': game_type_id}, 'expect': [201, 404]}
+        ]))
+    return flows
+
+
+def full_games(games=50, rounds=5, game_type_id=1):
+    """Two players per flow: create a game, then both answer every round"""
+    flows = []
+    for i in range(games):
+        p1, p2 = f'b${{run}}g{i}a', f'b${{run}}g{i}b'
+        steps = [
+            _register('p2', p2, capture={'p2_id': 'user.id'}),
+            _register('p1', p1),
+            _login('p1', p1),
+            _login('p2', p2),
+            {'client': 'p1', 'name': 'create_game', 'method': 'POST', 'path': '/games/new',
+             'json': {'game_type_id': game_type_id, 'opponent_id': '${p2_id}'},
+             'capture': {'game_id': 'game_id'}, 'expect': [201]}
+        ]
+        for number in range(1, rounds + 1):
+            final = number == rounds
+            steps.append(dict(_get('p1', 'get_game', '/games/${game_id}'),
+                              capture={'choice_id': 'current_round.choices.0.id'}))
+            for player in ('p1', 'p2'):
+                steps.append({
+                    'client': player, 'name': 'submit_answer', 'method': 'POST',
+                    'path': '/games/${game_id}/answer',
+                    'json': {'choice_id': '${choice_id}', 'response_time_ms': 1500 + 100 * number,
+                             'is_final_round': final and player == 'p2'},
+                    'expect': [200]
+                })
+        steps.append(_get('p2', 'get_game', '/games/${game_id}'))
+        flows.append(_flow(f'game-{i}', steps))
+    return flows
+
+
+def leaderboard_polling(clients=50, polls=20):
+    """Anonymous and logged-in clients refreshing leaderboard views"""
+    flows = []
+    for i in range(clients):
+        steps = []
+        for _ in range(polls):
+            steps.append(_get('c', 'leaderboard', '/leaderboard'))
+            steps.append(_get('c', 'global_leaderboard', '/api/leaderboard/global', {'limit': '10'}))
+            steps.append(_get('c', 'categories', '/categories'))
+        flows.append(_flow(f'leaderboard-{i}', steps))
+    return flows
+
+
+def history_paging(users=20, pages=10, per_page=10):
+    """Users walking back through their game history page by page"""
+    flows = []
+    for i in range(users):
+        user = f'b${{run}}h{i}'
+        steps = [_register('c', user), _login('c', user)]
+        for page in range(1, pages + 1):
+            steps.append(_get('c', 'game_history', '/games/history',
+                              {'page': str(page), 'per_page': str(per_page)}))
+        flows.append(_flow(f'history-{i}', steps))
+    return flows
+
+
+SCENARIOS = {
+    'register_login_storm': register_login_storm,
+    'matchmaking_burst': matchmaking_burst,
+    'full_games': full_games,
+    'leaderboard_polling': leaderboard_polling,
+    'history_paging': history_paging,
+}
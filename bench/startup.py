@@ -0,0 +1,77 @@
+"""Where app startup time goes: imports per module, and create_app steps.
+
+``profile`` boots the app in a fresh interpreter under ``-X importtime``, so
+nothing is imported beforehand, and combines Python's per-module import
+times with the step timings create_app records in
+``app.extensions['startup']``.
+
+    python -m bench startup --top 20
+"""
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app({config_name!r})
+finished = time.perf_counter()
+print(json.dumps({{
+    'import_app_ms': (imported - started) * 1000,
+    'create_app_ms': (finished - imported) * 1000,
+    'steps': app.extensions['startup'].to_dict()['steps'],
+}}))
+"""
+
+
+def parse_importtime(output: str):
+    """``-X importtime`` lines as {module, self_us, cumulative_us}, in import order"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        modules.append({'module': name.strip(), 'self_us': int(self_us), 'cumulative_us': int(cumulative_us)})
+    return modules
+
+
+def by_package(modules):
+    """Self time summed per top-level package, slowest first"""
+    totals = {}
+    for entry in modules:
+        package = entry['module'].split('.')[0]
+        totals[package] = totals.get(package, 0) + entry['self_us']
+    return sorted(({'package': name, 'self_us': us} for name, us in totals.items()),
+                  key=lambda entry: entry['self_us'], reverse=True)
+
+
+def profile(config_name='default', python=sys.executable):
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', SCRIPT.format(config_name=config_name)],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=PROJECT_ROOT),
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError('create_app failed:\n' + '\n'.join(errors[-20:]))
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(result.stderr)
+    report['modules'] = sorted(modules, key=lambda entry: entry['cumulative_us'], reverse=True)
+    report['packages'] = by_package(modules)
+    return report
+
+
+def format_report(report, top=15):
+    lines = [f"import app: {report['import_app_ms']:.1f} ms, create_app: {report['create_app_ms']:.1f} ms", '',
+             f"{'create_app step':<28}{'ms':>10}"]
+    lines += [f"{step['name']:<28}{step['ms']:>10.1f}" for step in report['steps']]
+    lines += ['', f"{'package (self time)':<28}{'ms':>10}"]
+    lines += [f"{entry['package']:<28}{entry['self_us'] / 1000:>10.1f}" for entry in report['packages'][:top]]
+    lines += ['', f"{'module (cumulative)':<44}{'ms':>10}"]
+    lines += [f"{entry['module']:<44}{entry['cumulative_us'] / 1000:>10.1f}" for entry in report['modules'][:top]]
+    return '\n'.join(lines)
@@ -0,0 +1,165 @@
+"""JSONL request traces: the format shared by the recorder, scenarios and replayer.
+
+One JSON object per line, one line per request::
+
+    {"flow": "game-3", "client": "p1", "name": "create_game",
+     "method": "POST", "path": "/games/new", "json": {"opponent_id": "${p2_id}"},
+     "capture": {"game_id": "game_id"}, "expect": [201], "at": 0.42}
+
+Lines of a flow run in order on one replay worker; each ``client`` in a flow
+has its own cookie jar. ``${name}`` placeholders in path, query and JSON
+strings are filled from the flow's variables, which start with ``run`` and
+``password`` and grow through ``capture`` (variable -> dotted path into the
+JSON response). ``at`` is the offset in seconds from the flow's first request.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from string import Template
+
+from flask import request, session
+
+# Request body fields never written verbatim to a recorded trace
+SECRET_FIELDS = frozenset({'password', 'current_password', 'new_password'})
+
+
+def read_trace(path):
+    """Group the lines of a trace file into flows, preserving file order"""
+    flows = {}
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                step = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: invalid JSON ({e})") from None
+            flows.setdefault(step.get('flow', f'line-{number}'), []).append(step)
+    return list(flows.values())
+
+
+def write_trace(flows, path):
+    """Write flows (lists of steps) as JSONL; returns the number of requests"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for flow in flows:
+            for step in flow:
+                f.write(json.dumps(step, separators=(',', ':')) + '\n')
+                count += 1
+    return count
+
+
+def substitute(value, variables):
+    """Fill ``${name}`` placeholders in every string inside value.
+
+    A string that is exactly one placeholder takes the variable's own type,
+    so ``"${p2_id}"`` becomes the integer id rather than its text.
+    """
+    if isinstance(value, str):
+        if value.startswith('${') and value.endswith('}') and value[2:-1] in variables:
+            return variables[value[2:-1]]
+        try:
+            return Template(value).substitute(variables)
+        except ValueError:
+            # a literal "$" that isn't a placeholder (recorded user input)
+            return value
+    if isinstance(value, dict):
+        return {key: substitute(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, variables) for item in value]
+    return value
+
+
+def extract(document, dotted_path):
+    """Follow ``a.b.0.c`` through dicts and lists; KeyError if it isn't there"""
+    value = document
+    for part in dotted_path.split('.'):
+        if isinstance(value, list):
+            value = value[int(part)]
+        elif isinstance(value, dict):
+            value = value[part]
+        else:
+            raise KeyError(dotted_path)
+    return value
+
+
+class TraceRecorder:
+    """Appends every request the app serves to a JSONL trace.
+
+    Flows are keyed by the (hashed) server-side session id, which survives
+    login, so register -> login -> play stays one flow. Password fields are
+    replaced with ``${password}`` so a recording can be replayed without
+    containing real credentials. Meant for staging and load-test
+    environments, not production.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._flow_started = {}
+        self._file = None
+
+    def record(self, flow, step):
+        now = time.monotonic()
+        with self._lock:
+            started = self._flow_started.setdefault(flow, now)
+            step = dict(step, flow=flow, at=round(now - started, 4))
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+            self._file.write(json.dumps(step, separators=(',', ':'), default=str) + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _scrub(body):
+    if isinstance(body, dict):
+        return {key: '${password}' if key in SECRET_FIELDS else _scrub(value)
+                for key, value in body.items()}
+    if isinstance(body, list):
+        return [_scrub(item) for item in body]
+    return body
+
+
+def init_trace_recording(app):
+    """Record served requests to BENCH_RECORD_PATH (no-op when unset)"""
+    path = app.config.get('BENCH_RECORD_PATH')
+    if not path:
+        return app
+    recorder = TraceRecorder(path)
+    app.extensions['trace_recorder'] = recorder
+
+    @app.after_request
+    def record_request(response):
+        if request.path.startswith(('/admin', '/metrics', '/health')):
+            return response
+        sid = getattr(session, 'sid', None)
+        flow = ('session-' + hashlib.sha1(sid.encode()).hexdigest()[:12]
+                if sid else f"addr-{request.remote_addr}")
+        step = {
+            'client': 'c',
+            'name': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'expect': [response.status_code]
+        }
+        if request.args:
+            step['query'] = request.args.to_dict(flat=True)
+        if request.is_json:
+            step['json'] = _scrub(request.get_json(silent=True))
+        recorder.record(flow, step)
+        return response
+
+    return app
@@ -12,6 +12,9 @@ DB_CONFIG = {
     "port": os.getenv("DB_PORT", "5432"),
 }
 
+# Where db/archive.py writes finished games moved out of the hot tables
+GAME_ARCHIVE_DIR = os.getenv("GAME_ARCHIVE_DIR", "archive/games")
+
 class Config:
     # Basic Flask configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-please-change-in-production')
@@ -28,14 +31,63 @@ class Config:
     # SQLAlchemy configuration
     SQLALCHEMY_DATABASE_URI = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    
+
+    # One pool per worker process, shared by get_connection() and db_session.
+    # Workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) must fit in max_connections.
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+    # ASGI mode (asgi.py): asyncpg pool per worker for the coroutine endpoints,
+    # on top of the pool above, which the Flask routes keep using
+    ASYNC_DB_POOL_MIN_SIZE = int(os.getenv('ASYNC_DB_POOL_MIN_SIZE', '5'))
+    ASYNC_DB_POOL_MAX_SIZE = int(os.getenv('ASYNC_DB_POOL_MAX_SIZE', '20'))
+    # Long polls: longest hold in seconds, and how often the state is re-read
+    GAME_WAIT_TIMEOUT = 25
+    GAME_POLL_INTERVAL = 0.5
+    MATCHMAKING_WAIT_TIMEOUT = 25
+    MATCHMAKING_POLL_INTERVAL = 1.0
+
+    # Let PostgreSQL render list endpoints' JSON (json_agg) and pass the text
+    # through untouched, instead of building one Python object per row
+    DB_JSON_RESPONSES = os.getenv('DB_JSON_RESPONSES', 'false').lower() == 'true'
+
+    # Streamed list responses: rows fetched per server-side cursor round
+    # trip, and the largest leaderboard a streamed request may ask for
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', '1000'))
+    LEADERBOARD_STREAM_MAX_LIMIT = 10000
+
     # Session configuration
-    SESSION_TYPE = 'filesystem'
+    # Sessions live in an in-process LRU in front of a shared store (Redis when
+    # SESSION_REDIS_URL is set, process memory otherwise)
+    SESSION_TYPE = 'tiered'
+    SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL')
+    SESSION_LRU_SIZE = 10000
+    SESSION_LRU_TTL = 30
+    # Reads extend the stored session's TTL and check it still exists at
+    # most this often (seconds), per session and worker
+    SESSION_REFRESH_INTERVAL = 5
+    # Session tokens are re-checked against user_sessions in batches
+    SESSION_VALIDATE_TOKENS = True
+    SESSION_VALIDATE_INTERVAL = 5
+    SESSION_REVALIDATE_AFTER = 60
+    SESSION_CLEANUP_INTERVAL = 300
     PERMANENT_SESSION_LIFETIME = timedelta(days=1)
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
+    # Password hashing: werkzeug method string sets the KDF cost (e.g.
+    # "scrypt:32768:8:1" or "pbkdf2:sha256:600000"); hashes made with other
+    # parameters are upgraded on the next successful login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_MAX_PENDING = 32
+    PASSWORD_HASH_TIMEOUT = 5
+
     # Security headers
     SECURITY_HEADERS = {
         'Strict-Transport-Security': 'max-age=31536000; includeSubDomains',
@@ -56,16 +108,71 @@ class Config:
     # Cache configuration
     CACHE_TYPE = "SimpleCache"
     CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_KEY_PREFIX = "dbback:"
+    # Per-endpoint response TTLs in seconds, keyed by endpoint name
+    CACHE_TIMEOUTS = {
+        'category.list_categories': 300,
+        'leaderboard.get_global_leaderboard': 30,
+        'leaderboard.get_category_leaderboard': 30,
+        'leaderboard.get_daily_leaderboard': 60,
+        'leaderboard.get_user_ranking_history': 60,
+        'leaderboard.get_category_statistics': 300,
+        'leaderboard.get_top_players': 30,
+        'leaderboard.get_player_stats': 30,
+        'leaderboard.get_leaderboard_stats': 60,
+        'user.get_leaderboard': 30
+    }
+    # Shared store for resource version counters (ETags, cache tags); defaults
+    # to CACHE_REDIS_URL under RedisCache and to process memory otherwise
+    VERSION_STORE_URL = os.getenv('VERSION_STORE_URL')
+    # Without a shared store each worker counts only its own writes; stamps
+    # roll over this often (seconds) so other workers' ETags go stale quickly
+    VERSION_LOCAL_TTL = int(os.getenv('VERSION_LOCAL_TTL', 5))
     
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    LOG_FILE = 'logs/app.log'
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT = 10
+    LOG_QUEUE_SIZE = 10000
+    LOG_BATCH_SIZE = 256
+    LOG_FLUSH_INTERVAL = 1.0
+    # Access log: errors and slow requests are always written, the rest sampled
+    REQUEST_LOG_SAMPLE_RATE = float(os.getenv('REQUEST_LOG_SAMPLE_RATE', '0.1'))
+    REQUEST_LOG_SLOW_MS = 500
+    REQUEST_LOG_HEADERS = True
+
+    # Query instrumentation: statements slower than the threshold land in the
+    # slow-query log; EXPLAIN ANALYZE re-runs them, so it is opt-in
+    SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+    SLOW_QUERY_LOG_SIZE = 200
+    SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'
+    SLOW_QUERY_EXPLAIN_INTERVAL = 60
+    SLOW_QUERY_CAPTURE_PARAMS = True
+    QUERY_REPORT_PATH = 'logs/query_report.json'
+
+    # /metrics: with gunicorn point PROMETHEUS_MULTIPROC_DIR at a tmpfs
+    # directory (emptied on deploy) so every worker's metrics are merged
+    METRICS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    METRICS_PUBLISH_INTERVAL = 5.0
+    METRICS_DB_GAUGE_TTL = 10
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+    # Admin profiler: longest sampling session and cProfile captures kept
+    PROFILER_MAX_SECONDS = 60
+    PROFILER_MAX_CAPTURES = 20
+
+    # Write every served request to this JSONL trace for `python -m bench replay`
+    BENCH_RECORD_PATH = os.getenv('BENCH_RECORD_PATH')
 
 class DevelopmentConfig(Config):
     DEBUG = True
     SESSION_COOKIE_SECURE = False
     CACHE_TYPE = "SimpleCache"
     LOG_LEVEL = 'DEBUG'
+    REQUEST_LOG_SAMPLE_RATE = 1.0
+    SLOW_QUERY_EXPLAIN = True
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -73,6 +180,7 @@ class ProductionConfig(Config):
     CACHE_TYPE = "RedisCache"
     CACHE_REDIS_URL = os.getenv('REDIS_URL')
     RATELIMIT_STORAGE_URL = os.getenv('REDIS_URL')
+    SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL', os.getenv('REDIS_URL'))
 
 class TestingConfig(Config):
     TESTING = True
@@ -84,10 +192,26 @@ class TestingConfig(Config):
     POSTGRES_PORT = os.getenv('TEST_DB_PORT', '5432')
     WTF_CSRF_ENABLED = False
     CACHE_TYPE = "NullCache"
+    SESSION_REDIS_URL = None
+    SESSION_VALIDATE_INTERVAL = 0
+    SESSION_CLEANUP_INTERVAL = 0
+    PASSWORD_HASH_WORKERS = 0
+    QUERY_REPORT_PATH = None
+
+class BenchmarkConfig(Config):
+    """Production-like settings for `python -m bench`, minus Redis and TLS"""
+    DEBUG = False
+    SESSION_COOKIE_SECURE = False
+    CACHE_TYPE = "SimpleCache"
+    SESSION_REDIS_URL = None
+    REQUEST_LOG_SAMPLE_RATE = 0.0
+    QUERY_REPORT_PATH = 'bench/results/query_report.json'
+    BENCH_RECORD_PATH = None
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'benchmark': BenchmarkConfig,
     'default': DevelopmentConfig
 }
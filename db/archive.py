@@ -0,0 +1,293 @@
+"""Cold storage for finished games (migration 012).
+
+``archive_games`` moves completed and cancelled games that ended more than
+``older_than_days`` ago out of the hot tables, one batch per file. A file is
+gzip-compressed JSON laid out by column: for each table, its column names and
+one array of values per column, which compresses much better than row
+objects. Each batch is written, read back and checked against the rows that
+were fetched, then deleted in the transaction that adds its catalog row; a
+mismatch anywhere rolls the delete back and removes the file.
+
+``archived_history`` is the read side behind ``Game.history``.
+"""
+import gzip
+import json
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from config import GAME_ARCHIVE_DIR
+from db.connection import get_connection
+from utils.exceptions import ArchiveError
+from utils.lru import LRUCache
+
+FORMAT_VERSION = 1
+
+# Archived files never change, so a decoded one stays valid until evicted
+_files = LRUCache(maxsize=64, name='archive_files')
+
+BATCH_SQL = """
+    SELECT id, created_at FROM games
+    WHERE status IN ('completed', 'cancelled')
+      AND COALESCE(end_time, start_time) < %(cutoff)s
+      AND created_at < %(cutoff)s
+      AND id > %(after)s
+    ORDER BY id
+    LIMIT %(limit)s
+    FOR UPDATE SKIP LOCKED
+"""
+
+# (table, select, delete), children first so the deletes never trip a foreign
+# key. The created_at range keeps every statement to the batch's partitions.
+ARCHIVED_TABLES = (
+    ('round_answers', """
+        SELECT ra.* FROM round_answers ra
+        JOIN game_rounds gr ON gr.id = ra.round_id AND gr.game_created_at = ra.game_created_at
+        WHERE gr.game_id = ANY(%(ids)s)
+          AND gr.game_created_at BETWEEN %(first)s AND %(last)s
+          AND ra.game_created_at BETWEEN %(first)s AND %(last)s
+        ORDER BY ra.id
+    """, """
+        DELETE FROM round_answers ra USING game_rounds gr
+        WHERE gr.id = ra.round_id AND gr.game_created_at = ra.game_created_at
+          AND gr.game_id = ANY(%(ids)s)
+          AND gr.game_created_at BETWEEN %(first)s AND %(last)s
+          AND ra.game_created_at BETWEEN %(first)s AND %(last)s
+    """),
+    ('game_rounds', """
+        SELECT * FROM game_rounds
+        WHERE game_id = ANY(%(ids)s) AND game_created_at BETWEEN %(first)s AND %(last)s
+        ORDER BY id
+    """, """
+        DELETE FROM game_rounds
+        WHERE game_id = ANY(%(ids)s) AND game_created_at BETWEEN %(first)s AND %(last)s
+    """),
+    ('game_participants', """
+        SELECT * FROM game_participants WHERE game_id = ANY(%(ids)s) ORDER BY game_id, user_id
+    """, """
+        DELETE FROM game_participants WHERE game_id = ANY(%(ids)s)
+    """),
+    ('user_games', """
+        SELECT * FROM user_games WHERE game_id = ANY(%(ids)s) ORDER BY game_id, user_id
+    """, """
+        DELETE FROM user_games WHERE game_id = ANY(%(ids)s)
+    """),
+    ('games', """
+        SELECT * FROM games
+        WHERE id = ANY(%(ids)s) AND created_at BETWEEN %(first)s AND %(last)s
+        ORDER BY id
+    """, """
+        DELETE FROM games
+        WHERE id = ANY(%(ids)s) AND created_at BETWEEN %(first)s AND %(last)s
+    """),
+)
+
+CATALOG_SQL = """
+    INSERT INTO game_archive_files (path, first_game_id, last_game_id, min_end_time, max_end_time,
+                                    row_counts, user_ids, completed_counts)
+    VALUES (%s, %s, %s, %s, %s, %s, %s::BIGINT[], %s::INTEGER[])
+"""
+
+# Same order as models.game_model.USER_GAME_COLUMNS
+HISTORY_COLUMNS = ('game_id', 'game_type', 'game_status', 'start_time', 'end_time', 'duration_seconds',
+                   'your_score', 'your_status', 'opponent_id', 'opponent_username',
+                   'opponent_score', 'opponent_status')
+
+
+def file_name(first_id: int, last_id: int) -> str:
+    return f"games_{first_id:012d}_{last_id:012d}.json.gz"
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot archive {type(value).__name__}")
+
+
+def _fetch_columns(cur, query, params):
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    names = [column[0] for column in cur.description]
+    values = [list(column) for column in zip(*rows)] if rows else [[] for _ in names]
+    return {'columns': names, 'rows': len(rows), 'values': values}
+
+
+def write_file(path: str, document) -> None:
+    """Write ``document`` to ``path`` atomically and make it durable"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            f.write(json.dumps(document, default=_encode, separators=(',', ':')).encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_file(path: str):
+    with gzip.open(path, 'rb') as f:
+        return json.loads(f.read())
+
+
+def verify_file(path: str, tables) -> None:
+    """Re-read an archive and check every table holds what was fetched"""
+    stored = read_file(path)['tables']
+    for name, table in tables.items():
+        if name not in stored:
+            raise ArchiveError(f"{path}: {name} is missing")
+        copy = stored[name]
+        if copy['rows'] != table['rows'] or copy['columns'] != table['columns']:
+            raise ArchiveError(f"{path}: {name} has {copy['rows']} rows, expected {table['rows']}")
+        if any(len(values) != table['rows'] for values in copy['values']):
+            raise ArchiveError(f"{path}: {name} has a short column")
+    ids = stored['games']['values'][stored['games']['columns'].index('id')]
+    if ids != tables['games']['values'][tables['games']['columns'].index('id')]:
+        raise ArchiveError(f"{path}: game ids do not match")
+
+
+def _completed_summary(user_games):
+    """Per-user completed game counts and the end_time range they cover"""
+    columns = dict(zip(user_games['columns'], user_games['values']))
+    counts = Counter()
+    end_times = []
+    for user_id, status, end_time in zip(columns.get('user_id', []), columns.get('game_status', []),
+                                         columns.get('end_time', [])):
+        if status == 'completed':
+            counts[user_id] += 1
+            if end_time is not None:
+                end_times.append(end_time)
+    user_ids = sorted(counts)
+    return (user_ids, [counts[user_id] for user_id in user_ids],
+            min(end_times, default=None), max(end_times, default=None))
+
+
+def archive_batch(cur, games, directory: str = GAME_ARCHIVE_DIR):
+    """Write, verify and delete one batch of ``(id, created_at)`` games;
+    returns the per-table row counts. The caller commits."""
+    ids = [game_id for game_id, _ in games]
+    params = {'ids': ids, 'first': min(c for _, c in games), 'last': max(c for _, c in games)}
+    tables = {name: _fetch_columns(cur, select, params) for name, select, _ in ARCHIVED_TABLES}
+    counts = {name: table['rows'] for name, table in tables.items()}
+    if counts['games'] != len(ids):
+        raise ArchiveError(f"Expected {len(ids)} games, fetched {counts['games']}")
+
+    name = file_name(ids[0], ids[-1])
+    path = os.path.join(directory, name)
+    write_file(path, {
+        'format': FORMAT_VERSION,
+        'first_game_id': ids[0],
+        'last_game_id': ids[-1],
+        'created_at': datetime.now(),
+        'tables': tables,
+    })
+    try:
+        verify_file(path, tables)
+        for table, _, delete in ARCHIVED_TABLES:
+            cur.execute(delete, params)
+            if cur.rowcount != counts[table]:
+                raise ArchiveError(f"{table}: deleted {cur.rowcount} rows, archived {counts[table]}")
+        user_ids, completed, min_end, max_end = _completed_summary(tables['user_games'])
+        cur.execute(CATALOG_SQL, (name, ids[0], ids[-1], min_end, max_end,
+                                  json.dumps(counts), user_ids, completed))
+    except Exception:
+        os.remove(path)
+        raise
+    return counts
+
+
+def archive_games(older_than_days: int = 180, batch_size: int = 1000,
+                  directory: str = GAME_ARCHIVE_DIR, log=print):
+    """Move finished games older than ``older_than_days`` into archive files,
+    committing once per batch"""
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    totals = Counter()
+    files = 0
+    after = 0
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        while True:
+            cur.execute(BATCH_SQL, {'cutoff': cutoff, 'after': after, 'limit': batch_size})
+            games = cur.fetchall()
+            if not games:
+                break
+            try:
+                counts = archive_batch(cur, games, directory)
+            except Exception:
+                conn.rollback()
+                raise
+            # Not inside the try: if the commit outcome is unknown the file
+            # has to stay, since the rows may already be gone
+            conn.commit()
+            totals.update(counts)
+            files += 1
+            after = games[-1][0]
+            log(f"archived games {games[0][0]}..{after} ({counts['games']} games)")
+        return {'files': files, **totals}
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _completed_by_user(directory: str, name: str):
+    """``{user_id: [history row, ...]}`` for one file, newest first"""
+    by_user = _files.get(name)
+    if by_user is not None:
+        return by_user
+    table = read_file(os.path.join(directory, name))['tables']['user_games']
+    columns = dict(zip(table['columns'], table['values']))
+    by_user = {}
+    for i in range(table['rows']):
+        if columns['game_status'][i] != 'completed':
+            continue
+        row = [columns[column][i] for column in HISTORY_COLUMNS]
+        for index in (3, 4):
+            if row[index] is not None:
+                row[index] = datetime.fromisoformat(row[index])
+        by_user.setdefault(columns['user_id'][i], []).append(tuple(row))
+    for rows in by_user.values():
+        rows.sort(key=lambda row: (row[4], row[0]), reverse=True)
+    _files.set(name, by_user)
+    return by_user
+
+
+def archived_history(cur, user_id: int, limit: int, after=None, directory: str = GAME_ARCHIVE_DIR):
+    """Up to ``limit`` archived completed games for a user, newest first,
+    after the ``(end_time, id)`` keyset position if given. Rows come back in
+    ``USER_GAME_COLUMNS`` order."""
+    if limit <= 0 or not os.path.isdir(directory):
+        return []
+    query = """
+        SELECT path, max_end_time FROM game_archive_files
+        WHERE user_ids @> ARRAY[%(user_id)s]::BIGINT[]
+          {after}
+        ORDER BY max_end_time DESC
+    """
+    params = {'user_id': user_id}
+    if after is not None:
+        query = query.format(after='AND min_end_time <= %(after_end)s')
+        params['after_end'] = after[0]
+    else:
+        query = query.format(after='')
+    cur.execute(query, params)
+
+    found = []
+    for name, max_end in cur.fetchall():
+        # Files are visited newest first; once one ends before the page's
+        # oldest row, neither it nor any later file can contribute
+        if len(found) >= limit and max_end < found[limit - 1][4]:
+            break
+        for row in _completed_by_user(directory, name).get(user_id, ()):
+            if after is None or (row[4], row[0]) < after:
+                found.append(row)
+        found.sort(key=lambda row: (row[4], row[0]), reverse=True)
+    return found[:limit]
@@ -0,0 +1,110 @@
+import json
+import re
+import time
+from contextlib import asynccontextmanager
+
+from config import DB_CONFIG
+from db.instrumentation import (connection_wait, connections_opened, query_errors,
+                                query_stats, statement_name)
+
+# Pool for the ASGI serving mode (asgi.py). asyncpg is imported when the
+# pool is opened, so the WSGI app does not need it installed.
+_pool = None
+
+_PLACEHOLDER = re.compile(r"%%|%s")
+
+
+def to_asyncpg(sql):
+    """Rewrite psycopg2 ``%s`` placeholders as asyncpg ``$1, $2, ...`` so
+    statements can be shared between the two drivers"""
+    counter = iter(range(1, 1 << 16))
+    return _PLACEHOLDER.sub(lambda m: '%' if m.group() == '%%' else f"${next(counter)}", sql)
+
+
+async def _init_connection(conn):
+    connections_opened.inc(source='asyncpg')
+    # Match psycopg2, which hands JSON columns back already decoded
+    for name in ('json', 'jsonb'):
+        await conn.set_type_codec(name, encoder=json.dumps, decoder=json.loads,
+                                  schema='pg_catalog')
+
+
+async def open_pool(min_size=5, max_size=20, timeout=30):
+    """Create this event loop's pool; called from the ASGI lifespan startup"""
+    global _pool
+    if _pool is None:
+        import asyncpg
+        _pool = await asyncpg.create_pool(
+            database=DB_CONFIG['dbname'],
+            user=DB_CONFIG['user'],
+            password=DB_CONFIG['password'],
+            host=DB_CONFIG['host'],
+            port=int(DB_CONFIG['port']),
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            init=_init_connection
+        )
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+
+def get_pool():
+    if _pool is None:
+        raise RuntimeError("Async pool is not open; serve through asgi.py")
+    return _pool
+
+
+class _Timed:
+    """Acquire a pooled connection and time statements on it the same way
+    InstrumentedCursor does for psycopg2"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def _run(self, method, sql, args):
+        name = statement_name(sql)
+        started = time.perf_counter()
+        try:
+            result = await getattr(self._conn, method)(sql, *args)
+        except Exception:
+            query_errors.inc(statement=name)
+            query_stats.record(name, sql, args, time.perf_counter() - started, -1)
+            raise
+        rows = len(result) if isinstance(result, list) else 1 if result is not None else 0
+        query_stats.record(name, sql, args, time.perf_counter() - started, rows)
+        return result
+
+    async def fetch(self, sql, *args):
+        return await self._run('fetch', sql, args)
+
+    async def fetchrow(self, sql, *args):
+        return await self._run('fetchrow', sql, args)
+
+    async def fetchval(self, sql, *args):
+        return await self._run('fetchval', sql, args)
+
+    async def execute(self, sql, *args):
+        return await self._run('execute', sql, args)
+
+    def transaction(self):
+        return self._conn.transaction()
+
+
+@asynccontextmanager
+async def acquire():
+    """``async with acquire() as conn:`` — a timed connection from the pool"""
+    pool = get_pool()
+    started = time.perf_counter()
+    conn = await pool.acquire()
+    connection_wait.observe(time.perf_counter() - started)
+    try:
+        yield _Timed(conn)
+    finally:
+        await pool.release(conn)
@@ -1,5 +1,28 @@
+import time
+
 import psycopg2
 from config import DB_CONFIG
+from db.database import get_engine
+from db.instrumentation import InstrumentedCursor, connection_wait, connections_opened
 
 def get_connection():
-    return psycopg2.connect(**DB_CONFIG)
+    """A psycopg2 connection from the shared pool (see db/database.py).
+
+    Use it like a plain connection; ``close()`` returns it to the pool,
+    rolling back anything left uncommitted.
+    """
+    started = time.perf_counter()
+    conn = get_engine().raw_connection()
+    connection_wait.observe(time.perf_counter() - started)
+    conn.dbapi_connection.cursor_factory = InstrumentedCursor
+    return conn
+
+
+def connect_direct():
+    """An unpooled connection, for maintenance work that changes session
+    state (autocommit, long DDL) and should not hand it on to requests"""
+    started = time.perf_counter()
+    conn = psycopg2.connect(**DB_CONFIG, cursor_factory=InstrumentedCursor)
+    connection_wait.observe(time.perf_counter() - started)
+    connections_opened.inc(source='psycopg2')
+    return conn
@@ -1,23 +1,110 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from config import config
+"""The process's single database pool.
+
+Both data-access styles draw from one SQLAlchemy engine:
+
+- ``get_connection()`` (db/connection.py) checks out a raw psycopg2
+  connection; ``close()`` hands it back to the pool
+- ``db_session`` is a thread-scoped ORM Session, removed at the end of
+  each request
 
-# Get database URL from config
-database_url = config['default'].SQLALCHEMY_DATABASE_URI
+Raw cursors are timed by ``InstrumentedCursor`` and engine statements by the
+events in ``instrument_engine``, so every statement is reported once, under
+the same names, whichever path issued it. Pool size, overflow, timeout and
+recycle come from the ``DB_POOL_*`` settings.
+"""
+import os
+import threading
 
-# Create engine
-engine = create_engine(database_url)
+import psycopg2
+from psycopg2.extensions import cursor as _cursor
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import scoped_session, sessionmaker
+from config import DB_CONFIG, config
+from db.instrumentation import instrument_engine
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Bound to the engine when it is first created
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+db_session = scoped_session(lambda: SessionLocal(bind=get_engine()))
 
 # Create declarative base
 Base = declarative_base()
 
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+_pool_options = None
+
+
+def pool_options(settings):
+    """Engine pool arguments from a config object or mapping"""
+    get = settings.get if isinstance(settings, dict) else lambda key, default=None: getattr(settings, key, default)
+    return {
+        'pool_size': get('DB_POOL_SIZE', 5),
+        'max_overflow': get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': get('DB_POOL_PRE_PING', True),
+    }
+
+
+def _connect():
+    return psycopg2.connect(**DB_CONFIG)
+
+
+def _reset_cursor_factory(dbapi_connection, connection_record):
+    # get_connection() switches raw checkouts to InstrumentedCursor; the
+    # engine's own cursors must not be timed a second time
+    if dbapi_connection is not None:
+        dbapi_connection.cursor_factory = _cursor
+
+
+def get_engine():
+    """The process's engine, created on first use.
+
+    A forked worker gets a fresh engine instead of sharing the parent's
+    pooled sockets.
+    """
+    global _engine, _engine_pid
+    if _engine is None or _engine_pid != os.getpid():
+        with _engine_lock:
+            if _engine is None or _engine_pid != os.getpid():
+                if _engine is not None:
+                    # Inherited from the parent: drop the pool without closing its connections
+                    _engine.dispose(close=False)
+                options = _pool_options or pool_options(config['default'])
+                engine = create_engine('postgresql+psycopg2://', creator=_connect, **options)
+                event.listen(engine.pool, 'checkin', _reset_cursor_factory)
+                _engine = instrument_engine(engine)
+                _engine_pid = os.getpid()
+                SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def __getattr__(name):
+    # ``from db.database import engine`` keeps working without creating the
+    # engine at import time
+    if name == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def init_db(app):
+    """Take pool settings from the app config and release the request's
+    session when its app context ends. Does not connect."""
+    global _pool_options
+    _pool_options = pool_options(app.config)
+
+    @app.teardown_appcontext
+    def remove_session(exception=None):
+        db_session.remove()
+
+    return app
+
+
 def get_db():
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
@@ -0,0 +1,320 @@
+import atexit
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from psycopg2.extensions import cursor as _cursor
+
+from utils.lru import LRUCache
+from utils.metrics import counter, gauge, histogram, quantile
+
+query_duration = histogram(
+    'db_query_duration_seconds',
+    'SQL statement execution time by statement name',
+    ('statement',)
+)
+query_rows = counter(
+    'db_query_rows_total',
+    'Rows returned or affected by statement name',
+    ('statement',)
+)
+query_errors = counter(
+    'db_query_errors_total',
+    'Statements that raised by statement name',
+    ('statement',)
+)
+connection_wait = histogram(
+    'db_connection_wait_seconds',
+    'Time spent obtaining a database connection'
+)
+connections_opened = counter(
+    'db_connections_opened_total',
+    'New database connections by source',
+    ('source',)
+)
+pool_connections = gauge(
+    'db_pool_connections',
+    'Pooled database connections by state',
+    ('pool', 'state')
+)
+
+# SQL text -> statement name: registered by load_queries (a fixed set), and
+# remembered per call site for everything else. Inline SQL built with
+# f-strings can produce any number of distinct strings, so the call-site
+# names are an LRU
+_statement_names = {}
+_call_site_names = LRUCache(maxsize=4096)
+_thread_counts = threading.local()
+_SKIP_MODULES = ('db.instrumentation', 'db.async_pool', 'psycopg2', 'sqlalchemy')
+
+
+def register_statement(name, sql):
+    """Name a SQL string so its timings are reported under that name"""
+    _statement_names[sql] = name
+
+
+def statement_name(sql):
+    """Return the registered name for sql, or the model function that issued it"""
+    name = _statement_names.get(sql)
+    if name is None and isinstance(sql, str):
+        name = _call_site_names.get(sql)
+    if name is not None:
+        return name
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith(_SKIP_MODULES):
+            name = f"{module}.{frame.f_code.co_name}"
+            break
+        frame = frame.f_back
+    else:
+        name = 'unknown'
+    if isinstance(sql, str):
+        _call_site_names.set(sql, name)
+    return name
+
+
+def queries_on_thread():
+    """Statements executed so far on the current thread (diff it around a request)"""
+    return getattr(_thread_counts, 'queries', 0)
+
+
+def redact(value, depth=0):
+    """Keep the shape of a query parameter without leaking its content"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return f'<str:{len(value)}>'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f'<bytes:{len(value)}>'
+    if isinstance(value, dict):
+        return {key: redact(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)) and depth < 2:
+        items = [redact(item, depth + 1) for item in list(value)[:10]]
+        if len(value) > 10:
+            items.append(f'<+{len(value) - 10} more>')
+        return items
+    return f'<{type(value).__name__}>'
+
+
+class QueryStats:
+    """Process-wide settings and rolling slow-query log for instrumented cursors"""
+
+    def __init__(self, slow_ms=200, log_size=200, explain=False, explain_interval=60,
+                 capture_params=True):
+        self._lock = threading.Lock()
+        self._last_explain = {}
+        self.configure(slow_ms, log_size, explain, explain_interval, capture_params)
+
+    def configure(self, slow_ms=200, log_size=200, explain=False, explain_interval=60,
+                  capture_params=True):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.capture_params = capture_params
+        self.slow_queries = collections.deque(maxlen=log_size)
+
+    def record(self, name, sql, params, elapsed, rows, connection=None):
+        _thread_counts.queries = getattr(_thread_counts, 'queries', 0) + 1
+        query_duration.observe(elapsed, statement=name)
+        if rows and rows > 0:
+            query_rows.inc(rows, statement=name)
+        duration_ms = elapsed * 1000
+        if duration_ms < self.slow_ms:
+            return
+        entry = {
+            'statement': name,
+            'duration_ms': round(duration_ms, 2),
+            'rows': rows,
+            'at': datetime.now(timezone.utc).isoformat(),
+            'sql': _to_text(sql),
+            'params': redact(params) if self.capture_params else None
+        }
+        if connection is not None and self._should_explain(name, entry['sql']):
+            entry['plan'] = _explain(connection, sql, params)
+        with self._lock:
+            self.slow_queries.append(entry)
+
+    def _should_explain(self, name, sql):
+        # EXPLAIN ANALYZE runs the statement again, so only plain SELECTs: a
+        # WITH can wrap an INSERT/UPDATE/DELETE. Capture at most one plan
+        # per statement per interval
+        if not self.explain or not sql.lstrip().upper().startswith('SELECT'):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_explain.get(name)
+            if last is not None and now - last < self.explain_interval:
+                return False
+            self._last_explain[name] = now
+        return True
+
+    def statements(self):
+        """Latency and row totals per statement, slowest total time first"""
+        report = []
+        for labels, summary in query_duration.samples():
+            name = labels['statement']
+            count = summary['count']
+            report.append({
+                'statement': name,
+                'calls': count,
+                'total_ms': round(summary['sum'] * 1000, 2),
+                'mean_ms': round(summary['sum'] * 1000 / count, 2) if count else 0,
+                'p50_ms': round(quantile(summary, 0.50) * 1000, 2),
+                'p95_ms': round(quantile(summary, 0.95) * 1000, 2),
+                'p99_ms': round(quantile(summary, 0.99) * 1000, 2),
+                'rows': query_rows.value(statement=name),
+                'errors': query_errors.value(statement=name)
+            })
+        report.sort(key=lambda item: item['total_ms'], reverse=True)
+        return report
+
+    def report(self):
+        wait = connection_wait.value()
+        with self._lock:
+            slow = list(self.slow_queries)
+        return {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'pid': os.getpid(),
+            'slow_threshold_ms': self.slow_ms,
+            'connection_wait': {
+                'count': wait['count'],
+                'total_ms': round(wait['sum'] * 1000, 2),
+                'p95_ms': round(quantile(wait, 0.95) * 1000, 2)
+            },
+            'statements': self.statements(),
+            'slow_queries': slow
+        }
+
+    def write_report(self, path):
+        """Write the report as JSON, one file per worker process"""
+        root, ext = os.path.splitext(path)
+        target = f"{root}.{os.getpid()}{ext or '.json'}"
+        directory = os.path.dirname(target)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = target + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, default=str)
+        os.replace(tmp, target)
+        return target
+
+
+query_stats = QueryStats()
+
+
+def _to_text(sql):
+    if isinstance(sql, bytes):
+        return sql.decode('utf-8', 'replace')
+    return str(sql)
+
+
+def _explain(connection, sql, params):
+    """Plan of a slow SELECT, run inside a savepoint that is rolled back so
+    neither its effects (a SELECT can call functions that write) nor its
+    failure reach the caller's transaction"""
+    savepoint = not connection.autocommit
+    with connection.cursor(cursor_factory=_cursor) as cur:
+        if savepoint:
+            cur.execute('SAVEPOINT query_stats_explain')
+        try:
+            cur.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT TEXT) ' + _to_text(sql), params)
+            return '\n'.join(row[0] for row in cur.fetchall())
+        except Exception as e:
+            return f'EXPLAIN failed: {e}'
+        finally:
+            if savepoint:
+                cur.execute('ROLLBACK TO SAVEPOINT query_stats_explain')
+                cur.execute('RELEASE SAVEPOINT query_stats_explain')
+
+
+class InstrumentedCursor(_cursor):
+    """psycopg2 cursor that times every execute() under its statement name"""
+
+    def execute(self, query, vars=None):
+        name = statement_name(query)
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            query_errors.inc(statement=name)
+            query_stats.record(name, query, vars, time.perf_counter() - started, -1)
+            raise
+        query_stats.record(name, query, vars, time.perf_counter() - started,
+                           self.rowcount, self.connection)
+        return result
+
+    def executemany(self, query, vars_list):
+        name = statement_name(query)
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        except Exception:
+            query_errors.inc(statement=name)
+            raise
+        finally:
+            query_stats.record(name, query, None, time.perf_counter() - started, self.rowcount)
+
+
+def instrument_engine(engine):
+    """Time SQLAlchemy statements through the same histograms as raw cursors
+    and track the engine's pool occupancy, which covers get_connection()
+    checkouts too"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(
+            (statement_name(statement), time.perf_counter())
+        )
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        name, started = conn.info['query_started'].pop()
+        query_stats.record(name, statement, parameters, time.perf_counter() - started,
+                           cursor.rowcount)
+
+    @event.listens_for(engine.pool, 'connect')
+    def pool_connect(dbapi_connection, connection_record):
+        connections_opened.inc(source='pool')
+        pool_connections.inc(pool='db', state='open')
+
+    @event.listens_for(engine.pool, 'close')
+    def pool_close(dbapi_connection, connection_record):
+        pool_connections.dec(pool='db', state='open')
+
+    @event.listens_for(engine.pool, 'checkout')
+    def pool_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_connections.inc(pool='db', state='checked_out')
+
+    @event.listens_for(engine.pool, 'checkin')
+    def pool_checkin(dbapi_connection, connection_record):
+        pool_connections.dec(pool='db', state='checked_out')
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        pending = context.connection.info.get('query_started') if context.connection else None
+        if pending:
+            name, _ = pending.pop()
+            query_errors.inc(statement=name)
+
+    return engine
+
+
+def init_query_instrumentation(app):
+    """Configure the slow-query log from SLOW_QUERY_* settings"""
+    query_stats.configure(
+        slow_ms=app.config.get('SLOW_QUERY_THRESHOLD_MS', 200),
+        log_size=app.config.get('SLOW_QUERY_LOG_SIZE', 200),
+        explain=app.config.get('SLOW_QUERY_EXPLAIN', False),
+        explain_interval=app.config.get('SLOW_QUERY_EXPLAIN_INTERVAL', 60),
+        capture_params=app.config.get('SLOW_QUERY_CAPTURE_PARAMS', True)
+    )
+    report_path = app.config.get('QUERY_REPORT_PATH')
+    if report_path:
+        atexit.register(query_stats.write_report, report_path)
+    return app
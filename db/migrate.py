@@ -0,0 +1,316 @@
+"""Versioned migration runner for ``sql/migrations``.
+
+Each ``NNN_name.sql`` file runs once, and ``schema_migrations`` records its
+version, checksum and timing. A recorded file whose contents have changed
+stops the run rather than being re-applied.
+
+Everything in a file runs in one transaction except ``CREATE INDEX`` on a
+table that already existed, which would block writes for the whole build.
+Those run afterwards as ``CREATE INDEX CONCURRENTLY`` on their own
+autocommit connections, one worker per table (concurrent builds on the same
+table would only queue behind each other). Until they finish, the version is
+recorded with ``indexes_pending`` and the next run retries just the indexes.
+Partitioned tables cannot build indexes concurrently, so theirs run as plain
+``CREATE INDEX`` in that phase.
+
+    python manage.py migrate [jobs]
+    python manage.py migrate status
+    python manage.py migrate baseline 012   # mark a hand-applied schema
+"""
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+from db.connection import connect_direct
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql', 'migrations')
+
+BOOTSTRAP_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(255) PRIMARY KEY,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    ALTER TABLE schema_migrations
+        ADD COLUMN IF NOT EXISTS name TEXT,
+        ADD COLUMN IF NOT EXISTS checksum CHAR(64),
+        ADD COLUMN IF NOT EXISTS duration_ms INTEGER,
+        ADD COLUMN IF NOT EXISTS indexes_pending BOOLEAN NOT NULL DEFAULT FALSE;
+"""
+
+_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+_DOLLAR = re.compile(r'\$([A-Za-z_]\w*)?\$')
+_INDEX = re.compile(r'^CREATE\s+(UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?'
+                    r'([\w."]+)\s+ON\s+(ONLY\s+)?([\w."]+)(.*)$', re.IGNORECASE | re.DOTALL)
+_CREATES = re.compile(r'^CREATE\s+(?:UNLOGGED\s+)?(?:TABLE|MATERIALIZED\s+VIEW)\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w."]+)',
+                      re.IGNORECASE)
+
+
+class MigrationError(Exception):
+    pass
+
+
+def discover(directory: str = MIGRATIONS_DIR):
+    """Migration files in version order, with their SQL and checksum"""
+    migrations = []
+    for file_name in sorted(os.listdir(directory)):
+        match = _FILE.match(file_name)
+        if not match:
+            continue
+        with open(os.path.join(directory, file_name), 'rb') as f:
+            raw = f.read()
+        migrations.append({
+            'version': match.group(1),
+            'name': match.group(2),
+            'sql': raw.decode('utf-8'),
+            'checksum': hashlib.sha256(raw).hexdigest(),
+        })
+    return migrations
+
+
+def split_statements(sql: str):
+    """Top-level statements of a SQL script, with comments outside quoted
+    text removed. Understands '...', "...", and $tag$...$tag$ bodies."""
+    statements, current = [], []
+    i, n = 0, len(sql)
+    while i < n:
+        c = sql[i]
+        if sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end < 0 else end
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            current.append(' ')
+        elif c in ("'", '"'):
+            end = i + 1
+            while True:
+                end = sql.find(c, end)
+                if end < 0:
+                    end = n
+                elif sql.startswith(c * 2, end):
+                    end += 2
+                    continue
+                else:
+                    end += 1
+                break
+            current.append(sql[i:end])
+            i = end
+        elif c == '$' and _DOLLAR.match(sql, i):
+            tag = _DOLLAR.match(sql, i).group(0)
+            end = sql.find(tag, i + len(tag))
+            end = n if end < 0 else end + len(tag)
+            current.append(sql[i:end])
+            i = end
+        elif c == ';':
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += 1
+        else:
+            current.append(c)
+            i += 1
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def _bare(name: str) -> str:
+    return name.split('.')[-1].strip('"').lower()
+
+
+def plan(sql: str):
+    """Split a migration into its transactional statements and the index
+    builds to run online afterwards, as ``{name, table, sql}``"""
+    statements = split_statements(sql)
+    created = {_bare(m.group(1)) for m in map(_CREATES.match, statements) if m}
+    transactional, indexes = [], []
+    for statement in statements:
+        match = _INDEX.match(statement)
+        if not match or _bare(match.group(4)) in created:
+            transactional.append(statement)
+            continue
+        unique, name, only, table, rest = match.groups()
+        indexes.append({
+            'name': name,
+            'table': table,
+            'sql': f"CREATE {unique or ''}INDEX {{mode}}IF NOT EXISTS {name} ON {only or ''}{table}{rest}",
+        })
+    return transactional, indexes
+
+
+def _index_state(cur, index: str, table: str):
+    """``(table relkind, index valid or None if missing)``"""
+    cur.execute("""
+        SELECT (SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)),
+               (SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s))
+    """, (table, index))
+    return cur.fetchone()
+
+
+def build_indexes(indexes, connect=connect_direct, jobs: int = 4, concurrently: bool = True):
+    """Build indexes in parallel, one connection per table; returns timings"""
+    by_table = {}
+    for index in indexes:
+        by_table.setdefault(index['table'], []).append(index)
+
+    def build(table_indexes):
+        conn = connect()
+        timings = []
+        try:
+            conn.autocommit = True
+            cur = conn.cursor()
+            for index in table_indexes:
+                relkind, valid = _index_state(cur, index['name'], index['table'])
+                online = concurrently and relkind != 'p'
+                # A failed concurrent build leaves an invalid index that
+                # IF NOT EXISTS would happily skip
+                if valid is False:
+                    cur.execute(f"DROP INDEX {'CONCURRENTLY ' if online else ''}IF EXISTS {index['name']}")
+                started = time.perf_counter()
+                cur.execute(index['sql'].replace('{mode}', 'CONCURRENTLY ' if online else ''))
+                timings.append({'name': index['name'], 'table': index['table'], 'concurrently': online,
+                                'seconds': time.perf_counter() - started})
+            cur.close()
+            return timings
+        finally:
+            conn.close()
+
+    timings = []
+    if by_table:
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(by_table)))) as pool:
+            for result in pool.map(build, by_table.values()):
+                timings.extend(result)
+    return timings
+
+
+def applied_migrations(cur):
+    """``{version: {checksum, indexes_pending}}``; empty before the first run"""
+    try:
+        cur.execute("SELECT version, checksum, indexes_pending FROM schema_migrations")
+    except psycopg2.ProgrammingError:
+        # No table, or the pre-runner table without checksums
+        cur.connection.rollback()
+        return {}
+    return {version: {'checksum': checksum, 'indexes_pending': pending}
+            for version, checksum, pending in cur.fetchall()}
+
+
+def status(connect=connect_direct, directory: str = MIGRATIONS_DIR):
+    """Compare the files with what the database has recorded. Read-only."""
+    migrations = discover(directory)
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        applied = applied_migrations(cur)
+        cur.close()
+    finally:
+        conn.close()
+    files = {m['version']: m for m in migrations}
+    return {
+        'current': max(applied, default=None),
+        'latest': migrations[-1]['version'] if migrations else None,
+        'pending': [v for v in files if v not in applied or applied[v]['indexes_pending']],
+        'changed': [v for v in files if v in applied and applied[v]['checksum']
+                    and applied[v]['checksum'] != files[v]['checksum']],
+        'unknown': sorted(v for v in applied if v not in files),
+    }
+
+
+def baseline(version: str, connect=connect_direct, directory: str = MIGRATIONS_DIR):
+    """Record every migration up to ``version`` as applied without running
+    it, for databases that were built by hand"""
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(BOOTSTRAP_SQL)
+        marked = []
+        for migration in discover(directory):
+            if int(migration['version']) > int(version):
+                break
+            cur.execute("""
+                INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+                VALUES (%s, %s, %s, 0)
+                ON CONFLICT (version) DO NOTHING
+            """, (migration['version'], migration['name'], migration['checksum']))
+            if cur.rowcount:
+                marked.append(migration['version'])
+        conn.commit()
+        cur.close()
+        return marked
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def migrate(connect=connect_direct, directory: str = MIGRATIONS_DIR, jobs: int = 4,
+            concurrently: bool = True, log=print):
+    """Apply every migration not yet recorded; returns a report per migration
+    with statement count, total seconds and index build timings"""
+    report = []
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(BOOTSTRAP_SQL)
+        conn.commit()
+        applied = applied_migrations(cur)
+        for migration in discover(directory):
+            version, label = migration['version'], f"{migration['version']}_{migration['name']}"
+            recorded = applied.get(version)
+            if recorded and recorded['checksum'] and recorded['checksum'] != migration['checksum']:
+                raise MigrationError(f"{label} changed after it was applied")
+            if recorded and not recorded['indexes_pending']:
+                continue
+
+            started = time.perf_counter()
+            if concurrently:
+                transactional, indexes = plan(migration['sql'])
+            else:
+                transactional, indexes = split_statements(migration['sql']), []
+            if not recorded:
+                try:
+                    for statement in transactional:
+                        cur.execute(statement)
+                    cur.execute("""
+                        INSERT INTO schema_migrations (version, name, checksum, indexes_pending)
+                        VALUES (%s, %s, %s, %s)
+                    """, (version, migration['name'], migration['checksum'], bool(indexes)))
+                    conn.commit()
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    raise MigrationError(f"{label}: {e}") from e
+            try:
+                timings = build_indexes(indexes, connect=connect, jobs=jobs)
+            except psycopg2.Error as e:
+                raise MigrationError(f"{label}: index build failed, rerun to resume: {e}") from e
+            seconds = time.perf_counter() - started
+            cur.execute("""
+                UPDATE schema_migrations SET indexes_pending = FALSE, duration_ms = %s, applied_at = NOW()
+                WHERE version = %s
+            """, (int(seconds * 1000), version))
+            conn.commit()
+            report.append({'version': version, 'name': migration['name'], 'statements': len(transactional),
+                           'seconds': seconds, 'indexes': timings})
+            log(f"applied {label} in {seconds:.2f}s ({len(timings)} online index builds)")
+        cur.close()
+        return report
+    finally:
+        conn.close()
+
+
+def format_report(report):
+    lines = []
+    for entry in report:
+        lines.append(f"{entry['version']}_{entry['name']:<40}{entry['seconds']:>9.2f}s"
+                     f"  {entry['statements']} statements")
+        for index in entry['indexes']:
+            mode = 'concurrently' if index['concurrently'] else 'locking'
+            lines.append(f"    {index['name']:<44}{index['seconds']:>9.2f}s  {index['table']} ({mode})")
+    return '\n'.join(lines) if lines else 'No pending migrations'
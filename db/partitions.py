@@ -0,0 +1,155 @@
+"""Monthly partitions for games, game_rounds and round_answers (migration 011).
+
+Partitions are named ``<table>_YYYY_MM`` and cover ``[month, next month)`` of
+the game's creation time. ``maintain`` is meant to run daily (cron or
+``python manage.py partitions``): it creates the coming months ahead of time
+and, with a retention set, detaches expired months and moves them into the
+``archive`` schema. Both are catalog operations; no rows are copied or deleted.
+
+There is no DEFAULT partition: inserting a game for a month whose partition
+does not exist fails. ``maintain`` must therefore run before each month
+starts (the daily run keeps ``ahead`` months of headroom).
+
+Statements on a single game should carry its ``created_at`` so PostgreSQL
+prunes to one partition; ``game_created_at`` looks it up from ``game_keys``
+(migration 013).
+"""
+import re
+from datetime import date, datetime
+
+from psycopg2 import sql
+
+from db.connection import get_connection
+from utils.lru import LRUCache
+
+# Parents before children: creation follows this order, detaching the reverse
+PARTITIONED_TABLES = ('games', 'game_rounds', 'round_answers')
+ARCHIVE_SCHEMA = 'archive'
+
+_SUFFIX = re.compile(r'_(\d{4})_(\d{2})$')
+
+# A game's created_at never changes, so entries need no expiry
+_created_at = LRUCache(maxsize=50000, name='game_created_at')
+
+
+def remember_created_at(game_id: int, created_at: datetime) -> None:
+    _created_at.set(game_id, created_at)
+
+
+def game_created_at(cur, game_ids):
+    """``{game_id: created_at}`` for the given games that exist, from the
+    cache or one ``game_keys`` lookup for the rest"""
+    found, missing = {}, []
+    for game_id in game_ids:
+        created_at = _created_at.get(game_id)
+        if created_at is None:
+            missing.append(game_id)
+        else:
+            found[game_id] = created_at
+    if missing:
+        cur.execute("SELECT id, created_at FROM game_keys WHERE id = ANY(%s)", (missing,))
+        for game_id, created_at in cur.fetchall():
+            _created_at.set(game_id, created_at)
+            found[game_id] = created_at
+    return found
+
+
+def month_start(value) -> date:
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def existing_partitions(cur, table: str, schema: str = 'public'):
+    """``{month: partition name}`` for partitions attached to ``schema.table``"""
+    cur.execute("""
+        SELECT child.relname
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = parent.relnamespace
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE parent.relname = %s AND n.nspname = %s
+    """, (table, schema))
+    partitions = {}
+    for (name,) in cur.fetchall():
+        match = _SUFFIX.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def ensure_partitions(cur, first_month: date, last_month: date):
+    """Create any missing partitions for months in [first_month, last_month]"""
+    created = []
+    attached = {table: existing_partitions(cur, table) for table in PARTITIONED_TABLES}
+    month = month_start(first_month)
+    while month <= last_month:
+        for table in PARTITIONED_TABLES:
+            if month in attached[table]:
+                continue
+            name = partition_name(table, month)
+            cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                sql.Identifier(name), sql.Identifier(table)), (month, add_months(month, 1)))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def _drop_foreign_keys(cur, schema: str, name: str) -> None:
+    # A detached partition keeps copies of its parent's foreign keys, which
+    # would stop the referenced month from being detached next
+    cur.execute("""
+        SELECT c.conname FROM pg_constraint c
+        JOIN pg_class t ON t.oid = c.conrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        WHERE c.contype = 'f' AND t.relname = %s AND n.nspname = %s
+    """, (name, schema))
+    for (constraint,) in cur.fetchall():
+        cur.execute(sql.SQL("ALTER TABLE {}.{} DROP CONSTRAINT {}").format(
+            sql.Identifier(schema), sql.Identifier(name), sql.Identifier(constraint)))
+
+
+def archive_before(cur, cutoff: date):
+    """Detach every partition for months before ``cutoff`` and move it into
+    the archive schema; returns the archived partition names"""
+    archived = []
+    cur.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(ARCHIVE_SCHEMA)))
+    for table in reversed(PARTITIONED_TABLES):
+        for month, name in sorted(existing_partitions(cur, table).items()):
+            if month >= cutoff:
+                continue
+            cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                sql.Identifier(table), sql.Identifier(name)))
+            _drop_foreign_keys(cur, 'public', name)
+            cur.execute(sql.SQL("ALTER TABLE {} SET SCHEMA {}").format(
+                sql.Identifier(name), sql.Identifier(ARCHIVE_SCHEMA)))
+            archived.append(name)
+    return archived
+
+
+def maintain(ahead: int = 3, retain_months=None, today=None):
+    """Create partitions up to ``ahead`` months out and, when
+    ``retain_months`` is set, archive months older than that"""
+    current = month_start(today or date.today())
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        created = ensure_partitions(cur, current, add_months(current, ahead))
+        archived = archive_before(cur, add_months(current, -retain_months)) if retain_months else []
+        conn.commit()
+        return {'created': created, 'archived': archived}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
@@ -1,4 +1,16 @@
+import os
+import threading
+from collections.abc import Mapping
+
+from db.instrumentation import register_statement
+
+
 def load_queries(file_path):
+    """Map each ``--:<key>`` marker in a .sql file to the statement below it.
+
+    Whole-line ``--`` comments are dropped, so a query's text starts at its
+    first keyword and ends at its semicolon.
+    """
     queries = {}
     current_key = None
     current_lines = []
@@ -11,10 +23,55 @@ def load_queries(file_path):
                     queries[current_key] = "\n".join(current_lines).strip()
                 current_key = stripped[3:]
                 current_lines = []
-            elif current_key:
+            elif current_key and not stripped.startswith("--"):
                 current_lines.append(line.rstrip())
 
         if current_key and current_lines:
             queries[current_key] = "\n".join(current_lines).strip()
 
+    # Time each named query under "<file>.<key>" instead of its call site
+    prefix = os.path.splitext(os.path.basename(file_path))[0]
+    for key, sql in queries.items():
+        register_statement(f"{prefix}.{key}", sql)
+
     return queries
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LazyQueries(Mapping):
+    """``load_queries`` deferred until a query is first looked up, so that
+    importing a model does not touch the disk. Relative paths resolve
+    against the project root rather than the working directory."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path if os.path.isabs(file_path) else os.path.join(PROJECT_ROOT, file_path)
+        self._queries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._queries is None:
+            with self._lock:
+                if self._queries is None:
+                    self._queries = load_queries(self.file_path)
+        return self._queries
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+
+def json_array(sql):
+    """Wrap a SELECT so PostgreSQL returns its rows as one JSON array of
+    objects keyed by column name, in the SELECT's order.
+
+    The result is cast to text: psycopg2 would otherwise decode ``json``
+    columns into Python objects, which is the work this is meant to skip.
+    """
+    return f"SELECT COALESCE(json_agg(row_to_json(t)), '[]')::text FROM ({sql.strip().rstrip(';')}) t"
@@ -0,0 +1,34 @@
+"""Read large result sets in batches through server-side (named) cursors.
+
+A plain cursor makes psycopg2 pull the whole result into client memory on
+``execute``; a named cursor leaves it on the server and ``fetchmany`` brings
+it over ``batch_size`` rows at a time, so memory stays flat however many
+rows there are. The connection is held until the generator is exhausted or
+closed (a streamed response closes it when the client goes away).
+"""
+import itertools
+
+from db.connection import get_connection
+
+_cursor_ids = itertools.count(1)
+
+
+def iter_batches(sql, params=None, batch_size=1000):
+    """Yield lists of up to ``batch_size`` rows for ``sql``"""
+    conn = get_connection()
+    try:
+        # Named cursors live in a transaction; closing the connection
+        # returns it to the pool, which rolls that back
+        cur = conn.cursor(name=f"stream_{next(_cursor_ids)}")
+        try:
+            cur.itersize = batch_size
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
+    finally:
+        conn.close()
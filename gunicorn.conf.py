@@ -0,0 +1,13 @@
+"""gunicorn settings, read automatically from the working directory.
+
+    gunicorn 'app:create_app()'
+
+create_app does no I/O, and connection pools are created lazily in each
+worker, so the only thing left to run at boot is the schema check.
+"""
+
+
+def when_ready(server):
+    # Once, in the master, before any worker is forked
+    from startup import on_startup
+    on_startup()
@@ -3,13 +3,17 @@
 import sys
 import os
 import json
-import random
 
 # اضافه کردن مسیر app برای ایمپورت ماژول‌ها
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "app")))
 
 from models.question_model import Question
 from models.category_model import Category
+from models.user_stats_model import UserStats
+from db.partitions import maintain
+from db.archive import archive_games
+from db import migrate as migrations
+from manager.save_questions import shuffle_choices
 
 
 def load_questions_from_directory(folder_path):
@@ -36,9 +40,7 @@ def load_questions_from_directory(folder_path):
                     incorrect = item["incorrect_answers"]
 
                     # ترکیب گزینه‌ها و تعیین پاسخ درست
-                    all_choices = incorrect + [correct]
-                    random.shuffle(all_choices)
-                    correct_letter = "ABCD"[all_choices.index(correct)]
+                    all_choices, correct_letter = shuffle_choices(correct, incorrect)
 
                     # پیدا کردن یا ساخت دسته‌بندی
                     category = Category.find_by_name(category_name)
@@ -63,8 +65,48 @@ def load_questions_from_directory(folder_path):
     print(f"✅ وارد کردن کامل شد. مجموع سوالات جدید: {count}")
 
 
+def backfill_stats(batch_size=10000, discard_archived=False):
+    updated = UserStats.backfill_game_results(batch_size=batch_size, discard_archived=discard_archived)
+    print(f"✅ game stats rebuilt for {updated} users")
+
+
+def maintain_partitions(retain_months=None, ahead=3):
+    result = maintain(ahead=ahead, retain_months=retain_months)
+    print(f"✅ partitions created: {len(result['created'])}, archived: {len(result['archived'])}")
+    for name in result['archived']:
+        print(f"  archived {name}")
+
+
+def archive_old_games(older_than_days=180, batch_size=1000):
+    result = archive_games(older_than_days=older_than_days, batch_size=batch_size)
+    print(f"✅ archived {result.get('games', 0)} games into {result['files']} files")
+
+
+def run_migrations(args):
+    if args[:1] == ["status"]:
+        schema = migrations.status()
+        print(f"current: {schema['current']}, latest: {schema['latest']}")
+        print(f"pending: {', '.join(schema['pending']) or '-'}")
+        print(f"changed: {', '.join(schema['changed']) or '-'}")
+    elif args[:1] == ["baseline"] and len(args) == 2:
+        marked = migrations.baseline(args[1])
+        print(f"✅ marked as applied: {', '.join(marked) or 'nothing new'}")
+    else:
+        report = migrations.migrate(jobs=int(args[0]) if args else 4)
+        print(migrations.format_report(report))
+
+
 if __name__ == "__main__":
-    if len(sys.argv) >= 3 and sys.argv[1] == "import_questions":
+    if len(sys.argv) >= 2 and sys.argv[1] == "migrate":
+        run_migrations(sys.argv[2:])
+    elif len(sys.argv) >= 2 and sys.argv[1] == "partitions":
+        maintain_partitions(int(sys.argv[2]) if len(sys.argv) >= 3 else None)
+    elif len(sys.argv) >= 2 and sys.argv[1] == "archive_games":
+        archive_old_games(*(int(arg) for arg in sys.argv[2:4]))
+    elif len(sys.argv) >= 2 and sys.argv[1] == "backfill_stats":
+        args = [arg for arg in sys.argv[2:] if arg != "--discard-archived"]
+        backfill_stats(int(args[0]) if args else 10000, "--discard-archived" in sys.argv[2:])
+    elif len(sys.argv) >= 3 and sys.argv[1] == "import_questions":
         folder = sys.argv[2]
         if not os.path.isdir(folder):
             print(f"❌ مسیر پوشه پیدا نشد: {folder}")
@@ -72,4 +114,8 @@ if __name__ == "__main__":
             load_questions_from_directory(folder)
     else:
         print("📘 استفاده صحیح:")
+        print("  python manage.py migrate [jobs] | status | baseline <version>")
         print("  python manage.py import_questions <folder_path>")
+        print("  python manage.py backfill_stats [batch_size] [--discard-archived]")
+        print("  python manage.py partitions [retain_months]")
+        print("  python manage.py archive_games [older_than_days] [batch_size]")
@@ -3,6 +3,14 @@ import json
 import random
 from models.question_model import Question
 
+
+def shuffle_choices(correct, incorrect, rng=random):
+    """Shuffle the answers together and return (choices, correct_letter)"""
+    choices = incorrect + [correct]
+    rng.shuffle(choices)
+    return choices, "ABCD"[choices.index(correct)]
+
+
 def load_questions_from_directory(folder_path):
     file_list = sorted(os.listdir(folder_path))
     count = 0
@@ -20,10 +28,7 @@ def load_questions_from_directory(folder_path):
                 correct = item["correct_answer"]
                 incorrect = item["incorrect_answers"]
 
-                all_choices = incorrect + [correct]
-                random.shuffle(all_choices)
-
-                correct_letter = "ABCD"[all_choices.index(correct)]
+                all_choices, correct_letter = shuffle_choices(correct, incorrect)
 
                 q = Question(
                     text=question_text,
@@ -3,7 +3,7 @@ from .game_model import Game
 from .category_model import Category
 from .leaderboard_model import Leaderboard
 from .user_stats_model import UserStats
-from .matchmaking import Matchmaking
+from .matchmaking import Matchmaker
 from .round_model import Round
 from .question_model import Question
 
@@ -13,7 +13,7 @@ __all__ = [
     'Category',
     'Leaderboard',
     'UserStats',
-    'Matchmaking',
+    'Matchmaker',
     'Round',
     'Question'
 ] 
\ No newline at end of file
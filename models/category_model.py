@@ -1,14 +1,31 @@
 from db.connection import get_connection
-from db.query_loader import load_queries
+from db.query_loader import LazyQueries, json_array
+from db.streaming import iter_batches
+from utils.cache import invalidate
 
-QUERIES = load_queries("sql/queries/category_queries.sql")
+QUERIES = LazyQueries("sql/queries/category_queries.sql")
 
 class Category:
+    # Category.all materializes every category per request; slots keep
+    # each instance to three pointers
+    __slots__ = ('id', 'name', 'question_count')
+
     def __init__(self, name, id=None, question_count=0):
         self.id = id
         self.name = name
         self.question_count = question_count
 
+    @classmethod
+    def from_row(cls, row):
+        """Build from an ``(id, name, question_count)`` row without __init__"""
+        category = cls.__new__(cls)
+        category.id, category.name, category.question_count = row
+        return category
+
+    @classmethod
+    def from_rows(cls, rows):
+        return list(map(cls.from_row, rows))
+
     def save(self):
         conn = get_connection()
         cur = conn.cursor()
@@ -17,6 +34,7 @@ class Category:
         conn.commit()
         cur.close()
         conn.close()
+        invalidate("categories")
         return self
 
     def update(self, new_name):
@@ -25,7 +43,7 @@ class Category:
         
         conn = get_connection()
         cur = conn.cursor()
-        cur.execute(QUERIES["update_category_name"], (self.id, new_name))
+        cur.execute(QUERIES["update_category_name"], (new_name, self.id))
         result = cur.fetchone()
         conn.commit()
         cur.close()
@@ -33,6 +51,7 @@ class Category:
         
         if result:
             self.name = new_name
+            invalidate("categories")
             return True
         return False
 
@@ -48,7 +67,10 @@ class Category:
         cur.close()
         conn.close()
         
-        return result is not None
+        if result is not None:
+            invalidate("categories")
+            return True
+        return False
 
     @classmethod
     def find_by_name(cls, name):
@@ -71,9 +93,26 @@ class Category:
         cur.close()
         conn.close()
         if row:
-            return cls(id=row[0], name=row[1], question_count=row[2])
+            return cls.from_row(row)
         return None
 
+    @staticmethod
+    def iter_all(batch_size=1000):
+        """``Category.all`` rows in batches from a server-side cursor"""
+        return iter_batches(QUERIES["get_all_categories_with_their_question_counts"],
+                            batch_size=batch_size)
+
+    @staticmethod
+    def all_json():
+        """``Category.all`` as a JSON array rendered by PostgreSQL"""
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(json_array(QUERIES["get_all_categories_with_their_question_counts"]))
+        document = cur.fetchone()[0]
+        cur.close()
+        conn.close()
+        return document
+
     @classmethod
     def all(cls):
         conn = get_connection()
@@ -82,4 +121,4 @@ class Category:
         rows = cur.fetchall()
         cur.close()
         conn.close()
-        return [cls(id=row[0], name=row[1], question_count=row[2]) for row in rows]
+        return cls.from_rows(rows)
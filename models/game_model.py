@@ -1,14 +1,174 @@
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any, Tuple
 
+from psycopg2.extras import Json
+
+from db.archive import archived_history
 from db.connection import get_connection
-from db.query_loader import load_queries
+from db.partitions import game_created_at, remember_created_at
+from db.query_loader import LazyQueries
+from models.round_model import points_for
 from models.user_model import User
+from models.user_stats_model import settle_game
+from utils.cache import invalidate
 from utils.exceptions import GameError, ValidationError
+from utils.lru import LRUCache
+from utils.versions import bump
+
+QUERIES = LazyQueries("sql/queries/game_queries.sql")
+
+# Participants never change after a game is created, so membership checks
+# can be answered from memory for the lifetime of the entry
+_participants_cache = LRUCache(maxsize=20000, ttl=3600, name='participants')
+
+# History totals only feed the "N games" label, so a minute of staleness is
+# fine and keeps COUNT(*) off every page load
+_history_totals = LRUCache(maxsize=10000, ttl=60, name='history_totals')
+
+# Rebuilds the user_games rows (migration 009) for the given games from the
+# base tables. Run inside the transaction that changes a game's state so the
+# projection never disagrees with what was committed. Games are reached
+# through game_keys so each probe carries created_at and hits one partition.
+REFRESH_USER_GAMES_SQL = """
+    INSERT INTO user_games (user_id, game_id, game_type, game_status, your_score, your_status,
+                            opponent_id, opponent_username, opponent_score, opponent_status,
+                            start_time, end_time, duration_seconds, updated_at)
+    SELECT DISTINCT ON (g.id, me.user_id)
+           me.user_id, g.id, gt.name, g.status, me.score, me.status,
+           o.user_id, u.username, o.score, o.status,
+           g.start_time, g.end_time, EXTRACT(EPOCH FROM g.end_time - g.start_time), NOW()
+    FROM game_keys k
+    JOIN games g ON g.id = k.id AND g.created_at = k.created_at
+    JOIN game_types gt ON gt.id = g.game_type_id
+    JOIN game_participants me ON me.game_id = g.id
+    LEFT JOIN game_participants o ON o.game_id = g.id AND o.user_id <> me.user_id
+    LEFT JOIN users u ON u.id = o.user_id
+    WHERE k.id = ANY(%s)
+    ORDER BY g.id, me.user_id, o.user_id
+    ON CONFLICT (user_id, game_id) DO UPDATE
+    SET game_status = EXCLUDED.game_status,
+        your_score = EXCLUDED.your_score,
+        your_status = EXCLUDED.your_status,
+        opponent_id = EXCLUDED.opponent_id,
+        opponent_username = EXCLUDED.opponent_username,
+        opponent_score = EXCLUDED.opponent_score,
+        opponent_status = EXCLUDED.opponent_status,
+        start_time = EXCLUDED.start_time,
+        end_time = EXCLUDED.end_time,
+        duration_seconds = EXCLUDED.duration_seconds,
+        updated_at = EXCLUDED.updated_at
+"""
+
+USER_GAME_COLUMNS = """game_id, game_type, game_status, start_time, end_time, duration_seconds,
+                       your_score, your_status, opponent_id, opponent_username,
+                       opponent_score, opponent_status"""
+
+# Both read a single range of a partial index on user_games
+HISTORY_SQL = """
+    SELECT """ + USER_GAME_COLUMNS + """
+    FROM user_games
+    WHERE user_id = %(user_id)s AND game_status = 'completed'
+      {after}
+    ORDER BY end_time DESC, game_id DESC
+    LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+# Archived games (migration 012) still count; their per-user totals live in
+# the catalog, so no archive file is opened
+HISTORY_TOTAL_SQL = """
+    SELECT (SELECT COUNT(*) FROM user_games
+            WHERE user_id = %(user_id)s AND game_status = 'completed')
+         + (SELECT COALESCE(SUM(a.games), 0)
+            FROM game_archive_files f, unnest(f.user_ids, f.completed_counts) AS a(user_id, games)
+            WHERE f.user_ids @> ARRAY[%(user_id)s]::BIGINT[] AND a.user_id = %(user_id)s)
+"""
+
+OPEN_GAMES_SQL = """
+    SELECT """ + USER_GAME_COLUMNS + """
+    FROM user_games
+    WHERE user_id = %s AND game_status IN ('pending', 'active')
+    ORDER BY start_time DESC
+"""
+
+
+# The same user_games rows rendered by PostgreSQL as the JSON the routes
+# return (DB_JSON_RESPONSES); timestamps come out in ISO 8601
+USER_GAME_OPPONENT_JSON = """
+    CASE WHEN opponent_id IS NOT NULL THEN json_build_object(
+        'user_id', opponent_id, 'username', opponent_username,
+        'score', opponent_score, 'status', opponent_status) END"""
+
+OPEN_GAMES_JSON_SQL = """
+    SELECT COALESCE(json_agg(json_build_object(
+               'game_id', game_id,
+               'status', game_status,
+               'game_type', game_type,
+               'start_time', start_time,
+               'opponent', """ + USER_GAME_OPPONENT_JSON + """,
+               'your_score', your_score) ORDER BY start_time DESC), '[]')::text
+    FROM user_games
+    WHERE user_id = %s AND game_status IN ('pending', 'active')
+"""
+
+# One page plus a look-ahead row; the look-ahead only decides whether there
+# is a next page, and the last row of the page becomes the cursor
+HISTORY_JSON_SQL = """
+    WITH page AS (
+        SELECT """ + USER_GAME_COLUMNS + """
+        FROM user_games
+        WHERE user_id = %(user_id)s AND game_status = 'completed'
+          {after}
+        ORDER BY end_time DESC, game_id DESC
+        LIMIT %(limit)s + 1 OFFSET %(offset)s
+    ), numbered AS (
+        SELECT page.*, row_number() OVER (ORDER BY end_time DESC, game_id DESC) AS n
+        FROM page
+    )
+    SELECT COALESCE(json_agg(json_build_object(
+               'game_id', game_id,
+               'game_type', game_type,
+               'start_time', start_time,
+               'end_time', end_time,
+               'opponent', """ + USER_GAME_OPPONENT_JSON + """,
+               'your_score', your_score,
+               'your_status', your_status,
+               'duration', duration_seconds) ORDER BY n) FILTER (WHERE n <= %(limit)s), '[]')::text,
+           COUNT(*),
+           MAX(end_time) FILTER (WHERE n = %(limit)s),
+           MAX(game_id) FILTER (WHERE n = %(limit)s)
+    FROM numbered
+"""
+
+
+def refresh_user_games(cur, game_ids: List[int]) -> None:
+    """Bring the user_games projection up to date for these games"""
+    if game_ids:
+        cur.execute(REFRESH_USER_GAMES_SQL, (list(game_ids),))
+
+
+def _user_game_from_row(row: tuple) -> Dict[str, Any]:
+    return {
+        'game_id': row[0],
+        'game_type': row[1],
+        'status': row[2],
+        'start_time': row[3],
+        'end_time': row[4],
+        'duration': row[5],
+        'your_score': row[6],
+        'your_status': row[7],
+        'opponent': {
+            'user_id': row[8],
+            'username': row[9],
+            'score': row[10],
+            'status': row[11]
+        } if row[8] is not None else None
+    }
 
-QUERIES = load_queries("sql/queries/game_queries.sql")
 
 class Game:
+    __slots__ = ('id', 'game_type_id', 'status', 'game_config', 'winner_id', 'participants',
+                 'current_round', 'start_time', 'end_time', 'last_activity', 'created_at')
+
     def __init__(self, game_type_id: int, game_config: Dict = None, 
                  id: Optional[int] = None, status: str = 'pending',
                  winner_id: Optional[int] = None):
@@ -22,6 +182,13 @@ class Game:
         self.start_time: Optional[datetime] = None
         self.end_time: Optional[datetime] = None
         self.last_activity: Optional[datetime] = None
+        # partition key (games.created_at), known once saved or loaded
+        self.created_at: Optional[datetime] = None
+
+    def _partition_key(self, cur) -> Optional[datetime]:
+        if self.created_at is None:
+            self.created_at = game_created_at(cur, [self.id]).get(self.id)
+        return self.created_at
 
     def validate(self) -> None:
         """Validate game data before saving"""
@@ -48,10 +215,16 @@ class Game:
         conn = get_connection()
         try:
             cur = conn.cursor()
-            cur.execute(QUERIES["create_new_game"], 
-                       (self.game_type_id, self.game_config, participant_ids))
-            self.id = cur.fetchone()[0]
+            cur.execute(QUERIES["create_new_game"], {
+                'game_type_id': self.game_type_id,
+                'game_config': Json(self.game_config),
+                'participant_ids': list(participant_ids)
+            })
+            self.id, self.created_at = cur.fetchone()
+            refresh_user_games(cur, [self.id])
             conn.commit()
+            remember_created_at(self.id, self.created_at)
+            _participants_cache.set(self.id, frozenset(participant_ids))
         except Exception as e:
             conn.rollback()
             raise GameError(f"Failed to create game: {str(e)}")
@@ -65,7 +238,11 @@ class Game:
         conn = get_connection()
         try:
             cur = conn.cursor()
-            cur.execute(QUERIES["get_active_game_details"], (game_id,))
+            created_at = game_created_at(cur, [game_id]).get(game_id)
+            if created_at is None:
+                return None
+            key = {'game_id': game_id, 'created_at': created_at}
+            cur.execute(QUERIES["get_active_game_details"], key)
             row = cur.fetchone()
             if not row:
                 return None
@@ -81,10 +258,11 @@ class Game:
             game.end_time = row[6]
             game.last_activity = row[7]
             game.participants = row[8]
+            game.created_at = created_at
             
             # Get current round if game is active
             if game.status == 'active':
-                cur.execute(QUERIES["get_current_game_round"], (game_id,))
+                cur.execute(QUERIES["get_current_game_round"], key)
                 round_data = cur.fetchone()
                 if round_data:
                     game.current_round = {
@@ -99,21 +277,60 @@ class Game:
             cur.close()
             conn.close()
 
+    @staticmethod
+    def participant_ids(game_id: int) -> frozenset:
+        """Return the IDs of a game's participants (empty if the game doesn't exist)"""
+        participants = _participants_cache.get(game_id)
+        if participants is not None:
+            return participants
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT user_id FROM game_participants WHERE game_id = %s
+            """, (game_id,))
+            participants = frozenset(row[0] for row in cur.fetchall())
+        finally:
+            cur.close()
+            conn.close()
+        if participants:
+            _participants_cache.set(game_id, participants)
+        return participants
+
+    @classmethod
+    def is_participant(cls, game_id: int, user_id: int) -> bool:
+        return user_id in cls.participant_ids(game_id)
+
     def submit_answer(self, user_id: int, round_id: int, choice_id: int, response_time_ms: int) -> Dict[str, Any]:
         """Submit an answer for the current round"""
         conn = get_connection()
         try:
             cur = conn.cursor()
-            cur.execute(QUERIES["submit_answer"], 
-                       (round_id, user_id, choice_id, response_time_ms))
+            answer = {'game_id': self.id, 'created_at': self._partition_key(cur),
+                      'round_id': round_id, 'user_id': user_id, 'choice_id': choice_id,
+                      'response_time_ms': response_time_ms}
+            cur.execute(QUERIES["get_answer_choice"], answer)
+            choice = cur.fetchone()
+            if choice is None:
+                raise ValidationError("Invalid choice")
+            is_correct, feedback, points_possible, time_limit_seconds = choice
+            answer['is_correct'] = is_correct
+            answer['points_earned'] = (points_for(points_possible, time_limit_seconds, response_time_ms)
+                                       if is_correct else 0)
+            cur.execute(QUERIES["submit_answer"], answer)
             result = cur.fetchone()
+            refresh_user_games(cur, [self.id])
             conn.commit()
-            
+            bump(f"game:{self.id}")
+
             return {
                 'is_correct': result[0],
                 'points_earned': result[1],
-                'feedback': result[2]
+                'feedback': feedback
             }
+        except ValidationError:
+            conn.rollback()
+            raise
         except Exception as e:
             conn.rollback()
             raise GameError(f"Failed to submit answer: {str(e)}")
@@ -126,7 +343,8 @@ class Game:
         conn = get_connection()
         try:
             cur = conn.cursor()
-            cur.execute(QUERIES["get_game_leaderboard"], (self.id,))
+            cur.execute(QUERIES["get_game_leaderboard"],
+                        {'game_id': self.id, 'created_at': self._partition_key(cur)})
             return [
                 {
                     'username': row[0],
@@ -149,18 +367,34 @@ class Game:
         conn = get_connection()
         try:
             cur = conn.cursor()
-            self.winner_id = winner_id
+            if winner_id is None:
+                # Highest score wins; a tie leaves winner_id NULL (a draw)
+                cur.execute("""
+                    SELECT user_id, score FROM game_participants
+                    WHERE game_id = %s ORDER BY score DESC LIMIT 2
+                """, (self.id,))
+                top = cur.fetchall()
+                if top and (len(top) == 1 or top[0][1] > top[1][1]):
+                    winner_id = top[0][0]
             cur.execute("""
                 UPDATE games 
                 SET status = 'completed',
                     end_time = NOW(),
                     winner_id = %s
-                WHERE id = %s
-            """, (winner_id, self.id))
-            
+                WHERE id = %s AND created_at = %s AND status = 'active'
+                RETURNING id
+            """, (winner_id, self.id, self._partition_key(cur)))
+            if cur.fetchone() is None:
+                raise GameError("Game was already finished")
+
+            settle_game(cur, self.id)
+            refresh_user_games(cur, [self.id])
+            conn.commit()
+            self.winner_id = winner_id
             self.status = 'completed'
             self.end_time = datetime.now()
-            conn.commit()
+            invalidate("leaderboard")
+            bump(f"game:{self.id}")
         except Exception as e:
             conn.rollback()
             raise GameError(f"Failed to finish game: {str(e)}")
@@ -168,23 +402,191 @@ class Game:
             cur.close()
             conn.close()
 
+    def forfeit(self, user_id: int) -> Optional[int]:
+        """End the game with ``user_id`` conceding; the other player wins.
+
+        The game is completed like any other (so it is settled into both
+        players' user_stats) and the forfeiting participant is marked
+        disconnected. Returns the winner's id.
+        """
+        if self.status != 'active':
+            raise GameError("Only active games can be forfeited")
+
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                WITH game_update AS (
+                    UPDATE games
+                    SET status = 'completed',
+                        end_time = NOW(),
+                        winner_id = (SELECT user_id FROM game_participants
+                                     WHERE game_id = %(game_id)s AND user_id <> %(user_id)s
+                                     ORDER BY user_id LIMIT 1)
+                    WHERE id = %(game_id)s AND created_at = %(created_at)s AND status = 'active'
+                    RETURNING id, winner_id
+                ), participant_update AS (
+                    UPDATE game_participants
+                    SET status = 'disconnected'
+                    WHERE game_id = %(game_id)s AND user_id = %(user_id)s
+                      AND EXISTS (SELECT 1 FROM game_update)
+                )
+                SELECT winner_id FROM game_update
+            """, {'game_id': self.id, 'created_at': self._partition_key(cur), 'user_id': user_id})
+            row = cur.fetchone()
+            if row is None:
+                raise GameError("Game was already finished")
+
+            settle_game(cur, self.id)
+            refresh_user_games(cur, [self.id])
+            conn.commit()
+            self.winner_id = row[0]
+            self.status = 'completed'
+            self.end_time = datetime.now()
+            invalidate("leaderboard")
+            bump(f"game:{self.id}")
+            return self.winner_id
+        except GameError:
+            conn.rollback()
+            raise
+        except Exception as e:
+            conn.rollback()
+            raise GameError(f"Failed to forfeit game: {str(e)}")
+        finally:
+            cur.close()
+            conn.close()
+
+    @staticmethod
+    def count_active() -> int:
+        """Number of games currently in progress"""
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM games WHERE status = 'active'")
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+            conn.close()
+
+    @staticmethod
+    def open_games(user_id: int) -> List[Dict[str, Any]]:
+        """Pending and active games for a user, newest first"""
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(OPEN_GAMES_SQL, (user_id,))
+            return [_user_game_from_row(row) for row in cur.fetchall()]
+        finally:
+            cur.close()
+            conn.close()
+
+    @staticmethod
+    def open_games_json(user_id: int) -> str:
+        """``open_games`` as a JSON array rendered by PostgreSQL"""
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(OPEN_GAMES_JSON_SQL, (user_id,))
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+            conn.close()
+
+    @staticmethod
+    def history_json(user_id: int, per_page: int, after: Optional[Tuple[datetime, int]] = None,
+                     offset: int = 0) -> Optional[Tuple[str, Optional[Tuple[datetime, int]]]]:
+        """A ``history`` page as ``(JSON array, next keyset position)``.
+
+        Returns None for a short first-offset page: that is where keyset
+        pages continue into the archive, which only ``history`` reads.
+        Short pages are small, so the Python path costs little there.
+        """
+        params = {'user_id': user_id, 'limit': per_page, 'offset': offset}
+        after_clause = ''
+        if after is not None:
+            after_clause = 'AND (end_time, game_id) < (%(after_end)s, %(after_id)s)'
+            params['after_end'], params['after_id'] = after
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(HISTORY_JSON_SQL.format(after=after_clause), params)
+            document, fetched, last_end, last_id = cur.fetchone()
+        finally:
+            cur.close()
+            conn.close()
+        if offset == 0 and fetched <= per_page:
+            return None
+        return document, (last_end, last_id) if fetched > per_page else None
+
+    @staticmethod
+    def history(user_id: int, limit: int, after: Optional[Tuple[datetime, int]] = None,
+                offset: int = 0) -> List[Dict[str, Any]]:
+        """Completed games for a user, newest first, starting after the
+        ``(end_time, id)`` keyset position if given.
+
+        Archived games are all older than the ones still in user_games, so
+        once the hot rows run out a keyset page carries on into the archive.
+        OFFSET pages only see the hot rows.
+        """
+        params = {'user_id': user_id, 'limit': limit, 'offset': offset}
+        after_clause = ''
+        if after is not None:
+            after_clause = 'AND (end_time, game_id) < (%(after_end)s, %(after_id)s)'
+            params['after_end'], params['after_id'] = after
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(HISTORY_SQL.format(after=after_clause), params)
+            rows = cur.fetchall()
+            if offset == 0 and len(rows) < limit:
+                position = (rows[-1][4], rows[-1][0]) if rows else after
+                rows = rows + archived_history(cur, user_id, limit - len(rows), position)
+            return [_user_game_from_row(row) for row in rows]
+        finally:
+            cur.close()
+            conn.close()
+
+    @staticmethod
+    def count_history(user_id: int) -> int:
+        """Number of completed games a user took part in (cached briefly)"""
+        total = _history_totals.get(user_id)
+        if total is not None:
+            return total
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(HISTORY_TOTAL_SQL, {'user_id': user_id})
+            total = cur.fetchone()[0]
+        finally:
+            cur.close()
+            conn.close()
+        _history_totals.set(user_id, total)
+        return total
+
     @staticmethod
     def cleanup_inactive_games(timeout_minutes: int = 30) -> int:
-        """Clean up inactive games"""
+        """Cancel active games with no round started or finished for timeout_minutes"""
         conn = get_connection()
         try:
             cur = conn.cursor()
+            # games has no activity column: a game is last active when its
+            # latest round started or ended, or when it started
             cur.execute("""
-                UPDATE games 
-                SET status = 'cancelled', 
+                UPDATE games g
+                SET status = 'cancelled',
                     end_time = NOW()
-                WHERE status = 'active'
-                AND last_activity < NOW() - interval '%s minutes'
-                RETURNING id
+                WHERE g.status = 'active'
+                AND COALESCE((SELECT MAX(GREATEST(gr.start_time, gr.end_time))
+                              FROM game_rounds gr
+                              WHERE gr.game_id = g.id AND gr.game_created_at = g.created_at),
+                             g.start_time) < NOW() - make_interval(mins => %s)
+                RETURNING g.id
             """, (timeout_minutes,))
-            cleaned = cur.rowcount
+            cleaned = [row[0] for row in cur.fetchall()]
+            refresh_user_games(cur, cleaned)
             conn.commit()
-            return cleaned
+            bump(*[f"game:{game_id}" for game_id in cleaned])
+            return len(cleaned)
         finally:
             cur.close()
             conn.close()
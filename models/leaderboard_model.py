@@ -2,6 +2,7 @@ from datetime import datetime
 from sqlalchemy import Column, Integer, DateTime, ForeignKey, Numeric, text
 from sqlalchemy.orm import relationship
 from db.database import Base
+from db.query_loader import json_array
 
 class Leaderboard(Base):
     __tablename__ = 'leaderboard'
@@ -18,10 +19,22 @@ class Leaderboard(Base):
     # Relationship
     user = relationship('User', back_populates='leaderboard')
 
+    @staticmethod
+    def _read(db, sql, params, as_json=False, batch_size=None):
+        """Rows for a read query; as one JSON array rendered by PostgreSQL
+        with ``as_json`` (see DB_JSON_RESPONSES), or as batches of
+        ``batch_size`` rows from a server-side cursor"""
+        if as_json:
+            return db.execute(text(json_array(sql)), params).scalar()
+        if batch_size:
+            statement = text(sql).execution_options(stream_results=True, max_row_buffer=batch_size)
+            return db.execute(statement, params).partitions(batch_size)
+        return db.execute(text(sql), params).all()
+
     @classmethod
-    def get_global_leaderboard(cls, db, limit=10):
+    def get_global_leaderboard(cls, db, limit=10, as_json=False, batch_size=None):
         """Get global leaderboard with detailed stats"""
-        return db.execute(text("""
+        sql = """
             SELECT u.username,
                    us.total_points,
                    us.games_played,
@@ -33,12 +46,14 @@ class Leaderboard(Base):
             JOIN users u ON us.user_id = u.id
             WHERE us.games_played > 0
             LIMIT :limit
-        """), {"limit": limit}).all()
+        """
+        params = {"limit": limit}
+        return cls._read(db, sql, params, as_json, batch_size)
 
     @classmethod
-    def get_category_leaderboard(cls, db, category_id, limit=10):
+    def get_category_leaderboard(cls, db, category_id, limit=10, as_json=False, batch_size=None):
         """Get category-specific leaderboard"""
-        return db.execute(text("""
+        sql = """
             SELECT u.username,
                    ucs.total_points,
                    ucs.games_played,
@@ -49,15 +64,17 @@ class Leaderboard(Base):
             JOIN users u ON ucs.user_id = u.id
             WHERE ucs.category_id = :category_id AND ucs.games_played > 0
             LIMIT :limit
-        """), {
+        """
+        params = {
             "category_id": category_id,
             "limit": limit
-        }).all()
+        }
+        return cls._read(db, sql, params, as_json, batch_size)
 
     @classmethod
-    def get_daily_leaderboard(cls, db, category_id=None, limit=10):
+    def get_daily_leaderboard(cls, db, category_id=None, limit=10, as_json=False):
         """Get daily leaderboard, optionally filtered by category"""
-        return db.execute(text("""
+        sql = """
             SELECT u.username,
                    l.score,
                    l.rank
@@ -68,15 +85,17 @@ class Leaderboard(Base):
               AND (l.category_id = :category_id OR :category_id IS NULL)
             ORDER BY l.rank
             LIMIT :limit
-        """), {
+        """
+        params = {
             "category_id": category_id,
             "limit": limit
-        }).all()
+        }
+        return cls._read(db, sql, params, as_json)
 
     @classmethod
-    def get_user_ranking_history(cls, db, user_id, limit=10):
+    def get_user_ranking_history(cls, db, user_id, limit=10, as_json=False):
         """Get user's ranking history across different scopes and categories"""
-        return db.execute(text("""
+        sql = """
             SELECT u.username,
                    l.scope,
                    l.score,
@@ -89,15 +108,17 @@ class Leaderboard(Base):
             WHERE l.user_id = :user_id
             ORDER BY l.generated_at DESC
             LIMIT :limit
-        """), {
+        """
+        params = {
             "user_id": user_id,
             "limit": limit
-        }).all()
+        }
+        return cls._read(db, sql, params, as_json)
 
     @classmethod
-    def get_category_stats(cls, db):
+    def get_category_stats(cls, db, as_json=False):
         """Get statistics for all categories"""
-        return db.execute(text("""
+        sql = """
             SELECT c.name as category_name,
                    COUNT(DISTINCT q.id) as total_questions,
                    COUNT(DISTINCT gr.id) as times_played,
@@ -106,10 +127,12 @@ class Leaderboard(Base):
             FROM categories c
             LEFT JOIN questions q ON c.id = q.category_id
             LEFT JOIN game_rounds gr ON q.id = gr.question_id
-            LEFT JOIN round_answers ra ON gr.id = ra.round_id
+            LEFT JOIN round_answers ra ON gr.id = ra.round_id AND ra.game_created_at = gr.game_created_at
             LEFT JOIN game_participants gp ON ra.user_id = gp.user_id
             GROUP BY c.id, c.name
-        """)).all()
+        """
+        params = {}
+        return cls._read(db, sql, params, as_json)
 
     @classmethod
     def refresh_daily_leaderboard(cls, db):
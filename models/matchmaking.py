@@ -26,6 +26,17 @@ class Matchmaker:
         cur.close()
         conn.close()
 
+    @staticmethod
+    def queue_depth():
+        """Number of players waiting for an opponent"""
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM waiting_players")
+        depth = cur.fetchone()[0]
+        cur.close()
+        conn.close()
+        return depth
+
     def find_match(self, user_id):
         """Find a match for the given user"""
         # First, add the user to the waiting pool
@@ -1,6 +1,23 @@
 from db.connection import get_connection
+from db.streaming import iter_batches
+
+# The question bank with each question's choices in position order, for the
+# admin export
+EXPORT_SQL = """
+    SELECT q.id, q.text, c.name, q.difficulty,
+           json_agg(json_build_object('position', qc.position, 'text', qc.choice_text,
+                                      'is_correct', qc.is_correct)
+                    ORDER BY qc.position) AS choices
+    FROM questions q
+    JOIN categories c ON c.id = q.category_id
+    JOIN question_choices qc ON qc.question_id = q.id
+    GROUP BY q.id, c.name
+    ORDER BY q.id
+"""
 
 class Question:
+    __slots__ = ('id', 'text', 'choices', 'correct_answer', 'category')
+
     def __init__(self, id, text, choices, correct_answer, category):
         self.id = id
         self.text = text
@@ -8,6 +25,22 @@ class Question:
         self.correct_answer = correct_answer
         self.category = category
 
+    @classmethod
+    def from_row(cls, row):
+        """Build from an ``(id, text, choices, correct_answer, category)`` row"""
+        question = cls.__new__(cls)
+        question.id, question.text, question.choices, question.correct_answer, question.category = row
+        return question
+
+    @classmethod
+    def from_rows(cls, rows):
+        return list(map(cls.from_row, rows))
+
+    @staticmethod
+    def iter_bank(batch_size=1000):
+        """``EXPORT_SQL`` rows in batches from a server-side cursor"""
+        return iter_batches(EXPORT_SQL, batch_size=batch_size)
+
     @staticmethod
     def find_by_id(qid):
         conn = get_connection()
@@ -20,7 +53,7 @@ class Question:
         cur.close()
         conn.close()
         if row:
-            return Question(id=row[0], text=row[1], choices=row[2], correct_answer=row[3], category=row[4])
+            return Question.from_row(row)
         return None
 
     @staticmethod
@@ -37,7 +70,7 @@ class Question:
         rows = cur.fetchall()
         cur.close()
         conn.close()
-        return [Question(id=r[0], text=r[1], choices=r[2], correct_answer=r[3], category=r[4]) for r in rows]
+        return Question.from_rows(rows)
 
     @staticmethod
     def get_all_categories():
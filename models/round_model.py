@@ -2,8 +2,32 @@ from db.connection import get_connection
 from models.question_model import Question
 from datetime import datetime
 from typing import Optional, Dict, Any
+from utils.metrics import counter
+from utils.versions import bump
+
+rounds_started = counter(
+    'game_rounds_started_total',
+    'Game rounds moved to active'
+)
+
+def points_for(points_possible: int, time_limit_seconds: Optional[int],
+               response_time_ms: int) -> int:
+    """Points for a correct answer: the full amount without a time limit,
+    otherwise decreasing linearly to 0 at the limit"""
+    if not time_limit_seconds:
+        return points_possible
+
+    max_time_ms = time_limit_seconds * 1000
+    if response_time_ms >= max_time_ms:
+        return 0
+
+    time_factor = 1 - (response_time_ms / max_time_ms)
+    return int(points_possible * time_factor)
 
 class Round:
+    __slots__ = ('id', 'game_id', 'round_number', 'question_id', 'status',
+                 'time_limit_seconds', 'points_possible', 'start_time', 'end_time')
+
     def __init__(self, game_id: int, round_number: int, question_id: int,
                  id: Optional[int] = None, status: str = 'pending',
                  time_limit_seconds: Optional[int] = None,
@@ -21,13 +45,14 @@ class Round:
     def save(self):
         conn = get_connection()
         cur = conn.cursor()
+        # game_created_at is the partition key: rounds live in their game's month
         cur.execute("""
-            INSERT INTO game_rounds (game_id, round_number, question_id, status, 
+            INSERT INTO game_rounds (game_id, game_created_at, round_number, question_id, status,
                                    time_limit_seconds, points_possible)
-            VALUES (%s, %s, %s, %s, %s, %s)
+            SELECT id, created_at, %s, %s, %s, %s, %s FROM games WHERE id = %s
             RETURNING id
-        """, (self.game_id, self.round_number, self.question_id, self.status,
-              self.time_limit_seconds, self.points_possible))
+        """, (self.round_number, self.question_id, self.status,
+              self.time_limit_seconds, self.points_possible, self.game_id))
         self.id = cur.fetchone()[0]
         conn.commit()
         cur.close()
@@ -51,6 +76,8 @@ class Round:
             self.start_time = cur.fetchone()[0]
             self.status = 'active'
             conn.commit()
+            bump(f"game:{self.game_id}")
+            rounds_started.inc()
         finally:
             cur.close()
             conn.close()
@@ -73,6 +100,7 @@ class Round:
             self.end_time = cur.fetchone()[0]
             self.status = 'completed'
             conn.commit()
+            bump(f"game:{self.game_id}")
         finally:
             cur.close()
             conn.close()
@@ -106,13 +134,15 @@ class Round:
             # Save answer
             cur.execute("""
                 INSERT INTO round_answers 
-                (round_id, user_id, choice_id, answer_time, response_time_ms, 
+                (round_id, game_created_at, user_id, choice_id, answer_time, response_time_ms, 
                  is_correct, points_earned)
-                VALUES (%s, %s, %s, NOW(), %s, %s, %s)
+                SELECT id, game_created_at, %s, %s, NOW(), %s, %s, %s
+                FROM game_rounds WHERE id = %s
                 RETURNING id
-            """, (self.id, user_id, choice_id, response_time_ms, is_correct, points_earned))
+            """, (user_id, choice_id, response_time_ms, is_correct, points_earned, self.id))
             
             conn.commit()
+            bump(f"game:{self.game_id}")
             return {
                 'is_correct': is_correct,
                 'points_earned': points_earned
@@ -123,16 +153,7 @@ class Round:
 
     def calculate_points(self, response_time_ms: int) -> int:
         """Calculate points based on response time"""
-        if not self.time_limit_seconds:
-            return self.points_possible
-            
-        max_time_ms = self.time_limit_seconds * 1000
-        if response_time_ms >= max_time_ms:
-            return 0
-            
-        # Points decrease linearly with time
-        time_factor = 1 - (response_time_ms / max_time_ms)
-        return int(self.points_possible * time_factor)
+        return points_for(self.points_possible, self.time_limit_seconds, response_time_ms)
 
     @staticmethod
     def get_by_id(round_id: int) -> Optional['Round']:
@@ -148,17 +169,11 @@ class Round:
             if not row:
                 return None
                 
-            round = Round(
-                game_id=row[0],
-                round_number=row[1],
-                question_id=row[2],
-                status=row[3],
-                time_limit_seconds=row[4],
-                points_possible=row[5]
-            )
+            round = Round.__new__(Round)
             round.id = round_id
-            round.start_time = row[6]
-            round.end_time = row[7]
+            (round.game_id, round.round_number, round.question_id, round.status,
+             round.time_limit_seconds, round.points_possible, round.start_time,
+             round.end_time) = row
             return round
         finally:
             cur.close()
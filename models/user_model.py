@@ -2,8 +2,19 @@ from db.connection import get_connection
 from datetime import datetime, timedelta
 from psycopg2.errors import UniqueViolation
 from typing import Optional, Dict, Any, List
+from utils.lru import LRUCache
+from utils.versions import bump, resource_versions
+
+# Authenticated users are looked up on almost every request; entries are
+# stamped with the user's version so User.update on any worker invalidates them
+_identity_cache = LRUCache(maxsize=10000, ttl=300, name='identity')
 
 class User:
+    # Cached in _identity_cache for every active user; slots drop the
+    # per-instance __dict__
+    __slots__ = ('id', 'username', 'email', 'password_hash', 'created_at', 'last_login',
+                 'role', 'is_active', 'profile')
+
     def __init__(self, username: str, email: str, password_hash: str, id: Optional[int] = None,
                  created_at: Optional[datetime] = None, last_login: Optional[datetime] = None,
                  role: str = 'user', is_active: bool = True, profile: Optional[Dict[str, Any]] = None):
@@ -23,8 +34,8 @@ class User:
             "id": self.id,
             "username": self.username,
             "email": self.email,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "last_login": self.last_login.isoformat() if self.last_login else None,
+            "created_at": self.created_at,
+            "last_login": self.last_login,
             "role": self.role,
             "is_active": self.is_active,
             "profile": self.profile
@@ -35,26 +46,19 @@ class User:
 
     @staticmethod
     def _create_user_from_row(row: tuple) -> 'User':
-        """Create a User instance from a database row"""
-        user = User(
-            id=row[0],
-            username=row[1],
-            email=row[2],
-            password_hash=row[3],
-            created_at=row[4],
-            last_login=row[5],
-            role=row[7],
-            is_active=row[6],
-            profile={
-                "display_name": row[9],
-                "avatar_url": row[10],
-                "bio": row[11],
-                "country": row[12],
-                "timezone": row[13],
-                "preferences": row[14] or {},
-                "updated_at": row[15]
-            } if row[9] is not None else None
-        )
+        """Create a User instance from a ``users`` + ``user_profiles`` row"""
+        user = User.__new__(User)
+        (user.id, user.username, user.email, user.password_hash, user.created_at,
+         user.last_login, user.is_active, user.role) = row[:8]
+        user.profile = {
+            "display_name": row[9],
+            "avatar_url": row[10],
+            "bio": row[11],
+            "country": row[12],
+            "timezone": row[13],
+            "preferences": row[14] or {},
+            "updated_at": row[15]
+        } if row[9] is not None else {}
         return user
 
     def save(self) -> None:
@@ -165,6 +169,7 @@ class User:
                     }
             
             cur.execute("COMMIT")
+            User.invalidate_cached(self.id)
             
         except UniqueViolation:
             cur.execute("ROLLBACK")
@@ -194,6 +199,28 @@ class User:
             cur.close()
             conn.close()
 
+    @classmethod
+    def get_cached(cls, user_id: int) -> Optional['User']:
+        """Find user by ID, served from the identity cache while it is current.
+
+        The instance is shared by every request in the worker: read it, but
+        load a fresh one with ``find_by_id`` before calling ``update``.
+        """
+        stamp = resource_versions.stamp([f"user:{user_id}"])
+        entry = _identity_cache.get(user_id)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        user = cls.find_by_id(user_id)
+        if user:
+            _identity_cache.set(user_id, (stamp, user))
+        return user
+
+    @staticmethod
+    def invalidate_cached(user_id: int) -> None:
+        """Drop a user from the identity cache of every worker"""
+        _identity_cache.pop(user_id)
+        bump(f"user:{user_id}")
+
     @classmethod
     def find_by_username(cls, username: str) -> Optional['User']:
         """Find user by username"""
@@ -273,7 +300,7 @@ class User:
                 "highest_score": row[8],
                 "current_streak": row[9],
                 "best_streak": row[10],
-                "last_played_at": row[11].isoformat() if row[11] else None,
+                "last_played_at": row[11],
                 "achievements_count": row[13],
                 "games_participated": row[14],
                 "global_rank": row[16],
@@ -305,7 +332,7 @@ class User:
                 "badge_url": row[6],
                 "difficulty": row[7],
                 "category_name": row[9],
-                "earned_at": row[10].isoformat()
+                "earned_at": row[10]
             } for row in cur.fetchall()]
         finally:
             cur.close()
@@ -338,6 +365,7 @@ class User:
             """, (user_id,))
             
             conn.commit()
+            User.invalidate_cached(user_id)
             
             return {
                 "session_id": session_data[0],
@@ -368,3 +396,50 @@ class User:
         finally:
             cur.close()
             conn.close()
+
+    @staticmethod
+    def active_session_tokens(tokens: List[str]) -> List[str]:
+        """Return the subset of tokens that still belong to an active, unexpired session"""
+        if not tokens:
+            return []
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT session_token
+                FROM user_sessions
+                WHERE session_token = ANY(%s)
+                  AND is_active = true
+                  AND expires_at > NOW()
+            """, (list(tokens),))
+            return [row[0] for row in cur.fetchall()]
+        finally:
+            cur.close()
+            conn.close()
+
+    @staticmethod
+    def expire_sessions(batch_size: int = 1000) -> List[str]:
+        """Deactivate up to batch_size expired sessions and return their tokens"""
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            # The inner scan is served by idx_user_sessions_expiry
+            # (expires_at WHERE is_active = TRUE)
+            cur.execute("""
+                UPDATE user_sessions
+                SET is_active = false
+                WHERE id IN (
+                    SELECT id FROM user_sessions
+                    WHERE is_active = true AND expires_at < NOW()
+                    ORDER BY expires_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING session_token
+            """, (batch_size,))
+            tokens = [row[0] for row in cur.fetchall()]
+            conn.commit()
+            return tokens
+        finally:
+            cur.close()
+            conn.close()
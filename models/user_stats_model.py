@@ -1,11 +1,98 @@
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from db.connection import get_connection
-from db.query_loader import load_queries
+from db.query_loader import LazyQueries
+from db.streaming import iter_batches
+from utils.exceptions import ArchiveError
 
-QUERIES = load_queries("sql/user_stats.sql")
+QUERIES = LazyQueries("sql/user_stats.sql")
+
+# Game results are accumulated into user_stats once per game, in the
+# transaction that completes it. A game with no winner_id is a draw.
+SETTLE_GAME_SQL = """
+    INSERT INTO user_stats AS us (user_id, games_played, games_won, games_lost, games_drawn,
+                                  total_points, highest_score, last_played_at, stats_updated_at)
+    SELECT gp.user_id, 1,
+           CASE WHEN g.winner_id = gp.user_id THEN 1 ELSE 0 END,
+           CASE WHEN g.winner_id <> gp.user_id THEN 1 ELSE 0 END,
+           CASE WHEN g.winner_id IS NULL THEN 1 ELSE 0 END,
+           gp.score, gp.score, g.end_time, NOW()
+    FROM game_participants gp
+    JOIN games g ON g.id = gp.game_id
+        AND g.created_at = (SELECT created_at FROM game_keys WHERE id = %s)
+    WHERE gp.game_id = %s AND g.status = 'completed'
+    ON CONFLICT (user_id) DO UPDATE
+    SET games_played = us.games_played + 1,
+        games_won = us.games_won + EXCLUDED.games_won,
+        games_lost = us.games_lost + EXCLUDED.games_lost,
+        games_drawn = us.games_drawn + EXCLUDED.games_drawn,
+        total_points = us.total_points + EXCLUDED.total_points,
+        highest_score = GREATEST(us.highest_score, EXCLUDED.highest_score),
+        last_played_at = GREATEST(us.last_played_at, EXCLUDED.last_played_at),
+        stats_updated_at = NOW()
+"""
+
+# Rebuilds the same columns from game history for a range of user ids
+RESET_GAME_RESULTS_SQL = """
+    UPDATE user_stats
+    SET games_played = 0, games_won = 0, games_lost = 0, games_drawn = 0,
+        total_points = 0, highest_score = 0, stats_updated_at = NOW()
+    WHERE user_id BETWEEN %(first)s AND %(last)s
+"""
+
+# Archived games (migration 012) are gone from game_participants, and the
+# catalog keeps only per-user completed counts, not wins, losses or points
+HAS_ARCHIVED_GAMES_SQL = "SELECT EXISTS (SELECT 1 FROM game_archive_files)"
+
+BACKFILL_GAME_RESULTS_SQL = """
+    INSERT INTO user_stats AS us (user_id, games_played, games_won, games_lost, games_drawn,
+                                  total_points, highest_score, last_played_at, stats_updated_at)
+    SELECT gp.user_id,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE g.winner_id = gp.user_id),
+           COUNT(*) FILTER (WHERE g.winner_id <> gp.user_id),
+           COUNT(*) FILTER (WHERE g.winner_id IS NULL),
+           SUM(gp.score), MAX(gp.score), MAX(g.end_time), NOW()
+    FROM game_participants gp
+    JOIN games g ON g.id = gp.game_id
+    WHERE gp.user_id BETWEEN %(first)s AND %(last)s AND g.status = 'completed'
+    GROUP BY gp.user_id
+    ON CONFLICT (user_id) DO UPDATE
+    SET games_played = EXCLUDED.games_played,
+        games_won = EXCLUDED.games_won,
+        games_lost = EXCLUDED.games_lost,
+        games_drawn = EXCLUDED.games_drawn,
+        total_points = EXCLUDED.total_points,
+        highest_score = EXCLUDED.highest_score,
+        last_played_at = EXCLUDED.last_played_at,
+        stats_updated_at = NOW()
+"""
+
+# Every player's totals, for the admin export
+EXPORT_SQL = """
+    SELECT us.user_id, u.username, us.games_played, us.games_won, us.games_lost,
+           us.games_drawn, us.total_points, us.highest_score, us.correct_answers,
+           us.total_answers, us.last_played_at
+    FROM user_stats us
+    JOIN users u ON u.id = us.user_id
+    ORDER BY us.user_id
+"""
+
+
+def settle_game(cur, game_id: int) -> None:
+    """Add a just-completed game to its participants' totals"""
+    cur.execute(SETTLE_GAME_SQL, (game_id, game_id))
+
+def iter_export(batch_size: int = 1000):
+    """``EXPORT_SQL`` rows in batches from a server-side cursor"""
+    return iter_batches(EXPORT_SQL, batch_size=batch_size)
 
 class UserStats:
+    __slots__ = ('user_id', 'games_played', 'wins', 'losses', 'draws', 'correct_answers',
+                 'total_answers', 'total_points', 'total_bonus_points', 'fastest_answer',
+                 'average_answer_time', 'longest_win_streak', 'current_win_streak',
+                 'perfect_games', 'xp', 'rank_points', 'last_updated')
+
     def __init__(self, user_id: int, games_played: int = 0, wins: int = 0, 
                  losses: int = 0, draws: int = 0, correct_answers: int = 0, 
                  total_answers: int = 0, total_points: int = 0, 
@@ -32,6 +119,18 @@ class UserStats:
         self.rank_points = rank_points
         self.last_updated = last_updated or datetime.now()
 
+    @classmethod
+    def from_row(cls, user_id: int, row: tuple) -> 'UserStats':
+        """Build from a ``get_user_stats`` row (columns in __slots__ order)"""
+        stats = cls.__new__(cls)
+        stats.user_id = user_id
+        (stats.games_played, stats.wins, stats.losses, stats.draws, stats.correct_answers,
+         stats.total_answers, stats.total_points, stats.total_bonus_points,
+         stats.fastest_answer, stats.average_answer_time, stats.longest_win_streak,
+         stats.current_win_streak, stats.perfect_games, stats.xp, stats.rank_points,
+         stats.last_updated) = row[:16]
+        return stats
+
     def save(self):
         conn = get_connection()
         cur = conn.cursor()
@@ -75,7 +174,7 @@ class UserStats:
             "xp": self.xp,
             "current_win_streak": self.current_win_streak,
             "longest_win_streak": self.longest_win_streak,
-            "last_updated": self.last_updated.isoformat()
+            "last_updated": self.last_updated
         }
 
     @classmethod
@@ -88,26 +187,7 @@ class UserStats:
             if not row:
                 return None
 
-            stats = cls(
-                user_id=user_id,
-                games_played=row[0],
-                wins=row[1],
-                losses=row[2],
-                draws=row[3],
-                correct_answers=row[4],
-                total_answers=row[5],
-                total_points=row[6],
-                total_bonus_points=row[7],
-                fastest_answer=row[8],
-                average_answer_time=row[9],
-                longest_win_streak=row[10],
-                current_win_streak=row[11],
-                perfect_games=row[12],
-                xp=row[13],
-                rank_points=row[14],
-                last_updated=row[15]
-            )
-            return stats
+            return cls.from_row(user_id, row)
         finally:
             cur.close()
             conn.close()
@@ -229,3 +309,66 @@ class UserStats:
         conn.commit()
         cur.close()
         conn.close()
+
+    @staticmethod
+    def game_results(user_id: int) -> Dict[str, Any]:
+        """Win/loss totals and scores from the maintained aggregates"""
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT games_played, games_won, games_lost, games_drawn, total_points, highest_score
+                FROM user_stats WHERE user_id = %s
+            """, (user_id,))
+            row = cur.fetchone() or (0, 0, 0, 0, 0, 0)
+        finally:
+            cur.close()
+            conn.close()
+        played, wins, losses, draws, points, highest = row
+        return {
+            'total_games': played,
+            'wins': wins,
+            'losses': losses,
+            'draws': draws,
+            'win_rate': round(wins / played * 100, 2) if played else 0,
+            'avg_score': round(points / played, 2) if played else 0,
+            'highest_score': highest
+        }
+
+    @staticmethod
+    def backfill_game_results(batch_size: int = 10000, log=print, discard_archived: bool = False) -> int:
+        """Recompute game totals for every user from game_participants.
+
+        Works through user ids in batches, one transaction each. Each batch
+        locks user_stats against concurrent settlement so a game finishing
+        mid-batch is neither lost nor counted twice. Returns users updated.
+
+        Archived games cannot be recounted, so this refuses to run once any
+        have been archived unless ``discard_archived`` accepts dropping them
+        from the totals.
+        """
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(HAS_ARCHIVED_GAMES_SQL)
+            if cur.fetchone()[0] and not discard_archived:
+                raise ArchiveError("Games have been archived; rebuilding would drop their results "
+                                   "from user_stats (pass discard_archived to proceed)")
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+            max_id = cur.fetchone()[0]
+            updated = 0
+            for first in range(1, max_id + 1, batch_size):
+                bounds = {'first': first, 'last': first + batch_size - 1}
+                cur.execute("LOCK TABLE user_stats IN SHARE ROW EXCLUSIVE MODE")
+                cur.execute(RESET_GAME_RESULTS_SQL, bounds)
+                cur.execute(BACKFILL_GAME_RESULTS_SQL, bounds)
+                updated += cur.rowcount
+                conn.commit()
+                log(f"users {bounds['first']}-{min(bounds['last'], max_id)}: {updated} updated")
+            return updated
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
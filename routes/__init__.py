@@ -2,10 +2,12 @@ from .user_routes import user_bp
 from .game_routes import game_bp
 from .category_routes import category_bp
 from .leaderboard_route import leaderboard_bp
+from .admin_routes import admin_bp
 
 __all__ = [
     'user_bp',
     'game_bp',
     'category_bp',
-    'leaderboard_bp'
+    'leaderboard_bp',
+    'admin_bp'
 ] 
\ No newline at end of file
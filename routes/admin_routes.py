@@ -0,0 +1,121 @@
+import re
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from db.instrumentation import query_stats
+from models import user_stats_model
+from models.question_model import Question
+from utils.auth import admin_required
+from utils.serialization import STREAM_FORMATS, RowShape, streamed_rows
+from utils.profiler import ProfilerBusyError, StackSampler, request_profiler
+
+admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+USER_STATS_EXPORT = RowShape("user_id", "username", "games_played", "games_won", "games_lost",
+                             "games_drawn", "total_points", "highest_score", "correct_answers",
+                             "total_answers", "last_played_at")
+QUESTION_EXPORT = RowShape("id", "text", "category", "difficulty", "choices")
+
+def export(batches, shape):
+    """Stream an export as NDJSON, or as one JSON array with ``format=json``"""
+    format = request.args.get("format", "ndjson")
+    if format not in STREAM_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(STREAM_FORMATS)}"}), 400
+    return streamed_rows(batches, shape, format)
+
+@admin_bp.route("/export/user-stats", methods=["GET"])
+@admin_required
+def export_user_stats():
+    """Every player's totals, streamed from a server-side cursor"""
+    batch_size = current_app.config.get("STREAM_BATCH_SIZE", 1000)
+    return export(user_stats_model.iter_export(batch_size), USER_STATS_EXPORT)
+
+@admin_bp.route("/export/questions", methods=["GET"])
+@admin_required
+def export_questions():
+    """The whole question bank with choices, streamed from a server-side cursor"""
+    batch_size = current_app.config.get("STREAM_BATCH_SIZE", 1000)
+    return export(Question.iter_bank(batch_size), QUESTION_EXPORT)
+
+@admin_bp.route("/queries", methods=["GET"])
+@admin_required
+def query_report():
+    """Per-statement latency and the rolling slow-query log for this worker"""
+    report = query_stats.report()
+    limit = request.args.get("limit", type=int)
+    if limit:
+        report["statements"] = report["statements"][:limit]
+    return jsonify(report)
+
+@admin_bp.route("/queries/report", methods=["POST"])
+@admin_required
+def write_query_report():
+    """Write this worker's query report to QUERY_REPORT_PATH"""
+    path = current_app.config.get("QUERY_REPORT_PATH")
+    if not path:
+        return jsonify({"error": "QUERY_REPORT_PATH is not configured"}), 400
+    return jsonify({"path": query_stats.write_report(path)}), 201
+
+@admin_bp.route("/queries/slow", methods=["DELETE"])
+@admin_required
+def clear_slow_queries():
+    query_stats.slow_queries.clear()
+    return "", 204
+
+@admin_bp.route("/profile", methods=["POST"])
+@admin_required
+def sample_profile():
+    """Sample every thread of this worker for N seconds.
+
+    Returns collapsed stacks (text/plain, for flame graphs) or, with
+    ``format=json``, the hottest functions plus the raw stacks.
+    """
+    max_seconds = current_app.config.get("PROFILER_MAX_SECONDS", 60)
+    seconds = min(request.args.get("seconds", 10, type=float), max_seconds)
+    interval_ms = max(request.args.get("interval_ms", 5, type=float), 1)
+    include_idle = request.args.get("idle", "false").lower() == "true"
+    if seconds <= 0:
+        return jsonify({"error": "seconds must be positive"}), 400
+
+    sampler = StackSampler(interval=interval_ms / 1000, include_idle=include_idle)
+    try:
+        sampler.run(seconds)
+    except ProfilerBusyError as e:
+        return jsonify({"error": e.message}), 409
+
+    if request.args.get("format") == "json":
+        return jsonify({
+            "seconds": seconds,
+            "samples": sampler.samples,
+            "top": sampler.top(request.args.get("limit", 25, type=int)),
+            "stacks": dict(sampler.stacks.most_common())
+        })
+    return Response(sampler.collapsed(), mimetype="text/plain")
+
+@admin_bp.route("/profile/requests", methods=["POST"])
+@admin_required
+def arm_request_profiler():
+    """Profile the next ``count`` requests whose endpoint or path matches ``route``"""
+    data = request.get_json() or {}
+    if not data.get("route"):
+        return jsonify({"error": "route is required"}), 400
+    try:
+        request_profiler.arm(
+            data["route"],
+            count=min(int(data.get("count", 5)), request_profiler.captures.maxlen),
+            seconds=int(data.get("seconds", 300))
+        )
+    except (re.error, ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid profiler settings: {e}"}), 400
+    return jsonify(request_profiler.status()), 201
+
+@admin_bp.route("/profile/requests", methods=["GET"])
+@admin_required
+def list_request_profiles():
+    return jsonify({**request_profiler.status(), "captures": list(request_profiler.captures)})
+
+@admin_bp.route("/profile/requests", methods=["DELETE"])
+@admin_required
+def disarm_request_profiler():
+    request_profiler.disarm()
+    request_profiler.captures.clear()
+    return "", 204
@@ -0,0 +1,437 @@
+"""Coroutine versions of the I/O-bound endpoints, served by asgi.py.
+
+Each handler answers the same URL as its blueprint counterpart with the same
+JSON shape, but waits on the database (and on long polls) without holding a
+thread. Work that only exists in synchronous form (finishing a game, version
+counters that may live in Redis) runs on a thread via ``asyncio.to_thread``.
+"""
+import asyncio
+import hashlib
+import time
+
+from db.async_pool import acquire, to_asyncpg
+from models.game_model import Game, REFRESH_USER_GAMES_SQL, _participants_cache
+from models.round_model import points_for
+from routes.game_routes import answer_latency
+from utils.asgi import Router, json_response, Response
+from utils.exceptions import GameError
+from utils.lru import LRUCache
+from utils.versions import bump, resource_versions
+
+router = Router()
+
+settings = {
+    'GAME_WAIT_TIMEOUT': 25,
+    'GAME_POLL_INTERVAL': 0.5,
+    'MATCHMAKING_WAIT_TIMEOUT': 25,
+    'MATCHMAKING_POLL_INTERVAL': 1.0,
+    'CACHE_TIMEOUTS': {},
+    'CACHE_DEFAULT_TIMEOUT': 300,
+}
+
+
+def init_async_routes(app):
+    """Take long-poll limits and leaderboard TTLs from the Flask config"""
+    for name in settings:
+        settings[name] = app.config.get(name, settings[name])
+    return router
+
+
+# Games are reached through game_keys (migration 013) so the probe into the
+# partitioned tables carries created_at and touches one partition
+GAME_STATE_SQL = """
+    SELECT g.id, g.status, g.game_type_id, g.game_config, g.start_time, g.end_time,
+           (SELECT json_agg(json_build_object(
+                       'user_id', u.id,
+                       'username', u.username,
+                       'score', gp.score,
+                       'status', gp.status))
+            FROM game_participants gp
+            JOIN users u ON u.id = gp.user_id
+            WHERE gp.game_id = g.id) AS participants
+    FROM game_keys k
+    JOIN games g ON g.id = k.id AND g.created_at = k.created_at
+    WHERE k.id = $1
+"""
+
+CURRENT_ROUND_SQL = """
+    SELECT gr.id, q.text, q.difficulty,
+           json_agg(json_build_object(
+               'id', qc.id,
+               'text', qc.choice_text,
+               'position', qc.position) ORDER BY qc.position) AS choices
+    FROM game_keys k
+    JOIN game_rounds gr ON gr.game_id = k.id AND gr.game_created_at = k.created_at
+    JOIN questions q ON q.id = gr.question_id
+    JOIN question_choices qc ON qc.question_id = q.id
+    WHERE k.id = $1 AND gr.status = 'active'
+    GROUP BY gr.id, q.text, q.difficulty
+"""
+
+PARTICIPANTS_SQL = "SELECT user_id FROM game_participants WHERE game_id = $1"
+
+ANSWER_TARGET_SQL = """
+    SELECT g.status, gr.id, gr.game_created_at, gr.question_id, gr.points_possible,
+           gr.time_limit_seconds
+    FROM game_keys k
+    JOIN games g ON g.id = k.id AND g.created_at = k.created_at
+    LEFT JOIN game_rounds gr ON gr.game_id = g.id AND gr.game_created_at = g.created_at
+        AND gr.status = 'active'
+    WHERE k.id = $1
+"""
+
+CHOICE_IS_CORRECT_SQL = "SELECT is_correct FROM question_choices WHERE id = $1 AND question_id = $2"
+
+# Correctness and points are worked out by the handler, as Round.save_answer
+# does, and written explicitly
+SUBMIT_ANSWER_SQL = """
+    WITH answer_submission AS (
+        INSERT INTO round_answers (round_id, game_created_at, user_id, choice_id,
+                                   response_time_ms, is_correct, points_earned)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+        RETURNING is_correct, points_earned
+    ),
+    score_update AS (
+        UPDATE game_participants
+        SET score = score + COALESCE((SELECT points_earned FROM answer_submission), 0)
+        WHERE game_id = $8 AND user_id = $3
+    )
+    SELECT is_correct, points_earned FROM answer_submission
+"""
+
+GAME_LEADERBOARD_SQL = """
+    SELECT u.username,
+           gp.score,
+           COUNT(ra.id) AS questions_answered,
+           COUNT(CASE WHEN ra.is_correct THEN 1 END) AS correct_answers,
+           ROUND(AVG(ra.response_time_ms)::numeric, 2) AS avg_response_time
+    FROM game_participants gp
+    JOIN users u ON gp.user_id = u.id
+    LEFT JOIN game_rounds gr ON gp.game_id = gr.game_id
+        AND gr.game_created_at = (SELECT created_at FROM game_keys WHERE id = $1)
+    LEFT JOIN round_answers ra ON gr.id = ra.round_id AND ra.game_created_at = gr.game_created_at
+        AND ra.user_id = gp.user_id
+    WHERE gp.game_id = $1
+    GROUP BY u.username, gp.score
+    ORDER BY gp.score DESC
+"""
+
+REFRESH_USER_GAMES_ASYNC_SQL = to_asyncpg(REFRESH_USER_GAMES_SQL)
+
+JOIN_QUEUE_SQL = """
+    INSERT INTO waiting_players (user_id)
+    VALUES ($1)
+    ON CONFLICT (user_id) DO NOTHING
+    RETURNING NOW()
+"""
+
+# A game created for the user since they started waiting: the opponent who
+# picked them from the queue (POST /games/new) has removed them from it
+MATCHED_GAME_SQL = """
+    SELECT g.id, o.user_id
+    FROM game_participants me
+    JOIN games g ON g.id = me.game_id
+    LEFT JOIN game_participants o ON o.game_id = g.id AND o.user_id <> me.user_id
+    WHERE me.user_id = $1
+      AND g.status IN ('pending', 'active')
+      AND g.created_at >= $2
+    ORDER BY g.created_at DESC
+    LIMIT 1
+"""
+
+QUEUE_DEPTH_SQL = "SELECT COUNT(*) FROM waiting_players"
+
+GLOBAL_LEADERBOARD_SQL = """
+    SELECT u.username,
+           us.total_points,
+           us.games_played,
+           us.games_won,
+           ROUND(us.games_won::numeric / NULLIF(us.games_played, 0) * 100, 2) as win_rate,
+           ROUND(us.correct_answers::numeric / NULLIF(us.total_answers, 0) * 100, 2) as accuracy,
+           RANK() OVER (ORDER BY us.total_points DESC) as rank
+    FROM user_stats us
+    JOIN users u ON us.user_id = u.id
+    WHERE us.games_played > 0
+    LIMIT $1
+"""
+
+CATEGORY_LEADERBOARD_SQL = """
+    SELECT u.username,
+           ucs.total_points,
+           ucs.games_played,
+           ucs.correct_answers,
+           ROUND(ucs.correct_answers::numeric / NULLIF(ucs.total_answers, 0) * 100, 2) as accuracy,
+           RANK() OVER (ORDER BY ucs.total_points DESC) as rank
+    FROM user_category_stats ucs
+    JOIN users u ON ucs.user_id = u.id
+    WHERE ucs.category_id = $1 AND ucs.games_played > 0
+    LIMIT $2
+"""
+
+# Leaderboard pages keyed by the "leaderboard" version, like the Flask
+# response cache, so finishing a game still invalidates them
+_leaderboards = LRUCache(maxsize=1000, name='async_leaderboards')
+
+
+def _bounded(value, default, upper):
+    try:
+        return min(max(float(value), 0), upper)
+    except (TypeError, ValueError):
+        return default
+
+
+async def _participants(game_id):
+    participants = _participants_cache.get(game_id)
+    if participants is None:
+        async with acquire() as conn:
+            rows = await conn.fetch(PARTICIPANTS_SQL, game_id)
+        participants = frozenset(row[0] for row in rows)
+        if participants:
+            _participants_cache.set(game_id, participants)
+    return participants
+
+
+async def _check_participant(game_id, user_id):
+    participants = await _participants(game_id)
+    if not participants:
+        return json_response({'error': 'Game not found'}, 404)
+    if user_id not in participants:
+        return json_response({'error': 'Unauthorized access'}, 403)
+    return None
+
+
+async def _game_etag(game_id, user_id):
+    epoch, versions = await asyncio.to_thread(resource_versions.stamp, [f"game:{game_id}"])
+    parts = [epoch, 'game.get_game', str(game_id), str(versions[0]), str(user_id)]
+    return hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+@router.route('/games/<int:game_id>', login=True)
+async def get_game(request):
+    """Game state. With ``If-None-Match`` and ``?wait=<seconds>`` this is a
+    long poll: it answers as soon as the game changes, or 304 at the deadline."""
+    game_id = request.params['game_id']
+    denied = await _check_participant(game_id, request.user_id)
+    if denied:
+        return denied
+
+    etag = await _game_etag(game_id, request.user_id)
+    if etag in request.if_none_match:
+        wait = _bounded(request.args.get('wait'), 0, settings['GAME_WAIT_TIMEOUT'])
+        deadline = time.monotonic() + wait
+        while etag in request.if_none_match and time.monotonic() < deadline:
+            await asyncio.sleep(settings['GAME_POLL_INTERVAL'])
+            etag = await _game_etag(game_id, request.user_id)
+        if etag in request.if_none_match:
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+
+    async with acquire() as conn:
+        row = await conn.fetchrow(GAME_STATE_SQL, game_id)
+        if row is None:
+            return json_response({'error': 'Game not found'}, 404)
+        current_round = None
+        if row[1] == 'active':
+            round_row = await conn.fetchrow(CURRENT_ROUND_SQL, game_id)
+            if round_row:
+                current_round = {
+                    'id': round_row[0],
+                    'question_text': round_row[1],
+                    'difficulty': round_row[2],
+                    'choices': round_row[3]
+                }
+
+    return json_response({
+        'id': row[0],
+        'status': row[1],
+        'game_type_id': row[2],
+        'config': row[3],
+        'start_time': row[4],
+        'end_time': row[5],
+        'participants': row[6],
+        'current_round': current_round
+    }, headers={'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'})
+
+
+def _finish_game(game_id):
+    game = Game.find_by_id(game_id)
+    game.finish_game()
+
+
+@router.route('/games/<int:game_id>/answer', methods=('POST',), login=True)
+async def submit_answer(request):
+    """Submit an answer for the current round"""
+    started = time.perf_counter()
+    try:
+        return await _submit_answer(request)
+    finally:
+        answer_latency.observe(time.perf_counter() - started)
+
+
+async def _submit_answer(request):
+    game_id = request.params['game_id']
+    data = request.get_json() or {}
+    denied = await _check_participant(game_id, request.user_id)
+    if denied:
+        return denied
+
+    async with acquire() as conn:
+        target = await conn.fetchrow(ANSWER_TARGET_SQL, game_id)
+        if target is None:
+            return json_response({'error': 'Game not found'}, 404)
+        if target[0] != 'active':
+            return json_response({'error': 'Game is not active'}, 400)
+        if target[1] is None:
+            return json_response({'error': 'No active round found'}, 400)
+
+        choice_id = data.get('choice_id')
+        if not choice_id:
+            return json_response({'error': 'Choice ID is required'}, 400)
+
+        round_id, game_created_at, question_id, points_possible, time_limit_seconds = target[1:]
+        is_correct = await conn.fetchval(CHOICE_IS_CORRECT_SQL, choice_id, question_id)
+        if is_correct is None:
+            return json_response({'error': 'Invalid choice'}, 400)
+        response_time_ms = data.get('response_time_ms', 0)
+        points_earned = points_for(points_possible, time_limit_seconds, response_time_ms) if is_correct else 0
+
+        try:
+            async with conn.transaction():
+                result = await conn.fetchrow(SUBMIT_ANSWER_SQL, round_id, game_created_at,
+                                             request.user_id, choice_id, response_time_ms,
+                                             is_correct, points_earned, game_id)
+                await conn.execute(REFRESH_USER_GAMES_ASYNC_SQL, [game_id])
+        except Exception as e:
+            return json_response({'error': f"Failed to submit answer: {str(e)}"}, 500)
+
+        leaderboard = [
+            {
+                'username': row[0],
+                'score': row[1],
+                'questions_answered': row[2],
+                'correct_answers': row[3],
+                'avg_response_time': row[4]
+            }
+            for row in await conn.fetch(GAME_LEADERBOARD_SQL, game_id)
+        ]
+
+    await asyncio.to_thread(bump, f"game:{game_id}")
+    response = {
+        'result': {
+            'is_correct': result[0] if result else None,
+            'points_earned': result[1] if result else 0
+        },
+        'leaderboard': leaderboard
+    }
+
+    if data.get('is_final_round', False):
+        try:
+            await asyncio.to_thread(_finish_game, game_id)
+        except GameError as e:
+            return json_response({'error': str(e)}, 500)
+        response['game_finished'] = True
+
+    return json_response(response)
+
+
+@router.route('/games/matchmaking/wait', login=True)
+async def wait_for_match(request):
+    """Join the matchmaking queue and hold the request until another player
+    starts a game against this one, up to ``?timeout=`` seconds.
+
+    The connection is returned to the pool between polls, so thousands of
+    waiting players only cost a coroutine each.
+    """
+    timeout = _bounded(request.args.get('timeout'), settings['MATCHMAKING_WAIT_TIMEOUT'],
+                       settings['MATCHMAKING_WAIT_TIMEOUT'])
+    async with acquire() as conn:
+        since = await conn.fetchval(JOIN_QUEUE_SQL, request.user_id)
+        if since is None:
+            # Already queued (an earlier poll): look back to when they joined
+            since = await conn.fetchval(
+                "SELECT joined_at FROM waiting_players WHERE user_id = $1", request.user_id)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        async with acquire() as conn:
+            row = await conn.fetchrow(MATCHED_GAME_SQL, request.user_id, since)
+            if row is not None:
+                return json_response({'matched': True, 'game_id': row[0], 'opponent_id': row[1]})
+            if time.monotonic() >= deadline:
+                depth = await conn.fetchval(QUEUE_DEPTH_SQL)
+                return json_response({'matched': False, 'queue_depth': depth})
+        await asyncio.sleep(settings['MATCHMAKING_POLL_INTERVAL'])
+
+
+async def _cached_leaderboard(endpoint, key, load):
+    epoch, versions = await asyncio.to_thread(resource_versions.stamp, ['leaderboard'])
+    ttl = settings['CACHE_TIMEOUTS'].get(endpoint, settings['CACHE_DEFAULT_TIMEOUT'])
+    cache_key = (endpoint, key, epoch, versions[0], int(time.time() // ttl))
+    body = _leaderboards.get(cache_key)
+    if body is None:
+        body = json_response({'status': 'success', 'data': await load()}).body
+        _leaderboards.set(cache_key, body)
+    return Response(body, headers={'Content-Type': 'application/json'})
+
+
+def _limit(request):
+    try:
+        return min(int(request.args.get('limit', 10)), 100)
+    except ValueError:
+        return None
+
+
+def _streamed(request):
+    """Streamed leaderboards (see leaderboard_route.stream_format) are
+    served by the Flask route"""
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return False
+    return request.args.get('format') == 'ndjson' or limit > 100
+
+
+@router.route('/api/leaderboard/global', defer=_streamed)
+async def get_global_leaderboard(request):
+    """Get global leaderboard with detailed stats"""
+    limit = _limit(request)
+    if limit is None:
+        return json_response({'status': 'error', 'message': 'limit must be an integer'}, 400)
+
+    async def load():
+        async with acquire() as conn:
+            rows = await conn.fetch(GLOBAL_LEADERBOARD_SQL, limit)
+        return [{
+            'username': row['username'],
+            'total_points': row['total_points'],
+            'games_played': row['games_played'],
+            'games_won': row['games_won'],
+            'win_rate': float(row['win_rate'] or 0),
+            'accuracy': float(row['accuracy'] or 0),
+            'rank': row['rank']
+        } for row in rows]
+
+    return await _cached_leaderboard('leaderboard.get_global_leaderboard', limit, load)
+
+
+@router.route('/api/leaderboard/category/<int:category_id>', defer=_streamed)
+async def get_category_leaderboard(request):
+    """Get category-specific leaderboard"""
+    limit = _limit(request)
+    if limit is None:
+        return json_response({'status': 'error', 'message': 'limit must be an integer'}, 400)
+    category_id = request.params['category_id']
+
+    async def load():
+        async with acquire() as conn:
+            rows = await conn.fetch(CATEGORY_LEADERBOARD_SQL, category_id, limit)
+        return [{
+            'username': row['username'],
+            'total_points': row['total_points'],
+            'games_played': row['games_played'],
+            'correct_answers': row['correct_answers'],
+            'accuracy': float(row['accuracy'] or 0),
+            'rank': row['rank']
+        } for row in rows]
+
+    return await _cached_leaderboard('leaderboard.get_category_leaderboard',
+                                     (category_id, limit), load)
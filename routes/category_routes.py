@@ -1,11 +1,23 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from models.category_model import Category
 from utils.auth import admin_required
+from utils.cache import cached
+from utils.etag import conditional
+from utils.serialization import RowShape, raw_json_response, streamed_rows
 
 category_bp = Blueprint("category", __name__)
 
+CATEGORY = RowShape('id', 'name', 'question_count')
+
 @category_bp.route("/categories", methods=["GET"])
+@conditional(("categories",), ttl=True)
+@cached(tags=("categories",))
 def list_categories():
+    if request.args.get("format") == "ndjson":
+        batches = Category.iter_all(current_app.config.get('STREAM_BATCH_SIZE', 1000))
+        return streamed_rows(batches, CATEGORY, "ndjson")
+    if current_app.config.get('DB_JSON_RESPONSES'):
+        return raw_json_response(Category.all_json())
     categories = Category.all()
     return jsonify([
         {"id": c.id, "name": c.name, "question_count": c.question_count} 
@@ -1,13 +1,22 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, current_app, jsonify, request, session
 from functools import wraps
 from typing import Dict, Any, Callable
 from datetime import datetime
 
 from models.game_model import Game
 from models.user_model import User
+from models.user_stats_model import UserStats
 from models.matchmaking import Matchmaker
 from utils.exceptions import GameError, ValidationError
-from db.connection import get_connection
+from utils.pagination import decode_cursor, encode_cursor
+from utils.etag import conditional
+from utils.metrics import histogram
+from utils.serialization import json_response_with
+
+answer_latency = histogram(
+    'game_answer_submit_seconds',
+    'Time to validate, score and respond to an answer submission'
+)
 
 game_bp = Blueprint('game', __name__, url_prefix='/games')
 
@@ -19,6 +28,18 @@ def login_required(f: Callable) -> Callable:
         return f(*args, **kwargs)
     return decorated_function
 
+def participant_required(f: Callable) -> Callable:
+    """Reject users who are not participants of the game in the URL"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        participants = Game.participant_ids(kwargs['game_id'])
+        if not participants:
+            return jsonify({'error': 'Game not found'}), 404
+        if session['user_id'] not in participants:
+            return jsonify({'error': 'Unauthorized access'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
 @game_bp.route('/new', methods=['POST'])
 @login_required
 def create_game():
@@ -34,7 +55,7 @@ def create_game():
         # Get opponent - either specified or via matchmaking
         opponent_id = data.get('opponent_id')
         if opponent_id:
-            opponent = User.find_by_id(opponent_id)
+            opponent = User.get_cached(opponent_id)
             if not opponent:
                 return jsonify({'error': 'Opponent not found'}), 404
         else:
@@ -61,6 +82,8 @@ def create_game():
 
 @game_bp.route('/<int:game_id>', methods=['GET'])
 @login_required
+@participant_required
+@conditional(lambda game_id: (f"game:{game_id}",), per_user=True)
 def get_game(game_id: int):
     """Get game details"""
     try:
@@ -68,11 +91,6 @@ def get_game(game_id: int):
         if not game:
             return jsonify({'error': 'Game not found'}), 404
             
-        # Check if user is a participant
-        participant_ids = [p['user_id'] for p in game.participants]
-        if session['user_id'] not in participant_ids:
-            return jsonify({'error': 'Unauthorized access'}), 403
-            
         game_data = {
             'id': game.id,
             'status': game.status,
@@ -91,6 +109,8 @@ def get_game(game_id: int):
 
 @game_bp.route('/<int:game_id>/answer', methods=['POST'])
 @login_required
+@participant_required
+@answer_latency.time()
 def submit_answer(game_id: int):
     """Submit an answer for the current round"""
     try:
@@ -98,11 +118,6 @@ def submit_answer(game_id: int):
         if not game:
             return jsonify({'error': 'Game not found'}), 404
             
-        # Check if user is a participant
-        participant_ids = [p['user_id'] for p in game.participants]
-        if session['user_id'] not in participant_ids:
-            return jsonify({'error': 'Unauthorized access'}), 403
-            
         if game.status != 'active':
             return jsonify({'error': 'Game is not active'}), 400
 
@@ -149,59 +164,24 @@ def submit_answer(game_id: int):
 def get_active_games():
     """Get user's active games"""
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT g.id, g.status, gt.name as game_type, g.start_time,
-                   json_agg(json_build_object(
-                       'user_id', u.id,
-                       'username', u.username,
-                       'score', gp.score
-                   )) as participants
-            FROM games g
-            JOIN game_types gt ON g.game_type_id = gt.id
-            JOIN game_participants gp ON g.id = gp.game_id
-            JOIN users u ON gp.user_id = u.id
-            WHERE EXISTS (
-                SELECT 1 FROM game_participants 
-                WHERE game_id = g.id AND user_id = %s
-            )
-            AND g.status IN ('pending', 'active')
-            GROUP BY g.id, gt.name
-            ORDER BY g.start_time DESC
-        """, (session['user_id'],))
-        
-        games = []
-        for row in cur.fetchall():
-            participants = row[4]
-            opponent = next(
-                (p for p in participants if p['user_id'] != session['user_id']),
-                None
-            )
-            
-            games.append({
-                'game_id': row[0],
-                'status': row[1],
-                'game_type': row[2],
-                'start_time': row[3].isoformat() if row[3] else None,
-                'opponent': opponent,
-                'your_score': next(
-                    p['score'] for p in participants 
-                    if p['user_id'] == session['user_id']
-                )
-            })
-            
+        if current_app.config.get('DB_JSON_RESPONSES'):
+            return json_response_with({}, games=Game.open_games_json(session['user_id']))
+        games = [{
+            'game_id': game['game_id'],
+            'status': game['status'],
+            'game_type': game['game_type'],
+            'start_time': game['start_time'].isoformat() if game['start_time'] else None,
+            'opponent': game['opponent'],
+            'your_score': game['your_score']
+        } for game in Game.open_games(session['user_id'])]
         return jsonify({'games': games}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cur.close()
-        conn.close()
 
 @game_bp.route('/<int:game_id>/forfeit', methods=['POST'])
 @login_required
+@participant_required
 def forfeit_game(game_id: int):
     """Forfeit a game"""
     try:
@@ -209,39 +189,15 @@ def forfeit_game(game_id: int):
         if not game:
             return jsonify({'error': 'Game not found'}), 404
             
-        # Check if user is a participant
-        participant_ids = [p['user_id'] for p in game.participants]
-        if session['user_id'] not in participant_ids:
-            return jsonify({'error': 'Unauthorized access'}), 403
-            
         if game.status != 'active':
             return jsonify({'error': 'Game is not active'}), 400
             
-        # Update game status and participant status
-        conn = get_connection()
-        try:
-            cur = conn.cursor()
-            cur.execute("""
-                WITH game_update AS (
-                    UPDATE games 
-                    SET status = 'finished',
-                        end_time = NOW()
-                    WHERE id = %s
-                    RETURNING id
-                )
-                UPDATE game_participants
-                SET status = 'forfeit'
-                WHERE game_id = %s AND user_id = %s
-            """, (game_id, game_id, session['user_id']))
-            conn.commit()
-            
-            return jsonify({
-                'status': 'finished',
-                'message': 'Game forfeited'
-            }), 200
-        finally:
-            cur.close()
-            conn.close()
+        winner_id = game.forfeit(session['user_id'])
+        return jsonify({
+            'status': 'finished',
+            'winner_id': winner_id,
+            'message': 'Game forfeited'
+        }), 200
 
     except GameError as e:
         return jsonify({'error': str(e)}), 500
@@ -249,126 +205,69 @@ def forfeit_game(game_id: int):
 @game_bp.route('/history', methods=['GET'])
 @login_required
 def get_game_history():
-    """Get user's game history with pagination"""
+    """Get user's completed games, newest first.
+
+    Pass the returned ``next_cursor`` as ``?cursor=`` for the following page;
+    ``page`` still works but costs an OFFSET scan.
+    """
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-        
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        # Get total count
-        cur.execute("""
-            SELECT COUNT(DISTINCT g.id)
-            FROM games g
-            JOIN game_participants gp ON g.id = gp.game_id
-            WHERE gp.user_id = %s AND g.status = 'finished'
-        """, (session['user_id'],))
-        total = cur.fetchone()[0]
-        
-        # Get paginated results
-        cur.execute("""
-            SELECT g.id, gt.name as game_type, g.start_time, g.end_time,
-                   json_agg(json_build_object(
-                       'user_id', u.id,
-                       'username', u.username,
-                       'score', gp.score,
-                       'status', gp.status
-                   )) as participants
-            FROM games g
-            JOIN game_types gt ON g.game_type_id = gt.id
-            JOIN game_participants gp ON g.id = gp.game_id
-            JOIN users u ON gp.user_id = u.id
-            WHERE EXISTS (
-                SELECT 1 FROM game_participants 
-                WHERE game_id = g.id AND user_id = %s
-            )
-            AND g.status = 'finished'
-            GROUP BY g.id, gt.name
-            ORDER BY g.end_time DESC
-            LIMIT %s OFFSET %s
-        """, (session['user_id'], per_page, (page - 1) * per_page))
-        
-        games = []
-        for row in cur.fetchall():
-            participants = row[4]
-            opponent = next(
-                (p for p in participants if p['user_id'] != session['user_id']),
-                None
-            )
-            your_result = next(
-                p for p in participants if p['user_id'] == session['user_id']
-            )
-            
-            games.append({
-                'game_id': row[0],
-                'game_type': row[1],
-                'start_time': row[2].isoformat() if row[2] else None,
-                'end_time': row[3].isoformat() if row[3] else None,
-                'opponent': opponent,
-                'your_score': your_result['score'],
-                'your_status': your_result['status'],
-                'duration': (row[3] - row[2]).total_seconds() if row[2] and row[3] else None
-            })
-            
-        return jsonify({
-            'games': games,
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
-        }), 200
+        per_page = min(max(int(request.args.get('per_page', 10)), 1), 100)
+        page = max(int(request.args.get('page', 1)), 1)
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'error': 'Invalid pagination parameters'}), 400
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
 
+    try:
+        user_id = session['user_id']
+        offset = 0 if after else (page - 1) * per_page
+        total = Game.count_history(user_id)
+        if current_app.config.get('DB_JSON_RESPONSES'):
+            rendered = Game.history_json(user_id, per_page, after=after, offset=offset)
+            if rendered is not None:
+                document, position = rendered
+                return json_response_with({
+                    'next_cursor': encode_cursor(*position) if position else None,
+                    'total': total,
+                    'page': page if not after else None,
+                    'per_page': per_page,
+                    'total_pages': (total + per_page - 1) // per_page
+                }, games=document)
+        rows = Game.history(user_id, per_page + 1, after=after, offset=offset)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cur.close()
-        conn.close()
+
+    games = [{
+        'game_id': row['game_id'],
+        'game_type': row['game_type'],
+        'start_time': row['start_time'].isoformat() if row['start_time'] else None,
+        'end_time': row['end_time'].isoformat() if row['end_time'] else None,
+        'opponent': row['opponent'],
+        'your_score': row['your_score'],
+        'your_status': row['your_status'],
+        'duration': row['duration']
+    } for row in rows[:per_page]]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = rows[per_page - 1]
+        next_cursor = encode_cursor(last['end_time'], last['game_id'])
+
+    return jsonify({
+        'games': games,
+        'next_cursor': next_cursor,
+        'total': total,
+        'page': page if not after else None,
+        'per_page': per_page,
+        'total_pages': (total + per_page - 1) // per_page
+    }), 200
 
 @game_bp.route('/stats', methods=['GET'])
 @login_required
 def get_player_stats():
     """Get player's game statistics"""
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT 
-                COUNT(*) as total_games,
-                COUNT(*) FILTER (WHERE 
-                    (player1_id = %s AND winner_id = player1_id) OR
-                    (player2_id = %s AND winner_id = player2_id)
-                ) as wins,
-                AVG(CASE 
-                    WHEN player1_id = %s THEN player1_score
-                    ELSE player2_score
-                END) as avg_score,
-                MAX(CASE 
-                    WHEN player1_id = %s THEN player1_score
-                    ELSE player2_score
-                END) as highest_score
-            FROM games
-            WHERE (player1_id = %s OR player2_id = %s)
-            AND status = 'finished'
-        """, (session['user_id'], session['user_id'], session['user_id'],
-              session['user_id'], session['user_id'], session['user_id']))
-        
-        row = cur.fetchone()
-        
-        stats = {
-            'total_games': row[0],
-            'wins': row[1],
-            'losses': row[0] - row[1],
-            'win_rate': round(row[1] / row[0] * 100, 2) if row[0] > 0 else 0,
-            'avg_score': round(row[2], 2) if row[2] else 0,
-            'highest_score': row[3] if row[3] else 0
-        }
-        
-        return jsonify(stats), 200
-
+        return jsonify(UserStats.game_results(session['user_id'])), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        cur.close()
-        conn.close()
@@ -1,110 +1,131 @@
-from flask import Blueprint, jsonify, request
-from flask_login import login_required, current_user
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, request, session
 from models.leaderboard_model import Leaderboard
 from db.database import db_session
 from sqlalchemy import text
+from utils.cache import cached, invalidate
+from utils.etag import conditional
+from utils.serialization import (STREAM_FORMATS, RowShape, json_response, json_response_with,
+                                 streamed_rows)
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
 
+# Response objects built straight from the Leaderboard query rows; field
+# order follows each query's SELECT list
+GLOBAL_PLAYER = RowShape('username', 'total_points', 'games_played', 'games_won',
+                         ('win_rate', 4, float), ('accuracy', 5, float), 'rank')
+CATEGORY_PLAYER = RowShape('username', 'total_points', 'games_played', 'correct_answers',
+                           ('accuracy', 4, float), 'rank')
+DAILY_PLAYER = RowShape('username', 'score', 'rank')
+RANKING_ENTRY = RowShape('username', 'scope', 'score', 'rank', 'category_name', 'generated_at')
+CATEGORY_STAT = RowShape('category_name', 'total_questions', 'times_played',
+                         ('avg_success_rate', 3, float), 'unique_players')
+
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def stream_format(limit):
+    """The format to stream this request in, or None to answer it whole.
+
+    ``format=ndjson`` or a limit over 100 streams the rows from a
+    server-side cursor, up to LEADERBOARD_STREAM_MAX_LIMIT of them.
+    """
+    format = request.args.get('format', 'json')
+    if format not in STREAM_FORMATS:
+        format = 'json'
+    if format == 'ndjson' or limit > 100:
+        return format
+    return None
+
+def stream_limit(limit):
+    return min(limit, current_app.config.get('LEADERBOARD_STREAM_MAX_LIMIT', 10000))
+
 @leaderboard_bp.route('/api/leaderboard/global', methods=['GET'])
+@conditional(("leaderboard",), ttl=True)
+@cached(tags=("leaderboard",))
 def get_global_leaderboard():
     """Get global leaderboard with detailed stats"""
     try:
-        limit = min(int(request.args.get('limit', 10)), 100)
+        limit = int(request.args.get('limit', 10))
+        format = stream_format(limit)
+        if format:
+            batches = Leaderboard.get_global_leaderboard(
+                db_session, stream_limit(limit),
+                batch_size=current_app.config.get('STREAM_BATCH_SIZE', 1000))
+            return streamed_rows(batches, GLOBAL_PLAYER, format, envelope={'status': 'success'})
+        if current_app.config.get('DB_JSON_RESPONSES'):
+            document = Leaderboard.get_global_leaderboard(db_session, limit, as_json=True)
+            return json_response_with({'status': 'success'}, data=document)
         players = Leaderboard.get_global_leaderboard(db_session, limit)
-        
-        return jsonify({
-            'status': 'success',
-            'data': [{
-                'username': player.username,
-                'total_points': player.total_points,
-                'games_played': player.games_played,
-                'games_won': player.games_won,
-                'win_rate': float(player.win_rate),
-                'accuracy': float(player.accuracy),
-                'rank': player.rank
-            } for player in players]
-        })
+        return json_response({'status': 'success', 'data': GLOBAL_PLAYER.rows(players)})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @leaderboard_bp.route('/api/leaderboard/category/<int:category_id>', methods=['GET'])
+@cached(tags=("leaderboard",))
 def get_category_leaderboard(category_id):
     """Get category-specific leaderboard"""
     try:
-        limit = min(int(request.args.get('limit', 10)), 100)
+        limit = int(request.args.get('limit', 10))
+        format = stream_format(limit)
+        if format:
+            batches = Leaderboard.get_category_leaderboard(
+                db_session, category_id, stream_limit(limit),
+                batch_size=current_app.config.get('STREAM_BATCH_SIZE', 1000))
+            return streamed_rows(batches, CATEGORY_PLAYER, format, envelope={'status': 'success'})
+        if current_app.config.get('DB_JSON_RESPONSES'):
+            document = Leaderboard.get_category_leaderboard(db_session, category_id, limit, as_json=True)
+            return json_response_with({'status': 'success'}, data=document)
         players = Leaderboard.get_category_leaderboard(db_session, category_id, limit)
-        
-        return jsonify({
-            'status': 'success',
-            'data': [{
-                'username': player.username,
-                'total_points': player.total_points,
-                'games_played': player.games_played,
-                'correct_answers': player.correct_answers,
-                'accuracy': float(player.accuracy),
-                'rank': player.rank
-            } for player in players]
-        })
+        return json_response({'status': 'success', 'data': CATEGORY_PLAYER.rows(players)})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @leaderboard_bp.route('/api/leaderboard/daily', methods=['GET'])
+@cached(tags=("leaderboard",))
 def get_daily_leaderboard():
     """Get daily leaderboard"""
     try:
         limit = min(int(request.args.get('limit', 10)), 100)
         category_id = request.args.get('category_id', type=int)
+        if current_app.config.get('DB_JSON_RESPONSES'):
+            document = Leaderboard.get_daily_leaderboard(db_session, category_id, limit, as_json=True)
+            return json_response_with({'status': 'success'}, data=document)
         players = Leaderboard.get_daily_leaderboard(db_session, category_id, limit)
-        
-        return jsonify({
-            'status': 'success',
-            'data': [{
-                'username': player.username,
-                'score': player.score,
-                'rank': player.rank
-            } for player in players]
-        })
+        return json_response({'status': 'success', 'data': DAILY_PLAYER.rows(players)})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @leaderboard_bp.route('/api/leaderboard/history/<int:user_id>', methods=['GET'])
+@cached(tags=("leaderboard", "categories"))
 def get_user_ranking_history(user_id):
     """Get user's ranking history"""
     try:
         limit = min(int(request.args.get('limit', 10)), 50)
+        if current_app.config.get('DB_JSON_RESPONSES'):
+            document = Leaderboard.get_user_ranking_history(db_session, user_id, limit, as_json=True)
+            return json_response_with({'status': 'success'}, data=document)
         history = Leaderboard.get_user_ranking_history(db_session, user_id, limit)
-        
-        return jsonify({
-            'status': 'success',
-            'data': [{
-                'username': entry.username,
-                'scope': entry.scope,
-                'score': entry.score,
-                'rank': entry.rank,
-                'category_name': entry.category_name,
-                'generated_at': entry.generated_at.isoformat()
-            } for entry in history]
-        })
+        return json_response({'status': 'success', 'data': RANKING_ENTRY.rows(history)})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @leaderboard_bp.route('/api/leaderboard/category-stats', methods=['GET'])
+@cached(tags=("leaderboard", "categories"))
 def get_category_statistics():
     """Get statistics for all categories"""
     try:
+        if current_app.config.get('DB_JSON_RESPONSES'):
+            document = Leaderboard.get_category_stats(db_session, as_json=True)
+            return json_response_with({'status': 'success'}, data=document)
         stats = Leaderboard.get_category_stats(db_session)
-        
-        return jsonify({
-            'status': 'success',
-            'data': [{
-                'category_name': stat.category_name,
-                'total_questions': stat.total_questions,
-                'times_played': stat.times_played,
-                'avg_success_rate': float(stat.avg_success_rate),
-                'unique_players': stat.unique_players
-            } for stat in stats]
-        })
+        return json_response({'status': 'success', 'data': CATEGORY_STAT.rows(stats)})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -114,11 +135,13 @@ def refresh_daily_leaderboard():
     """Refresh the daily leaderboard data"""
     try:
         Leaderboard.refresh_daily_leaderboard(db_session)
+        invalidate("leaderboard")
         return jsonify({'status': 'success', 'message': 'Daily leaderboard refreshed successfully'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @leaderboard_bp.route('/api/leaderboard/top', methods=['GET'])
+@cached(tags=("leaderboard",))
 def get_top_players():
     """Get top players on the leaderboard"""
     try:
@@ -140,6 +163,7 @@ def get_top_players():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @leaderboard_bp.route('/api/leaderboard/player/<int:user_id>', methods=['GET'])
+@cached(tags=("leaderboard",))
 def get_player_stats(user_id):
     """Get detailed stats for a specific player"""
     try:
@@ -187,19 +211,21 @@ def update_player_score():
         if 'score' not in data:
             return jsonify({'status': 'error', 'message': 'Score is required'}), 400
 
-        player = db_session.query(Leaderboard).filter_by(user_id=current_user.id).first()
+        player = db_session.query(Leaderboard).filter_by(user_id=session['user_id']).first()
         if not player:
-            player = Leaderboard(user_id=current_user.id)
+            player = Leaderboard(user_id=session['user_id'])
             db_session.add(player)
             db_session.commit()
 
         player.update_score(db_session, data['score'])
+        invalidate("leaderboard")
         
         return jsonify({'status': 'success', 'message': 'Score updated successfully'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @leaderboard_bp.route('/api/leaderboard/stats', methods=['GET'])
+@cached(tags=("leaderboard",))
 def get_leaderboard_stats():
     """Get general leaderboard statistics"""
     try:
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify, session
 from models.user_model import User
-from security.passwords import hash_password, verify_password
+from models.user_stats_model import UserStats
+from security.passwords import HashingBusyError, hash_password, verify_and_update
+from utils.auth import current_user
+from utils.cache import cached
 import re
 from functools import wraps
 import secrets
@@ -73,6 +76,8 @@ def register():
             "user": user.to_dict()
         }), 201
 
+    except HashingBusyError as e:
+        return jsonify({"error": "Service busy, please retry", "details": str(e)}), 503
     except Exception as e:
         return jsonify({"error": "Registration failed", "details": str(e)}), 500
 
@@ -90,8 +95,15 @@ def login():
             return jsonify({"error": "Username and password are required"}), 400
 
         user = User.find_by_username(username)
-        if not user or not verify_password(password, user.password_hash):
+        if not user:
+            return jsonify({"error": "Invalid credentials"}), 401
+
+        is_valid, new_hash = verify_and_update(password, user.password_hash)
+        if not is_valid:
             return jsonify({"error": "Invalid credentials"}), 401
+        if new_hash:
+            # Stored hash predates the current KDF parameters
+            user.update({"password_hash": new_hash})
 
         # Create session
         session_token = secrets.token_urlsafe(32)
@@ -113,6 +125,8 @@ def login():
             "session": session_data
         })
 
+    except HashingBusyError as e:
+        return jsonify({"error": "Service busy, please retry", "details": str(e)}), 503
     except Exception as e:
         return jsonify({"error": "Login failed", "details": str(e)}), 500
 
@@ -120,7 +134,7 @@ def login():
 @login_required
 def get_profile():
     try:
-        user = User.find_by_id(session["user_id"])
+        user = current_user()
         if not user:
             session.clear()
             return jsonify({"error": "User not found"}), 404
@@ -146,6 +160,8 @@ def update_profile():
         if not data:
             return jsonify({"error": "No data provided"}), 400
 
+        # Not current_user(): the cached instance is shared by every request in
+        # this worker, and update() changes the object it is called on
         user = User.find_by_id(session["user_id"])
         if not user:
             return jsonify({"error": "User not found"}), 404
@@ -179,6 +195,8 @@ def update_profile():
             "user": user.to_dict()
         })
 
+    except HashingBusyError as e:
+        return jsonify({"error": "Service busy, please retry", "details": str(e)}), 503
     except Exception as e:
         return jsonify({"error": "Failed to update profile", "details": str(e)}), 500
 
@@ -197,7 +215,7 @@ def logout():
 @login_required
 def get_user_stats():
     try:
-        user = User.find_by_id(session["user_id"])
+        user = current_user()
         if not user:
             return jsonify({"error": "User not found"}), 404
 
@@ -210,7 +228,7 @@ def get_user_stats():
 @login_required
 def get_user_achievements():
     try:
-        user = User.find_by_id(session["user_id"])
+        user = current_user()
         if not user:
             return jsonify({"error": "User not found"}), 404
 
@@ -220,6 +238,7 @@ def get_user_achievements():
         return jsonify({"error": "Failed to fetch achievements", "details": str(e)}), 500
 
 @user_bp.route("/leaderboard", methods=["GET"])
+@cached(tags=("leaderboard",))
 def get_leaderboard():
     """Get global leaderboard"""
     try:
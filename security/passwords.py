@@ -1,7 +1,141 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from utils.metrics import counter, gauge
+
+hash_queue_depth = gauge(
+    'password_hash_queue_depth',
+    'Password hash/verify operations waiting for or running on the hashing pool'
+)
+hash_operations = counter(
+    'password_hash_operations_total',
+    'Password hash/verify operations by type',
+    ('operation',)
+)
+hash_rejections = counter(
+    'password_hash_rejected_total',
+    'Operations rejected because the hashing pool stayed saturated'
+)
+
+
+# The pool starts inside threaded workers; forking there can copy a lock held
+# by another thread into the child, so children come from a clean forkserver
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class HashingBusyError(Exception):
+    """Raised when no hashing slot frees up within the configured timeout"""
+    def __init__(self, message="Password hashing capacity exhausted"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class PasswordHasher:
+    """Runs the KDF on a dedicated process pool so it never blocks request threads.
+
+    A semaphore caps the operations admitted at once; callers beyond the cap
+    wait up to ``timeout`` seconds and then get HashingBusyError, so a login
+    storm degrades into fast 503s instead of starving other endpoints.
+    With ``workers=0`` hashing runs inline (tests, one-off scripts).
+    """
+
+    def __init__(self, method='scrypt', salt_length=16, workers=0,
+                 max_pending=32, timeout=5):
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self.configure(method, salt_length, workers, max_pending, timeout)
+
+    def configure(self, method='scrypt', salt_length=16, workers=0,
+                  max_pending=32, timeout=5):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._method_prefix = None
+        self.shutdown()
+
+    @property
+    def method_prefix(self):
+        # Werkzeug expands defaults ("scrypt" -> "scrypt:32768:8:1"); hashes
+        # whose prefix differs were made with other parameters
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', self.method, 1).split('$', 1)[0]
+        return self._method_prefix
+
+    def _pool(self):
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context(_START_METHOD))
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=False)
+        self._executor = None
+
+    def _run(self, operation, fn, *args):
+        hash_operations.inc(operation=operation)
+        if not self.workers:
+            return fn(*args)
+        hash_queue_depth.inc()
+        if not self._slots.acquire(timeout=self.timeout):
+            hash_queue_depth.dec()
+            hash_rejections.inc()
+            raise HashingBusyError()
+        try:
+            return self._pool().submit(fn, *args).result()
+        finally:
+            hash_queue_depth.dec()
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run('hash', generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password, hashed):
+        return self._run('verify', check_password_hash, hashed, password)
+
+    def needs_rehash(self, hashed):
+        return hashed.split('$', 1)[0] != self.method_prefix
+
+
+hasher = PasswordHasher()
+
+
+def init_password_hashing(app):
+    """Configure the KDF cost and hashing pool from PASSWORD_HASH_* settings"""
+    hasher.configure(
+        method=app.config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+        salt_length=app.config.get('PASSWORD_SALT_LENGTH', 16),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 0),
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', 32),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 5)
+    )
+    return app
+
+
 def hash_password(password):
-    return generate_password_hash(password)
+    return hasher.hash(password)
 
 def verify_password(password, hashed):
-    return check_password_hash(hashed, password)
+    return hasher.verify(password, hashed)
+
+def verify_and_update(password, hashed):
+    """Check a password and return (valid, new_hash).
+
+    new_hash is set when the stored hash was made with outdated KDF
+    parameters and should replace it.
+    """
+    if not verify_password(password, hashed):
+        return False, None
+    if hasher.needs_rehash(hashed):
+        return True, hash_password(password)
+    return True, None
@@ -0,0 +1,11 @@
+-- Game History Indexes
+-- ================================
+
+-- Participant-first lookup of a user's games; INCLUDE lets the history query
+-- read score/status without visiting the heap
+CREATE INDEX IF NOT EXISTS idx_game_participants_user_game
+    ON game_participants(user_id, game_id) INCLUDE (score, status);
+
+-- Keyset order for completed games: (end_time, id) DESC
+CREATE INDEX IF NOT EXISTS idx_games_completed_end
+    ON games(end_time DESC, id DESC) WHERE status = 'completed';
@@ -0,0 +1,48 @@
+-- Per-user Game Summary
+-- ================================
+-- One row per participant per game, with the opponent and both scores
+-- already resolved. Refreshed by the application on every game state
+-- transition (create, answer, finish, forfeit, cancel); see
+-- models/game_model.py refresh_user_games.
+
+CREATE TABLE IF NOT EXISTS user_games (
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    game_id BIGINT NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    game_type VARCHAR(50) NOT NULL,
+    game_status VARCHAR(20) NOT NULL,
+    your_score INTEGER NOT NULL DEFAULT 0,
+    your_status VARCHAR(20) NOT NULL,
+    opponent_id BIGINT,
+    opponent_username VARCHAR(50),
+    opponent_score INTEGER,
+    opponent_status VARCHAR(20),
+    start_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP,
+    duration_seconds DOUBLE PRECISION,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, game_id)
+);
+
+-- Backfill from existing games
+INSERT INTO user_games (user_id, game_id, game_type, game_status, your_score, your_status,
+                        opponent_id, opponent_username, opponent_score, opponent_status,
+                        start_time, end_time, duration_seconds)
+SELECT DISTINCT ON (g.id, me.user_id)
+       me.user_id, g.id, gt.name, g.status, me.score, me.status,
+       o.user_id, u.username, o.score, o.status,
+       g.start_time, g.end_time, EXTRACT(EPOCH FROM g.end_time - g.start_time)
+FROM games g
+JOIN game_types gt ON gt.id = g.game_type_id
+JOIN game_participants me ON me.game_id = g.id
+LEFT JOIN game_participants o ON o.game_id = g.id AND o.user_id <> me.user_id
+LEFT JOIN users u ON u.id = o.user_id
+ORDER BY g.id, me.user_id, o.user_id
+ON CONFLICT (user_id, game_id) DO NOTHING;
+
+-- History: completed games newest first, keyset on (end_time, game_id)
+CREATE INDEX IF NOT EXISTS idx_user_games_history
+    ON user_games(user_id, end_time DESC, game_id DESC) WHERE game_status = 'completed';
+
+-- Games still in progress
+CREATE INDEX IF NOT EXISTS idx_user_games_open
+    ON user_games(user_id, start_time DESC) WHERE game_status IN ('pending', 'active');
@@ -0,0 +1,9 @@
+-- Per-user Game Results
+-- ================================
+-- Losses and draws next to games_played/games_won so /games/stats is a
+-- single primary-key read. Maintained at game settlement; rebuild with
+-- `python manage.py backfill_stats`.
+
+ALTER TABLE user_stats
+    ADD COLUMN IF NOT EXISTS games_lost INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS games_drawn INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,130 @@
+-- Monthly Partitions for Game Tables
+-- ================================
+-- games, game_rounds and round_answers become RANGE partitioned by the month
+-- the game was created. Rounds and answers carry the game's created_at as
+-- game_created_at, so a game and everything under it live in the same month:
+-- the foreign keys and UNIQUE constraints below stay exact, and retention
+-- detaches whole games (see db/partitions.py).
+--
+-- Tables outside the set (participants, user_games, achievements, chat
+-- rooms, notifications) keep game_id without a foreign key, since a key into
+-- a partitioned table has to include the partition column.
+
+CREATE SCHEMA IF NOT EXISTS archive;
+
+-- Move the old tables out of the way
+ALTER TABLE game_participants DROP CONSTRAINT IF EXISTS game_participants_game_id_fkey;
+ALTER TABLE user_games DROP CONSTRAINT IF EXISTS user_games_game_id_fkey;
+ALTER TABLE user_achievements DROP CONSTRAINT IF EXISTS user_achievements_game_id_fkey;
+ALTER TABLE chat_rooms DROP CONSTRAINT IF EXISTS chat_rooms_game_id_fkey;
+ALTER TABLE notifications DROP CONSTRAINT IF EXISTS notifications_related_game_id_fkey;
+
+ALTER TABLE round_answers RENAME TO round_answers_legacy;
+ALTER TABLE round_answers_legacy RENAME CONSTRAINT round_answers_pkey TO round_answers_legacy_pkey;
+ALTER TABLE round_answers_legacy RENAME CONSTRAINT round_answers_round_id_user_id_key TO round_answers_legacy_round_user_key;
+ALTER TABLE game_rounds RENAME TO game_rounds_legacy;
+ALTER TABLE game_rounds_legacy RENAME CONSTRAINT game_rounds_pkey TO game_rounds_legacy_pkey;
+ALTER TABLE game_rounds_legacy RENAME CONSTRAINT game_rounds_game_id_round_number_key TO game_rounds_legacy_game_round_key;
+ALTER TABLE games RENAME TO games_legacy;
+ALTER TABLE games_legacy RENAME CONSTRAINT games_pkey TO games_legacy_pkey;
+
+-- Partitioned replacements (ids keep their existing sequences)
+CREATE TABLE games (
+    id BIGINT NOT NULL DEFAULT nextval('games_id_seq'),
+    game_type_id INTEGER NOT NULL REFERENCES game_types(id),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'active', 'completed', 'cancelled')),
+    start_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    end_time TIMESTAMP,
+    game_config JSONB NOT NULL DEFAULT '{}'::JSONB,
+    winner_id BIGINT REFERENCES users(id),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT games_pkey PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE game_rounds (
+    id BIGINT NOT NULL DEFAULT nextval('game_rounds_id_seq'),
+    game_id BIGINT NOT NULL,
+    game_created_at TIMESTAMP NOT NULL,
+    round_number SMALLINT NOT NULL,
+    question_id BIGINT NOT NULL REFERENCES questions(id),
+    start_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    end_time TIMESTAMP,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'active', 'completed')),
+    time_limit_seconds INTEGER,
+    points_possible INTEGER NOT NULL DEFAULT 100,
+    CONSTRAINT game_rounds_pkey PRIMARY KEY (id, game_created_at),
+    CONSTRAINT game_rounds_game_round_key UNIQUE (game_id, round_number, game_created_at),
+    CONSTRAINT game_rounds_game_fkey FOREIGN KEY (game_id, game_created_at)
+        REFERENCES games(id, created_at) ON DELETE CASCADE
+) PARTITION BY RANGE (game_created_at);
+
+CREATE TABLE round_answers (
+    id BIGINT NOT NULL DEFAULT nextval('round_answers_id_seq'),
+    round_id BIGINT NOT NULL,
+    game_created_at TIMESTAMP NOT NULL,
+    user_id BIGINT NOT NULL REFERENCES users(id),
+    choice_id BIGINT NOT NULL REFERENCES question_choices(id),
+    answer_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    response_time_ms INTEGER,
+    is_correct BOOLEAN NOT NULL,
+    points_earned INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT round_answers_pkey PRIMARY KEY (id, game_created_at),
+    CONSTRAINT round_answers_round_user_key UNIQUE (round_id, user_id, game_created_at),
+    CONSTRAINT round_answers_round_fkey FOREIGN KEY (round_id, game_created_at)
+        REFERENCES game_rounds(id, game_created_at) ON DELETE CASCADE
+) PARTITION BY RANGE (game_created_at);
+
+ALTER SEQUENCE games_id_seq OWNED BY games.id;
+ALTER SEQUENCE game_rounds_id_seq OWNED BY game_rounds.id;
+ALTER SEQUENCE round_answers_id_seq OWNED BY round_answers.id;
+
+-- One partition per month from the oldest game to three months ahead;
+-- db/partitions.py keeps creating them after this
+DO $$
+DECLARE
+    month DATE := date_trunc('month', COALESCE((SELECT MIN(created_at) FROM games_legacy), CURRENT_DATE));
+    last_month DATE := date_trunc('month', CURRENT_DATE) + INTERVAL '3 months';
+    parent TEXT;
+BEGIN
+    WHILE month <= last_month LOOP
+        FOREACH parent IN ARRAY ARRAY['games', 'game_rounds', 'round_answers'] LOOP
+            EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                           parent || '_' || to_char(month, 'YYYY_MM'), parent,
+                           month, month + INTERVAL '1 month');
+        END LOOP;
+        month := month + INTERVAL '1 month';
+    END LOOP;
+END $$;
+
+-- Copy existing rows
+INSERT INTO games (id, game_type_id, status, start_time, end_time, game_config, winner_id, created_at)
+SELECT id, game_type_id, status, start_time, end_time, game_config, winner_id, created_at
+FROM games_legacy;
+
+INSERT INTO game_rounds (id, game_id, game_created_at, round_number, question_id, start_time,
+                         end_time, status, time_limit_seconds, points_possible)
+SELECT gr.id, gr.game_id, g.created_at, gr.round_number, gr.question_id, gr.start_time,
+       gr.end_time, gr.status, gr.time_limit_seconds, gr.points_possible
+FROM game_rounds_legacy gr
+JOIN games_legacy g ON g.id = gr.game_id;
+
+INSERT INTO round_answers (id, round_id, game_created_at, user_id, choice_id, answer_time,
+                           response_time_ms, is_correct, points_earned)
+SELECT ra.id, ra.round_id, gr.game_created_at, ra.user_id, ra.choice_id, ra.answer_time,
+       ra.response_time_ms, ra.is_correct, ra.points_earned
+FROM round_answers_legacy ra
+JOIN game_rounds gr ON gr.id = ra.round_id;
+
+DROP TABLE round_answers_legacy;
+DROP TABLE game_rounds_legacy;
+DROP TABLE games_legacy;
+
+-- Indexes are declared on the parents, so every partition (including ones
+-- created later) gets its own copy
+CREATE INDEX idx_games_status ON games(status) WHERE status = 'active';
+CREATE INDEX idx_games_type_status ON games(game_type_id, status);
+CREATE INDEX idx_games_completed_end ON games(end_time DESC, id DESC) WHERE status = 'completed';
+CREATE INDEX idx_game_rounds_game ON game_rounds(game_id, round_number);
+CREATE INDEX idx_round_answers_user ON round_answers(user_id, is_correct);
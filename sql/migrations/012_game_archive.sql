@@ -0,0 +1,25 @@
+-- Cold Storage Catalog
+-- ================================
+-- db/archive.py moves finished games out of the hot tables into compressed
+-- files under GAME_ARCHIVE_DIR. Each file gets one row here, written in the
+-- same transaction that deletes its games, so a game is always either in the
+-- tables or in exactly one catalogued file.
+--
+-- user_ids/completed_counts are parallel arrays: the users with a game in the
+-- file and how many of their completed games it holds. The GIN index finds a
+-- user's files for history pages and totals without opening any of them.
+
+CREATE TABLE IF NOT EXISTS game_archive_files (
+    id SERIAL PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    first_game_id BIGINT NOT NULL,
+    last_game_id BIGINT NOT NULL,
+    min_end_time TIMESTAMP,
+    max_end_time TIMESTAMP,
+    row_counts JSONB NOT NULL,
+    user_ids BIGINT[] NOT NULL,
+    completed_counts INTEGER[] NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_game_archive_files_users ON game_archive_files USING GIN (user_ids);
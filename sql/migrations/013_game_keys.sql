@@ -0,0 +1,20 @@
+-- Game Partition Keys
+-- ================================
+-- games is partitioned by created_at (migration 011), so a lookup by id
+-- alone probes every monthly partition's index. game_keys maps each game
+-- id to its created_at; the application reads it (through a process-wide
+-- cache, see db/partitions.py game_created_at) and adds created_at to its
+-- by-id statements so they touch one partition.
+--
+-- Rows are written by the statement that creates the game. They are never
+-- updated (created_at does not change); rows of archived games are left
+-- behind and simply find no game.
+
+CREATE TABLE IF NOT EXISTS game_keys (
+    id BIGINT PRIMARY KEY,
+    created_at TIMESTAMP NOT NULL
+);
+
+INSERT INTO game_keys (id, created_at)
+SELECT id, created_at FROM games
+ON CONFLICT (id) DO NOTHING;
@@ -127,8 +127,10 @@ CREATE TABLE IF NOT EXISTS game_types (
     is_active BOOLEAN NOT NULL DEFAULT TRUE
 );
 
+-- games, game_rounds and round_answers are partitioned by the game's creation
+-- month (partitions are created by db/partitions.py)
 CREATE TABLE IF NOT EXISTS games (
-    id BIGSERIAL PRIMARY KEY,
+    id BIGSERIAL,
     game_type_id INTEGER NOT NULL REFERENCES game_types(id),
     status VARCHAR(20) NOT NULL DEFAULT 'pending' 
         CHECK (status IN ('pending', 'active', 'completed', 'cancelled')),
@@ -136,13 +138,12 @@ CREATE TABLE IF NOT EXISTS games (
     end_time TIMESTAMP,
     game_config JSONB NOT NULL DEFAULT '{}'::JSONB,
     winner_id BIGINT REFERENCES users(id),
-    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-) ;
-
-
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT games_pkey PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
 CREATE TABLE IF NOT EXISTS game_participants (
-    game_id BIGINT NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    game_id BIGINT NOT NULL,
     user_id BIGINT NOT NULL REFERENCES users(id),
     join_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     score INTEGER NOT NULL DEFAULT 0,
@@ -153,8 +154,9 @@ CREATE TABLE IF NOT EXISTS game_participants (
 );
 
 CREATE TABLE IF NOT EXISTS game_rounds (
-    id BIGSERIAL PRIMARY KEY,
-    game_id BIGINT NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    id BIGSERIAL,
+    game_id BIGINT NOT NULL,
+    game_created_at TIMESTAMP NOT NULL,
     round_number SMALLINT NOT NULL,
     question_id BIGINT NOT NULL REFERENCES questions(id),
     start_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
@@ -163,19 +165,57 @@ CREATE TABLE IF NOT EXISTS game_rounds (
         CHECK (status IN ('pending', 'active', 'completed')),
     time_limit_seconds INTEGER,
     points_possible INTEGER NOT NULL DEFAULT 100,
-    UNIQUE (game_id, round_number)
-);
+    CONSTRAINT game_rounds_pkey PRIMARY KEY (id, game_created_at),
+    CONSTRAINT game_rounds_game_round_key UNIQUE (game_id, round_number, game_created_at),
+    CONSTRAINT game_rounds_game_fkey FOREIGN KEY (game_id, game_created_at)
+        REFERENCES games(id, created_at) ON DELETE CASCADE
+) PARTITION BY RANGE (game_created_at);
 
 CREATE TABLE IF NOT EXISTS round_answers (
-    id BIGSERIAL PRIMARY KEY,
-    round_id BIGINT NOT NULL REFERENCES game_rounds(id) ON DELETE CASCADE,
+    id BIGSERIAL,
+    round_id BIGINT NOT NULL,
+    game_created_at TIMESTAMP NOT NULL,
     user_id BIGINT NOT NULL REFERENCES users(id),
     choice_id BIGINT NOT NULL REFERENCES question_choices(id),
     answer_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     response_time_ms INTEGER,
     is_correct BOOLEAN NOT NULL,
     points_earned INTEGER NOT NULL DEFAULT 0,
-    UNIQUE (round_id, user_id)
+    CONSTRAINT round_answers_pkey PRIMARY KEY (id, game_created_at),
+    CONSTRAINT round_answers_round_user_key UNIQUE (round_id, user_id, game_created_at),
+    CONSTRAINT round_answers_round_fkey FOREIGN KEY (round_id, game_created_at)
+        REFERENCES game_rounds(id, game_created_at) ON DELETE CASCADE
+) PARTITION BY RANGE (game_created_at);
+
+CREATE TABLE IF NOT EXISTS user_games (
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    game_id BIGINT NOT NULL,
+    game_type VARCHAR(50) NOT NULL,
+    game_status VARCHAR(20) NOT NULL,
+    your_score INTEGER NOT NULL DEFAULT 0,
+    your_status VARCHAR(20) NOT NULL,
+    opponent_id BIGINT,
+    opponent_username VARCHAR(50),
+    opponent_score INTEGER,
+    opponent_status VARCHAR(20),
+    start_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP,
+    duration_seconds DOUBLE PRECISION,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, game_id)
+);
+
+CREATE TABLE IF NOT EXISTS game_archive_files (
+    id SERIAL PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    first_game_id BIGINT NOT NULL,
+    last_game_id BIGINT NOT NULL,
+    min_end_time TIMESTAMP,
+    max_end_time TIMESTAMP,
+    row_counts JSONB NOT NULL,
+    user_ids BIGINT[] NOT NULL,
+    completed_counts INTEGER[] NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
 -- ================================
@@ -186,6 +226,8 @@ CREATE TABLE IF NOT EXISTS user_stats (
     user_id BIGINT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
     games_played INTEGER NOT NULL DEFAULT 0,
     games_won INTEGER NOT NULL DEFAULT 0,
+    games_lost INTEGER NOT NULL DEFAULT 0,
+    games_drawn INTEGER NOT NULL DEFAULT 0,
     total_points INTEGER NOT NULL DEFAULT 0,
     correct_answers INTEGER NOT NULL DEFAULT 0,
     total_answers INTEGER NOT NULL DEFAULT 0,
@@ -245,7 +287,7 @@ CREATE TABLE IF NOT EXISTS user_achievements (
     user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     achievement_id INTEGER NOT NULL REFERENCES achievements(id),
     earned_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    game_id BIGINT REFERENCES games(id),
+    game_id BIGINT,
     PRIMARY KEY (user_id, achievement_id)
 );
 
@@ -258,7 +300,7 @@ CREATE TABLE IF NOT EXISTS chat_rooms (
     name VARCHAR(100),
     type VARCHAR(20) NOT NULL CHECK (type IN ('private', 'game', 'public')),
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    game_id BIGINT REFERENCES games(id) ON DELETE CASCADE
+    game_id BIGINT
 );
 
 CREATE TABLE IF NOT EXISTS chat_room_members (
@@ -299,7 +341,7 @@ CREATE TABLE IF NOT EXISTS notifications (
     data JSONB NOT NULL DEFAULT '{}'::JSONB,
     is_read BOOLEAN NOT NULL DEFAULT FALSE,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    related_game_id BIGINT REFERENCES games(id)
+    related_game_id BIGINT
 ) ;
 
 
@@ -324,6 +366,11 @@ CREATE INDEX idx_question_tags_tag ON question_tags(tag_id);
 CREATE INDEX idx_games_status ON games(status) WHERE status = 'active';
 CREATE INDEX idx_games_type_status ON games(game_type_id, status);
 CREATE INDEX idx_game_participants_user ON game_participants(user_id, status);
+CREATE INDEX idx_game_participants_user_game ON game_participants(user_id, game_id) INCLUDE (score, status);
+CREATE INDEX idx_games_completed_end ON games(end_time DESC, id DESC) WHERE status = 'completed';
+CREATE INDEX idx_user_games_history ON user_games(user_id, end_time DESC, game_id DESC) WHERE game_status = 'completed';
+CREATE INDEX idx_user_games_open ON user_games(user_id, start_time DESC) WHERE game_status IN ('pending', 'active');
+CREATE INDEX idx_game_archive_files_users ON game_archive_files USING GIN (user_ids);
 CREATE INDEX idx_game_rounds_game ON game_rounds(game_id, round_number);
 CREATE INDEX idx_round_answers_user ON round_answers(user_id, is_correct);
 
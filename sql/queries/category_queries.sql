@@ -1,35 +1,48 @@
+-- Category Queries
+-- ================================
+-- Loaded by models/category_model.py: each query follows a "--:<key>" line
+-- and takes psycopg2 (%s) parameters.
+
+--:get_all_categories_with_their_question_counts
 -- Get all categories with their question counts
 SELECT c.id, c.name, COUNT(q.id) as question_count
 FROM categories c
 LEFT JOIN questions q ON c.id = q.category_id
-GROUP BY c.id, c.name;
+GROUP BY c.id, c.name
+ORDER BY c.name;
 
+--:get_a_specific_category_by_name
 -- Get a specific category by name
 SELECT id, name
 FROM categories
-WHERE name = $1;
+WHERE name = %s;
 
--- Insert a new category and return its ID
-INSERT INTO categories (name)
-VALUES ($1)
+--:insert_a_new_category_and_return_its_id
+-- Insert a new category (with a slug derived from its name) and return its ID
+INSERT INTO categories (name, slug)
+SELECT name, trim(both '-' from regexp_replace(lower(name), '[^a-z0-9]+', '-', 'g'))
+FROM (VALUES (%s)) AS new_category(name)
 RETURNING id;
 
+--:get_category_by_id_with_question_count
 -- Get category by ID with question count
 SELECT c.id, c.name, COUNT(q.id) as question_count
 FROM categories c
 LEFT JOIN questions q ON c.id = q.category_id
-WHERE c.id = $1
+WHERE c.id = %s
 GROUP BY c.id, c.name;
 
+--:update_category_name
 -- Update category name
 UPDATE categories
-SET name = $2
-WHERE id = $1
+SET name = %s
+WHERE id = %s
 RETURNING id, name;
 
+--:delete_category
 -- Delete category (if no questions are associated)
 DELETE FROM categories
-WHERE id = $1 AND NOT EXISTS (
-    SELECT 1 FROM questions WHERE category_id = $1
+WHERE id = %s AND NOT EXISTS (
+    SELECT 1 FROM questions WHERE category_id = categories.id
 )
-RETURNING id; 
\ No newline at end of file
+RETURNING id;
@@ -1,70 +1,81 @@
 -- Game Related Queries
 -- ================================
+-- Loaded by models/game_model.py: each query follows a "--:<key>" line and
+-- takes psycopg2 named parameters. games, game_rounds and round_answers are
+-- partitioned by the game's created_at (migration 011), so every statement
+-- on one game carries %(created_at)s and touches a single partition.
 
--- Create new game
+--:create_new_game
+-- Create new game, record its partition key and add the participants
 WITH new_game AS (
     INSERT INTO games (game_type_id, game_config)
-    VALUES ($1, $2::jsonb)
-    RETURNING id, game_type_id
+    VALUES (%(game_type_id)s, %(game_config)s::jsonb)
+    RETURNING id, created_at
+), game_key AS (
+    INSERT INTO game_keys (id, created_at)
+    SELECT id, created_at FROM new_game
+), participants AS (
+    INSERT INTO game_participants (game_id, user_id)
+    SELECT new_game.id, unnest(%(participant_ids)s::bigint[])
+    FROM new_game
 )
-INSERT INTO game_participants (game_id, user_id)
-SELECT new_game.id, unnest($3::bigint[])
-FROM new_game
-RETURNING game_id;
+SELECT id, created_at FROM new_game;
 
--- Get active game details with participants
-SELECT g.*, 
-       gt.name as game_type_name,
-       json_agg(json_build_object(
-           'user_id', u.id,
-           'username', u.username,
-           'score', gp.score,
-           'status', gp.status
-       )) as participants
+--:get_active_game_details
+-- Get game details with participants
+SELECT g.id, g.game_type_id, g.status, g.game_config, g.winner_id, g.start_time, g.end_time,
+       GREATEST(g.start_time, g.end_time) AS last_activity,
+       (SELECT json_agg(json_build_object(
+                   'user_id', u.id,
+                   'username', u.username,
+                   'score', gp.score,
+                   'status', gp.status))
+        FROM game_participants gp
+        JOIN users u ON gp.user_id = u.id
+        WHERE gp.game_id = g.id) AS participants
 FROM games g
-JOIN game_types gt ON g.game_type_id = gt.id
-JOIN game_participants gp ON g.id = gp.game_id
-JOIN users u ON gp.user_id = u.id
-WHERE g.id = $1
-GROUP BY g.id, gt.name;
+WHERE g.id = %(game_id)s AND g.created_at = %(created_at)s;
 
+--:get_current_game_round
 -- Get current game round with question
-SELECT gr.*,
+SELECT gr.id,
        q.text as question_text,
        q.difficulty,
        json_agg(json_build_object(
            'id', qc.id,
            'text', qc.choice_text,
            'position', qc.position
-       )) as choices
+       ) ORDER BY qc.position) as choices
 FROM game_rounds gr
 JOIN questions q ON gr.question_id = q.id
 JOIN question_choices qc ON q.id = qc.question_id
-WHERE gr.game_id = $1 AND gr.status = 'active'
+WHERE gr.game_id = %(game_id)s AND gr.game_created_at = %(created_at)s AND gr.status = 'active'
 GROUP BY gr.id, q.text, q.difficulty;
 
--- Submit answer for current round
+--:get_answer_choice
+-- Correctness and scoring inputs for a choice in a round
+SELECT qc.is_correct, qc.explanation, gr.points_possible, gr.time_limit_seconds
+FROM game_rounds gr
+JOIN question_choices qc ON qc.question_id = gr.question_id
+WHERE gr.id = %(round_id)s AND gr.game_created_at = %(created_at)s AND qc.id = %(choice_id)s;
+
+--:submit_answer
+-- Submit answer for current round (correctness and points worked out by the caller)
 WITH answer_submission AS (
-    INSERT INTO round_answers (round_id, user_id, choice_id, response_time_ms)
-    VALUES ($1, $2, $3, $4)
-    RETURNING *
+    INSERT INTO round_answers (round_id, game_created_at, user_id, choice_id, response_time_ms,
+                               is_correct, points_earned)
+    VALUES (%(round_id)s, %(created_at)s, %(user_id)s, %(choice_id)s, %(response_time_ms)s,
+            %(is_correct)s, %(points_earned)s)
+    RETURNING is_correct, points_earned
 ),
 score_update AS (
     UPDATE game_participants
-    SET score = score + (
-        SELECT points_earned 
-        FROM answer_submission 
-        WHERE is_correct = true
-    )
-    WHERE game_id = (
-        SELECT game_id 
-        FROM game_rounds 
-        WHERE id = $1
-    )
-    AND user_id = $2
+    SET score = score + COALESCE((SELECT points_earned FROM answer_submission), 0)
+    WHERE game_id = %(game_id)s AND user_id = %(user_id)s
 )
-SELECT * FROM answer_submission;
+SELECT is_correct, points_earned FROM answer_submission;
 
+--:get_game_leaderboard
 -- Get game leaderboard
 SELECT u.username,
        gp.score,
@@ -73,33 +84,9 @@ SELECT u.username,
        ROUND(AVG(ra.response_time_ms)::numeric, 2) as avg_response_time
 FROM game_participants gp
 JOIN users u ON gp.user_id = u.id
-LEFT JOIN game_rounds gr ON gp.game_id = gr.game_id
-LEFT JOIN round_answers ra ON gr.id = ra.round_id AND ra.user_id = gp.user_id
-WHERE gp.game_id = $1
+LEFT JOIN game_rounds gr ON gp.game_id = gr.game_id AND gr.game_created_at = %(created_at)s
+LEFT JOIN round_answers ra ON gr.id = ra.round_id AND ra.game_created_at = %(created_at)s
+    AND ra.user_id = gp.user_id
+WHERE gp.game_id = %(game_id)s
 GROUP BY u.username, gp.score
 ORDER BY gp.score DESC;
-
--- End game and update stats
-WITH game_summary AS (
-    SELECT game_id,
-           user_id,
-           score,
-           COUNT(ra.id) as total_answers,
-           COUNT(CASE WHEN ra.is_correct THEN 1 END) as correct_answers
-    FROM game_participants gp
-    LEFT JOIN game_rounds gr ON gp.game_id = gr.game_id
-    LEFT JOIN round_answers ra ON gr.id = ra.round_id AND ra.user_id = gp.user_id
-    WHERE gp.game_id = $1
-    GROUP BY game_id, user_id, score
-)
-UPDATE user_stats us
-SET games_played = games_played + 1,
-    games_won = games_won + CASE WHEN gs.score = (
-        SELECT MAX(score) FROM game_summary WHERE game_id = $1
-    ) THEN 1 ELSE 0 END,
-    total_points = total_points + gs.score,
-    total_answers = total_answers + gs.total_answers,
-    correct_answers = correct_answers + gs.correct_answers,
-    last_played_at = NOW()
-FROM game_summary gs
-WHERE us.user_id = gs.user_id; 
\ No newline at end of file
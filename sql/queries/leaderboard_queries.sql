@@ -61,7 +61,7 @@ SELECT c.name as category_name,
 FROM categories c
 LEFT JOIN questions q ON c.id = q.category_id
 LEFT JOIN game_rounds gr ON q.id = gr.question_id
-LEFT JOIN round_answers ra ON gr.id = ra.round_id
+LEFT JOIN round_answers ra ON gr.id = ra.round_id AND ra.game_created_at = gr.game_created_at
 LEFT JOIN game_participants gp ON ra.user_id = gp.user_id
 GROUP BY c.id, c.name;
 
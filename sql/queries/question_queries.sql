@@ -76,7 +76,7 @@ SELECT q.id,
        ROUND(AVG(ra.response_time_ms)::numeric, 2) as avg_response_time
 FROM questions q
 LEFT JOIN game_rounds gr ON q.id = gr.question_id
-LEFT JOIN round_answers ra ON gr.id = ra.round_id
+LEFT JOIN round_answers ra ON gr.id = ra.round_id AND ra.game_created_at = gr.game_created_at
 WHERE q.id = $1
 GROUP BY q.id;
 
@@ -96,7 +96,7 @@ SET is_verified = $2,
     success_rate = COALESCE(
         (SELECT ROUND(COUNT(CASE WHEN ra.is_correct THEN 1 END)::numeric / NULLIF(COUNT(*), 0) * 100, 2)
          FROM game_rounds gr
-         JOIN round_answers ra ON gr.id = ra.round_id
+         JOIN round_answers ra ON gr.id = ra.round_id AND ra.game_created_at = gr.game_created_at
          WHERE gr.question_id = questions.id),
         0
     )
@@ -1,26 +1,54 @@
 # app/startup.py
+import time
+from contextlib import contextmanager
 
-def on_startup():
-    print("🔄 Initializing system...")
 
-    from db.connection import get_connection
-    from db.query_loader import load_queries
+class StartupTimer:
+    """Wall time of each named create_app step, in order"""
 
-    try:
-        QUERIES = load_queries("sql/init.sql")
-        conn = get_connection()
-        cur = conn.cursor()
+    def __init__(self):
+        self.steps = []
 
-        cur.execute(QUERIES["create_users"])
-        conn.commit()
+    @contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - started))
 
-        print("✅ Database initialized successfully.")
+    @property
+    def total(self):
+        return sum(seconds for _, seconds in self.steps)
 
+    def to_dict(self):
+        return {'total_ms': round(self.total * 1000, 3),
+                'steps': [{'name': name, 'ms': round(seconds * 1000, 3)} for name, seconds in self.steps]}
+
+
+def on_startup():
+    """Check the database schema is on the latest migration.
+
+    Read-only: migrations are applied with ``python manage.py migrate``,
+    never while the app boots. It opens a database connection, so it runs
+    from the gunicorn ``when_ready`` hook (or ``python app.py``) rather than
+    inside create_app.
+    """
+    print("🔄 Initializing system...")
+
+    from db.migrate import status
+
+    try:
+        schema = status()
     except Exception as e:
-        print("❌ Initialization error:", e)
+        print("❌ Schema check failed:", e)
+        return None
 
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
+    if schema['changed']:
+        print(f"❌ Migrations edited after they were applied: {', '.join(schema['changed'])}")
+    if schema['pending']:
+        print(f"⚠️ Database is at {schema['current']}, pending migrations: {', '.join(schema['pending'])}"
+              " (run `python manage.py migrate`)")
+    if not schema['changed'] and not schema['pending']:
+        print(f"✅ Database schema is up to date ({schema['current']}).")
+    return schema
@@ -110,6 +110,40 @@ def app():
     # Clean up test database
     teardown_test_db(db_name)
 
+@pytest.fixture(scope='session')
+def migrated_db():
+    """A scratch database with every migration in sql/migrations applied.
+
+    Yields a ``connect()`` for it. Tests that need the real schema are
+    skipped when no PostgreSQL server is reachable.
+    """
+    from db.migrate import migrate
+
+    settings = dict(
+        user=config['testing'].POSTGRES_USER,
+        password=config['testing'].POSTGRES_PASSWORD,
+        host=config['testing'].POSTGRES_HOST,
+        port=config['testing'].POSTGRES_PORT
+    )
+    try:
+        conn = psycopg2.connect(dbname='postgres', connect_timeout=3, **settings)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not reachable: {e}")
+    db_name = "test_migrated_" + os.urandom(8).hex()
+    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    with conn.cursor() as cur:
+        cur.execute(f'CREATE DATABASE {db_name}')
+    conn.close()
+
+    def connect():
+        return psycopg2.connect(dbname=db_name, **settings)
+
+    try:
+        migrate(connect=connect, concurrently=False, log=lambda *args: None)
+        yield connect
+    finally:
+        teardown_test_db(db_name)
+
 @pytest.fixture
 def client(app):
     """A test client for the app."""
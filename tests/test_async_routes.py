@@ -0,0 +1,101 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import routes.async_routes as async_routes
+from db.async_pool import to_asyncpg
+from utils.asgi import Request, Router
+from utils.lru import LRUCache
+from utils.sessions import LocalSessionStore, SessionValidator, TieredSessionInterface
+
+
+def test_psycopg2_placeholders_become_numbered():
+    assert to_asyncpg("SELECT %s, %s WHERE name LIKE 'a%%'") == "SELECT $1, $2 WHERE name LIKE 'a%'"
+
+
+def test_router_converts_path_parameters():
+    router = Router()
+
+    @router.route('/games/<int:game_id>', login=True)
+    async def get_game(request):
+        pass
+
+    @router.route('/games/matchmaking/wait')
+    async def wait(request):
+        pass
+
+    handler, params = router.match('GET', '/games/42')
+    assert handler is get_game and params == {'game_id': 42} and handler.login_required
+    assert router.match('GET', '/games/matchmaking/wait')[0] is wait
+    assert router.match('POST', '/games/42') == (None, None)
+
+
+def test_request_parses_query_cookies_and_etags():
+    request = Request({
+        'method': 'GET',
+        'path': '/games/1',
+        'query_string': b'wait=5',
+        'headers': [(b'cookie', b'session=abc; theme=dark'), (b'if-none-match', b'"x", W/"y"')]
+    })
+    assert request.args == {'wait': '5'}
+    assert request.cookies['session'] == 'abc'
+    assert request.if_none_match == {'x', 'y'}
+
+
+def test_peek_skips_revoked_sessions():
+    store = LocalSessionStore()
+    validator = SessionValidator(lambda tokens: [], lambda batch_size: [])
+    interface = TieredSessionInterface(store, validator=validator)
+    store.set('sid', interface.serializer.dumps({'user_id': 7, 'session_token': 't'}), 60)
+
+    assert interface.peek('sid')['user_id'] == 7
+    validator.revoke('t')
+    assert interface.peek('sid') is None
+    assert store.get('sid') is None
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def fetch(self, sql, *args):
+        self.queries += 1
+        return self.rows
+
+
+def test_leaderboard_is_cached_until_the_version_changes(monkeypatch):
+    conn = FakeConnection([{'username': 'ann', 'total_points': 10, 'games_played': 2,
+                            'games_won': 1, 'win_rate': None, 'accuracy': 50, 'rank': 1}])
+
+    @asynccontextmanager
+    async def acquire():
+        yield conn
+
+    versions = [1]
+    monkeypatch.setattr(async_routes, 'acquire', acquire)
+    monkeypatch.setattr(async_routes, '_leaderboards', LRUCache(maxsize=10))
+    monkeypatch.setattr(async_routes.resource_versions, 'stamp', lambda names: ('e', list(versions)))
+
+    request = Request({'method': 'GET', 'path': '/api/leaderboard/global', 'query_string': b'limit=5'})
+    first = asyncio.run(async_routes.get_global_leaderboard(request))
+    asyncio.run(async_routes.get_global_leaderboard(request))
+    assert conn.queries == 1
+    assert json.loads(first.body)['data'][0] == {
+        'username': 'ann', 'total_points': 10, 'games_played': 2, 'games_won': 1,
+        'win_rate': 0.0, 'accuracy': 50.0, 'rank': 1
+    }
+
+    versions[0] = 2
+    asyncio.run(async_routes.get_global_leaderboard(request))
+    assert conn.queries == 2
+
+
+def test_streamed_leaderboards_are_left_to_flask():
+    def request(query):
+        return Request({'method': 'GET', 'path': '/api/leaderboard/global', 'query_string': query})
+
+    handler, _ = async_routes.router.match('GET', '/api/leaderboard/global')
+    assert not handler.defer(request(b'limit=50'))
+    assert handler.defer(request(b'limit=5000'))
+    assert handler.defer(request(b'format=ndjson'))
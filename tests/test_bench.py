@@ -0,0 +1,83 @@
+import json
+
+from flask import Flask, jsonify, request, session
+
+from bench.replay import Replayer, percentile
+from bench.scenarios import SCENARIOS, full_games
+from bench.trace import extract, init_trace_recording, read_trace, substitute, write_trace
+
+
+def _toy_app(**config):
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', **config)
+    users = {}
+
+    @app.route('/register', methods=['POST'])
+    def register():
+        user_id = len(users) + 1
+        users[request.json['username']] = user_id
+        return jsonify({'user': {'id': user_id}}), 201
+
+    @app.route('/login', methods=['POST'])
+    def login():
+        session['user_id'] = users[request.json['username']]
+        return jsonify({'ok': True})
+
+    @app.route('/whoami')
+    def whoami():
+        return jsonify({'user_id': session.get('user_id')})
+
+    return app
+
+
+def test_substitute_keeps_types_and_fills_templates():
+    variables = {'run': 'r1', 'p2_id': 7}
+    assert substitute({'opponent_id': '${p2_id}', 'name': 'b${run}x', 'n': 3}, variables) == \
+        {'opponent_id': 7, 'name': 'br1x', 'n': 3}
+    assert substitute('costs $5', variables) == 'costs $5'
+    assert extract({'current_round': {'choices': [{'id': 4}]}}, 'current_round.choices.0.id') == 4
+
+
+def test_scenarios_round_trip_through_jsonl(tmp_path):
+    path = str(tmp_path / 'trace.jsonl')
+    flows = full_games(games=2, rounds=2)
+    assert write_trace(flows, path) == sum(len(flow) for flow in flows)
+    assert read_trace(path) == flows
+    for generate in SCENARIOS.values():
+        assert generate()
+
+
+def test_replayer_keeps_cookies_and_captures_per_flow():
+    app = _toy_app()
+    flows = [[
+        {'flow': 'f', 'client': 'c', 'method': 'POST', 'path': '/register',
+         'json': {'username': 'u${run}'}, 'capture': {'uid': 'user.id'}, 'expect': [201]},
+        {'flow': 'f', 'client': 'c', 'method': 'POST', 'path': '/login',
+         'json': {'username': 'u${run}'}},
+        {'flow': 'f', 'client': 'c', 'method': 'GET', 'path': '/whoami', 'capture': {'me': 'user_id'}},
+        {'flow': 'f', 'client': 'other', 'method': 'GET', 'path': '/whoami'},
+        {'flow': 'f', 'client': 'c', 'method': 'GET', 'path': '/missing/${nope}'}
+    ]]
+    report = Replayer(app, concurrency=2, run_id='t').run(flows)
+    assert report['overall']['requests'] == 4
+    assert report['overall']['errors'] == 0
+    assert report['skipped'] == 1
+    assert set(report['endpoints']) == {'register', 'login', 'whoami'}
+
+
+def test_recorder_scrubs_passwords(tmp_path):
+    path = tmp_path / 'recorded.jsonl'
+    app = _toy_app(BENCH_RECORD_PATH=str(path))
+    init_trace_recording(app)
+    client = app.test_client()
+    client.post('/register', json={'username': 'alice', 'password': 'Secret123'})
+    app.extensions['trace_recorder'].close()
+
+    step = json.loads(path.read_text())
+    assert step['json'] == {'username': 'alice', 'password': '${password}'}
+    assert step['name'] == 'register' and step['expect'] == [201]
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert (percentile(values, 0.5), percentile(values, 0.95), percentile(values, 0.99)) == (50, 95, 99)
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from utils.cache import CacheManager, cached, cache_manager, invalidate
+
+
+@pytest.fixture
+def cache_app():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+    app.config['CACHE_TIMEOUTS'] = {}
+    cache_manager.init_app(app)
+    calls = {'count': 0}
+
+    @app.route('/items')
+    @cached(tags=('items',))
+    def list_items():
+        calls['count'] += 1
+        time.sleep(0.05)
+        return jsonify({'count': calls['count']})
+
+    @app.route('/broken')
+    @cached(tags=('items',))
+    def broken():
+        calls['count'] += 1
+        return jsonify({'error': 'boom'}), 500
+
+    app.calls = calls
+    return app
+
+
+def test_cached_response_is_reused(cache_app):
+    client = cache_app.test_client()
+    first = client.get('/items').get_json()
+    second = client.get('/items').get_json()
+    assert first == second == {'count': 1}
+    assert cache_app.calls['count'] == 1
+
+
+def test_query_string_is_part_of_key(cache_app):
+    client = cache_app.test_client()
+    client.get('/items?limit=5')
+    client.get('/items?limit=10')
+    assert cache_app.calls['count'] == 2
+
+
+def test_invalidate_tag_discards_entries(cache_app):
+    client = cache_app.test_client()
+    client.get('/items')
+    with cache_app.app_context():
+        invalidate('items')
+    assert client.get('/items').get_json() == {'count': 2}
+
+
+def test_error_responses_are_not_cached(cache_app):
+    client = cache_app.test_client()
+    assert client.get('/broken').status_code == 500
+    assert client.get('/broken').status_code == 500
+    assert cache_app.calls['count'] == 2
+
+
+def test_concurrent_misses_are_coalesced(cache_app):
+    results = []
+
+    def fetch():
+        with cache_app.test_client() as client:
+            results.append(client.get('/items').get_json()['count'])
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert cache_app.calls['count'] == 1
+    assert results == [1] * 8
+
+
+def test_null_cache_passes_through():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'NullCache'
+    manager = CacheManager(app)
+    calls = []
+    with app.app_context():
+        for _ in range(2):
+            manager.get_or_compute('key', lambda: (calls.append(1) or 'value', True), 10)
+    assert len(calls) == 2
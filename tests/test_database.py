@@ -0,0 +1,63 @@
+from flask import Flask
+from psycopg2.extensions import cursor as base_cursor
+
+import db.connection as connection
+import db.database as database
+from db.instrumentation import InstrumentedCursor
+
+
+class FakeDbapiConnection:
+    cursor_factory = None
+
+
+class FakeFairy:
+    def __init__(self):
+        self.dbapi_connection = FakeDbapiConnection()
+
+
+class FakeEngine:
+    def __init__(self):
+        self.checkouts = 0
+
+    def raw_connection(self):
+        self.checkouts += 1
+        return FakeFairy()
+
+
+def test_raw_connections_come_from_the_shared_engine(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(connection, 'get_engine', lambda: engine)
+
+    conn = connection.get_connection()
+    assert engine.checkouts == 1
+    assert conn.dbapi_connection.cursor_factory is InstrumentedCursor
+
+    # Back in the pool, the engine's own cursors are not timed twice
+    database._reset_cursor_factory(conn.dbapi_connection, None)
+    assert conn.dbapi_connection.cursor_factory is base_cursor
+
+
+def test_pool_options_follow_app_config():
+    app = Flask(__name__)
+    app.config.update(DB_POOL_SIZE=3, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=5)
+    options = database.pool_options(app.config)
+    assert options['pool_size'] == 3 and options['max_overflow'] == 0 and options['pool_timeout'] == 5
+    assert options['pool_pre_ping'] is True
+
+    class Settings:
+        DB_POOL_SIZE = 8
+    assert database.pool_options(Settings)['pool_size'] == 8
+
+
+def test_request_session_is_removed_on_teardown(monkeypatch):
+    removed = []
+    monkeypatch.setattr(database, '_pool_options', None)
+    monkeypatch.setattr(database.db_session, 'remove', lambda: removed.append(True))
+    app = Flask(__name__)
+    app.config['DB_POOL_SIZE'] = 2
+    database.init_db(app)
+
+    assert database._pool_options['pool_size'] == 2
+    with app.app_context():
+        pass
+    assert removed == [True]
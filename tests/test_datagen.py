@@ -0,0 +1,67 @@
+from collections import Counter
+from datetime import datetime
+
+from bench.datagen import (CopyBuffer, DatasetSpec, _GameContext, generate_games,
+                           generate_reference, generate_users)
+
+
+class CapturingCursor:
+    def __init__(self):
+        self.rows = {}
+
+    def copy_expert(self, sql, data):
+        table = sql.split()[1]
+        self.rows.setdefault(table, []).extend(line.split('\t') for line in data.read().splitlines())
+
+
+def _generate(spec, chunks):
+    cursor = CapturingCursor()
+    out = CopyBuffer(cursor)
+    generate_reference(spec, out)
+    generate_users(spec, 1, spec.users, out)
+    context = _GameContext(spec)
+    for first, last in chunks:
+        generate_games(spec, first, last, out, context)
+    out.flush()
+    return cursor.rows
+
+
+def _spec():
+    return DatasetSpec(users=200, games=300, rounds_per_game=3, questions=50, categories=4,
+                       seed=7, until=datetime(2026, 1, 1))
+
+
+def test_output_is_independent_of_chunking():
+    spec = _spec()
+    assert _generate(spec, [(1, 300)]) == _generate(spec, [(1, 120), (121, 250), (251, 300)])
+
+
+def test_row_counts_and_references_line_up():
+    spec = _spec()
+    rows = _generate(spec, [(1, spec.games)])
+    expected = spec.row_counts()
+    for table in ('users', 'user_profiles', 'games', 'game_participants'):
+        assert len(rows[table]) == expected[table], table
+    assert 0.9 * expected['game_rounds'] < len(rows['game_rounds']) <= expected['game_rounds']
+    assert len(rows['round_answers']) == 2 * len(rows['game_rounds'])
+
+    round_ids = {row[0] for row in rows['game_rounds']}
+    assert all(answer[1] in round_ids for answer in rows['round_answers'])
+    user_ids = {row[0] for row in rows['users']}
+    assert all(p[1] in user_ids for p in rows['game_participants'])
+    choice_ids = {row[0]: row[3] for row in rows['question_choices']}
+    for answer in rows['round_answers']:
+        assert (choice_ids[answer[3]] == 't') == (answer[6] == 't')
+
+
+def test_player_activity_is_skewed():
+    spec = _spec()
+    rows = _generate(spec, [(1, spec.games)])
+    games_per_user = Counter(p[1] for p in rows['game_participants'])
+    busiest = sum(count for _, count in games_per_user.most_common(20))
+    # the top 10% of players account for far more than 10% of seats
+    assert busiest > 0.3 * len(rows['game_participants'])
+
+
+def test_default_history_does_not_depend_on_today():
+    assert DatasetSpec(seed=7).until == DatasetSpec(seed=7).until == datetime(2026, 1, 1)
@@ -0,0 +1,77 @@
+import pytest
+from flask import Flask, jsonify, session
+
+from utils.etag import conditional, conditional_requests
+from utils.versions import VersionStore, bump
+
+
+@pytest.fixture
+def etag_app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    app.config['CACHE_TIMEOUTS'] = {}
+    calls = {'count': 0}
+
+    @app.route('/things')
+    @conditional(("things",), ttl=True)
+    def list_things():
+        calls['count'] += 1
+        return jsonify([1, 2, 3])
+
+    @app.route('/games/<int:game_id>')
+    @conditional(lambda game_id: (f"game:{game_id}",), per_user=True)
+    def get_game(game_id):
+        calls['count'] += 1
+        return jsonify({'id': game_id})
+
+    app.calls = calls
+    return app
+
+
+def test_matching_etag_returns_304_without_running_view(etag_app):
+    client = etag_app.test_client()
+    first = client.get('/things')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    hits_before = conditional_requests.value(endpoint='list_things', result='hit')
+    second = client.get('/things', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert etag_app.calls['count'] == 1
+    assert conditional_requests.value(endpoint='list_things', result='hit') == hits_before + 1
+
+
+def test_bump_changes_etag(etag_app):
+    client = etag_app.test_client()
+    etag = client.get('/things').headers['ETag']
+    bump("things")
+    response = client.get('/things', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_per_user_etag_is_not_shared(etag_app):
+    client = etag_app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    etag = client.get('/games/7').headers['ETag']
+
+    other = etag_app.test_client()
+    with other.session_transaction() as sess:
+        sess['user_id'] = 2
+    assert other.get('/games/7', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_process_local_versions_expire_across_workers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('utils.versions.time.time', lambda: now[0])
+    writer, reader = VersionStore(local_ttl=5), VersionStore(local_ttl=5)
+    seen = reader.stamp(['game:1'])
+
+    writer.bump('game:1')
+    # The other worker never hears about the write...
+    assert reader.stamp(['game:1']) == seen
+    # ...but stops vouching for its stamp once the interval rolls over
+    now[0] += 5
+    assert reader.stamp(['game:1']) != seen
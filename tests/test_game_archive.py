@@ -0,0 +1,197 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+import db.archive as archive
+import models.game_model as game_model
+from models.game_model import Game
+from utils.exceptions import ArchiveError
+
+CREATED = datetime(2025, 1, 1, 9)
+USER_GAMES_COLUMNS = ['user_id', 'game_id', 'game_type', 'game_status', 'your_score', 'your_status',
+                      'opponent_id', 'opponent_username', 'opponent_score', 'opponent_status',
+                      'start_time', 'end_time', 'duration_seconds', 'updated_at']
+
+
+def user_game(user_id, game_id, opponent_id, end, status='completed'):
+    return (user_id, game_id, 'classic', status, 100, 'finished', opponent_id, f'user{opponent_id}',
+            80, 'finished', datetime(2025, 1, 1, 9), end, 300.0, end)
+
+
+class BatchCursor:
+    """Answers archive_batch's selects by table and reports delete rowcounts"""
+
+    def __init__(self, tables, deleted=None):
+        self.tables = tables
+        self.deleted = deleted or {}
+        self.executed = []
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        for table, (columns, rows) in self.tables.items():
+            if f'FROM {table}' in sql.split('JOIN')[0]:
+                break
+        else:
+            return
+        if sql.lstrip().startswith('SELECT'):
+            self.description = [(name,) for name in columns]
+            self._rows = rows
+        elif sql.lstrip().startswith('DELETE'):
+            self.rowcount = self.deleted.get(table, len(rows))
+
+    def fetchall(self):
+        return self._rows
+
+
+def batch_tables():
+    return {
+        'round_answers': (['id', 'round_id', 'game_created_at', 'user_id'],
+                          [(1, 10, CREATED, 7), (2, 10, CREATED, 8)]),
+        'game_rounds': (['id', 'game_id', 'game_created_at', 'round_number'], [(10, 1, CREATED, 1)]),
+        'game_participants': (['game_id', 'user_id', 'score'], [(1, 7, 100), (1, 8, 80), (2, 7, 0)]),
+        'user_games': (USER_GAMES_COLUMNS, [user_game(7, 1, 8, datetime(2025, 1, 1, 10)),
+                                            user_game(8, 1, 7, datetime(2025, 1, 1, 10)),
+                                            user_game(7, 2, None, None, status='cancelled')]),
+        'games': (['id', 'status', 'created_at', 'game_config'],
+                  [(1, 'completed', CREATED, {'rounds': 1}), (2, 'cancelled', CREATED, {})]),
+    }
+
+
+def test_archive_batch_writes_verifies_deletes_and_catalogs(tmp_path):
+    cursor = BatchCursor(batch_tables())
+    counts = archive.archive_batch(cursor, [(1, CREATED), (2, CREATED)], str(tmp_path))
+
+    assert counts == {'round_answers': 2, 'game_rounds': 1, 'game_participants': 3, 'user_games': 3, 'games': 2}
+    stored = archive.read_file(str(tmp_path / archive.file_name(1, 2)))
+    games = stored['tables']['games']
+    assert games['columns'] == ['id', 'status', 'created_at', 'game_config']
+    assert games['values'][0] == [1, 2] and games['values'][3] == [{'rounds': 1}, {}]
+
+    deletes = [sql for sql, _ in cursor.executed if sql.lstrip().startswith('DELETE')]
+    assert [d.split()[2] for d in deletes] == ['round_answers', 'game_rounds', 'game_participants',
+                                               'user_games', 'games']
+    sql, params = cursor.executed[-1]
+    assert 'INSERT INTO game_archive_files' in sql
+    assert params[0] == archive.file_name(1, 2) and params[1:3] == (1, 2)
+    assert json.loads(params[5])['round_answers'] == 2
+    # Cancelled games are archived but do not count towards history
+    assert params[6] == [7, 8] and params[7] == [1, 1]
+
+
+def test_delete_mismatch_rolls_back_the_file(tmp_path):
+    cursor = BatchCursor(batch_tables(), deleted={'game_participants': 2})
+    with pytest.raises(ArchiveError):
+        archive.archive_batch(cursor, [(1, CREATED), (2, CREATED)], str(tmp_path))
+    assert os.listdir(tmp_path) == []
+    assert not any('game_archive_files' in sql for sql, _ in cursor.executed)
+
+
+def test_missing_games_are_not_archived(tmp_path):
+    with pytest.raises(ArchiveError):
+        archive.archive_batch(BatchCursor(batch_tables()), [(1, CREATED), (2, CREATED), (3, CREATED)],
+                              str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+class CatalogCursor:
+    def __init__(self, files):
+        self.files = files
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return self.files
+
+
+def write_archive(directory, name, rows):
+    columns = list(zip(*rows))
+    archive.write_file(os.path.join(directory, name), {'tables': {'user_games': {
+        'columns': USER_GAMES_COLUMNS, 'rows': len(rows), 'values': [list(c) for c in columns]}}})
+
+
+def test_archived_history_merges_files_newest_first(tmp_path):
+    archive._files.clear()
+    write_archive(str(tmp_path), 'new.json.gz', [user_game(7, 20, 8, datetime(2025, 3, 5)),
+                                                 user_game(7, 21, 8, datetime(2025, 2, 1)),
+                                                 user_game(9, 22, 8, datetime(2025, 3, 6))])
+    write_archive(str(tmp_path), 'old.json.gz', [user_game(7, 10, 8, datetime(2025, 2, 10)),
+                                                 user_game(7, 11, 8, datetime(2025, 1, 3))])
+    cursor = CatalogCursor([('new.json.gz', datetime(2025, 3, 6)), ('old.json.gz', datetime(2025, 2, 10))])
+
+    rows = archive.archived_history(cursor, 7, 3, directory=str(tmp_path))
+    assert [row[0] for row in rows] == [20, 10, 21]
+    assert rows[0][4] == datetime(2025, 3, 5) and rows[0][9] == 'user8'
+
+    rows = archive.archived_history(cursor, 7, 5, after=(datetime(2025, 2, 10), 10), directory=str(tmp_path))
+    assert [row[0] for row in rows] == [21, 11]
+    assert cursor.executed[-1][1]['after_end'] == datetime(2025, 2, 10)
+
+
+def test_archived_history_stops_at_older_files(tmp_path, monkeypatch):
+    archive._files.clear()
+    write_archive(str(tmp_path), 'new.json.gz', [user_game(7, 20, 8, datetime(2025, 3, 5))])
+    opened = []
+    real = archive.read_file
+    monkeypatch.setattr(archive, 'read_file', lambda path: opened.append(path) or real(path))
+    cursor = CatalogCursor([('new.json.gz', datetime(2025, 3, 5)), ('missing.json.gz', datetime(2025, 1, 1))])
+
+    assert [row[0] for row in archive.archived_history(cursor, 7, 1, directory=str(tmp_path))] == [20]
+    assert len(opened) == 1
+
+
+def test_archived_history_without_archive_directory(tmp_path):
+    cursor = CatalogCursor([('new.json.gz', datetime(2025, 3, 5))])
+    assert archive.archived_history(cursor, 7, 10, directory=str(tmp_path / 'none')) == []
+    assert cursor.executed == []
+
+
+class HotCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def close(self):
+        pass
+
+
+def test_history_falls_through_to_archive(monkeypatch):
+    hot_end = datetime(2025, 6, 1)
+    hot = [(30, 'classic', 'completed', hot_end, hot_end, 60.0, 100, 'finished', 8, 'bob', 50, 'finished')]
+    archived = [(20, 'classic', 'completed', hot_end, datetime(2025, 3, 5), 60.0, 90, 'finished',
+                 None, None, None, None)]
+    calls = []
+    monkeypatch.setattr(game_model, 'get_connection', lambda: FakeConnection(HotCursor(hot)))
+    monkeypatch.setattr(game_model, 'archived_history',
+                        lambda cur, user_id, limit, after: calls.append((limit, after)) or archived)
+
+    games = Game.history(7, 3)
+    assert [game['game_id'] for game in games] == [30, 20]
+    assert calls == [(2, (hot_end, 30))]
+
+    # OFFSET pages and full pages stay on the hot table
+    Game.history(7, 3, offset=3)
+    Game.history(7, 1)
+    assert len(calls) == 1
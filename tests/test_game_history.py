@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import pytest
+
+import models.game_model as game_model
+from models.game_model import Game
+from utils.exceptions import ValidationError
+from utils.pagination import decode_cursor, encode_cursor
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    cursor = FakeCursor([])
+    monkeypatch.setattr(game_model, 'get_connection', lambda: FakeConnection(cursor))
+    return cursor
+
+
+def test_cursor_round_trip():
+    position = (datetime(2026, 3, 1, 12, 30, 5, 123456), 991)
+    assert decode_cursor(encode_cursor(*position)) == position
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-base64!', encode_cursor(datetime(2026, 1, 1), 1)[:-3], 'WzEsMl0'])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValidationError):
+        decode_cursor(cursor)
+
+
+def test_history_shapes_rows_and_applies_keyset(db):
+    start, end = datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 10, 5)
+    db.rows = [(5, 'classic', 'completed', start, end, 300.0, 300, 'finished', 8, 'bob', 250, 'finished'),
+               (4, 'classic', 'completed', start, end, 300.0, 100, 'finished', None, None, None, None)]
+    games = Game.history(7, 11, after=(end, 6))
+
+    sql, params = db.executed[0]
+    assert 'FROM user_games' in sql
+    assert '(end_time, game_id) < (%(after_end)s, %(after_id)s)' in sql
+    assert params == {'user_id': 7, 'limit': 11, 'offset': 0, 'after_end': end, 'after_id': 6}
+    assert games[0]['opponent'] == {'user_id': 8, 'username': 'bob', 'score': 250, 'status': 'finished'}
+    assert games[0]['your_score'] == 300 and games[0]['duration'] == 300.0
+    assert games[1]['opponent'] is None
+
+
+def test_first_page_has_no_keyset_clause(db):
+    Game.history(7, 11)
+    assert '(end_time, game_id) <' not in db.executed[0][0]
+
+
+def test_history_total_is_cached(db):
+    game_model._history_totals.clear()
+    db.rows = [(12,)]
+    assert Game.count_history(7) == 12
+    assert Game.count_history(7) == 12
+    assert len(db.executed) == 1
+
+
+def test_open_games_read_the_projection(db):
+    db.rows = [(9, 'classic', 'active', datetime(2026, 1, 1), None, None, 40, 'active',
+                8, 'bob', 60, 'active')]
+    games = Game.open_games(7)
+    assert 'FROM user_games' in db.executed[0][0]
+    assert games[0]['status'] == 'active' and games[0]['opponent']['score'] == 60
+
+
+def test_refresh_user_games_skips_empty_batches():
+    cursor = FakeCursor([])
+    game_model.refresh_user_games(cursor, [])
+    game_model.refresh_user_games(cursor, (3, 4))
+    assert len(cursor.executed) == 1
+    sql, params = cursor.executed[0]
+    assert 'ON CONFLICT (user_id, game_id) DO UPDATE' in sql and params == ([3, 4],)
+
+
+def test_history_json_passes_database_text_through(db):
+    end = datetime(2026, 1, 1, 10, 5)
+    db.rows = [('[{"game_id":5}]', 3, end, 5)]
+    document, position = Game.history_json(1, 2, after=(datetime(2026, 2, 1), 9))
+    assert document == '[{"game_id":5}]' and position == (end, 5)
+    sql, params = db.executed[0]
+    assert 'json_agg' in sql and '(end_time, game_id) <' in sql
+    assert params['limit'] == 2 and params['after_id'] == 9
+
+
+def test_short_json_history_page_leaves_the_archive_to_python(db):
+    db.rows = [('[{"game_id":5}]', 1, None, None)]
+    assert Game.history_json(1, 2) is None
+
+    # OFFSET pages never reach the archive, so a short one is final
+    assert Game.history_json(1, 2, offset=4) == ('[{"game_id":5}]', None)
@@ -0,0 +1,169 @@
+from datetime import datetime
+
+import pytest
+
+import models.game_model as game_model
+import models.user_stats_model as user_stats_model
+from models.game_model import Game
+from models.user_stats_model import UserStats
+from utils.exceptions import ArchiveError, GameError
+
+
+class ScriptedCursor:
+    """Returns queued results in order for each fetch call"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.executed = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.executed.append((' '.join(sql.split()), params))
+
+    def fetchone(self):
+        return self.results.pop(0)
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+CREATED = datetime(2026, 1, 5, 12, 0)
+
+
+def _game(**kwargs):
+    game = Game(game_type_id=1, id=5, status='active', **kwargs)
+    game.created_at = CREATED
+    return game
+
+
+def _connect(monkeypatch, module, results):
+    cursor = ScriptedCursor(results)
+    conn = FakeConnection(cursor)
+    monkeypatch.setattr(module, 'get_connection', lambda: conn)
+    return cursor, conn
+
+
+def test_game_results_derives_rates(monkeypatch):
+    _connect(monkeypatch, user_stats_model, [(8, 5, 2, 1, 1000, 310)])
+    assert UserStats.game_results(7) == {
+        'total_games': 8, 'wins': 5, 'losses': 2, 'draws': 1,
+        'win_rate': 62.5, 'avg_score': 125.0, 'highest_score': 310
+    }
+
+
+def test_game_results_for_new_player(monkeypatch):
+    _connect(monkeypatch, user_stats_model, [None])
+    assert UserStats.game_results(7)['total_games'] == 0
+
+
+@pytest.mark.parametrize('scores, winner', [([(1, 300), (2, 100)], 1), ([(1, 200), (2, 200)], None)])
+def test_finish_game_settles_once(monkeypatch, scores, winner):
+    monkeypatch.setattr(game_model, 'bump', lambda *names: None)
+    cursor, conn = _connect(monkeypatch, game_model, [scores, (5,)])
+    game = _game()
+    game.finish_game()
+
+    statements = [sql for sql, _ in cursor.executed]
+    assert cursor.executed[1][1] == (winner, 5, CREATED)
+    assert any(sql.startswith('INSERT INTO user_stats') for sql in statements)
+    assert any(sql.startswith('INSERT INTO user_games') for sql in statements)
+    assert conn.commits == 1 and game.winner_id == winner and game.status == 'completed'
+
+
+def test_finish_game_refuses_second_settlement(monkeypatch):
+    cursor, conn = _connect(monkeypatch, game_model, [None])
+    game = _game()
+    with pytest.raises(GameError):
+        game.finish_game(winner_id=1)
+    assert not any(sql.startswith('INSERT INTO user_stats') for sql, _ in cursor.executed)
+    assert conn.commits == 0
+
+
+def test_backfill_runs_in_locked_batches(monkeypatch):
+    cursor, conn = _connect(monkeypatch, user_stats_model, [(False,), (25,)])
+    UserStats.backfill_game_results(batch_size=10, log=lambda message: None)
+    bounds = [params for sql, params in cursor.executed if sql.startswith('INSERT INTO user_stats')]
+    assert bounds == [{'first': 1, 'last': 10}, {'first': 11, 'last': 20}, {'first': 21, 'last': 30}]
+    assert sum(sql.startswith('LOCK TABLE user_stats') for sql, _ in cursor.executed) == 3
+    assert conn.commits == 3
+
+
+def test_backfill_refuses_to_drop_archived_results(monkeypatch):
+    cursor, conn = _connect(monkeypatch, user_stats_model, [(True,)])
+    with pytest.raises(ArchiveError):
+        UserStats.backfill_game_results(batch_size=10, log=lambda message: None)
+    assert len(cursor.executed) == 1 and conn.commits == 0
+
+    cursor, conn = _connect(monkeypatch, user_stats_model, [(True,), (5,)])
+    assert UserStats.backfill_game_results(batch_size=10, log=lambda message: None,
+                                           discard_archived=True) == 0
+    assert conn.commits == 1
+
+
+def test_cleanup_cancels_idle_games_and_refreshes_projection(monkeypatch):
+    monkeypatch.setattr(game_model, 'bump', lambda *names: None)
+    cursor, conn = _connect(monkeypatch, game_model, [[(3,), (4,)]])
+    assert Game.cleanup_inactive_games(timeout_minutes=45) == 2
+
+    (cancel, params), (refresh, ids) = cursor.executed
+    assert 'last_activity' not in cancel and 'game_rounds' in cancel and params == (45,)
+    assert refresh.startswith('INSERT INTO user_games') and ids == ([3, 4],)
+    assert conn.commits == 1
+
+
+def test_forfeit_completes_and_settles_in_one_transaction(monkeypatch):
+    monkeypatch.setattr(game_model, 'bump', lambda *names: None)
+    cursor, conn = _connect(monkeypatch, game_model, [(2,)])
+    game = _game()
+    assert game.forfeit(1) == 2
+
+    statements = [sql for sql, _ in cursor.executed]
+    assert "SET status = 'completed'" in statements[0] and "SET status = 'disconnected'" in statements[0]
+    assert "'finished'" not in statements[0] and "'forfeit'" not in statements[0]
+    assert statements[1].startswith('INSERT INTO user_stats')
+    assert statements[2].startswith('INSERT INTO user_games')
+    assert conn.commits == 1 and game.winner_id == 2 and game.status == 'completed'
+
+
+def test_forfeit_of_a_finished_game_settles_nothing(monkeypatch):
+    cursor, conn = _connect(monkeypatch, game_model, [None])
+    with pytest.raises(GameError):
+        _game().forfeit(1)
+    assert len(cursor.executed) == 1 and conn.commits == 0
+
+
+def test_game_statements_carry_the_partition_key(monkeypatch):
+    import db.partitions as partitions
+    monkeypatch.setattr(partitions, '_created_at', partitions.LRUCache(maxsize=10))
+    monkeypatch.setattr(game_model, 'bump', lambda *names: None)
+    cursor, conn = _connect(monkeypatch, game_model, [[(1, 300), (2, 100)], [(5, CREATED)], (5,)])
+    game = Game(game_type_id=1, id=5, status='active')
+    game.finish_game()
+
+    lookup, update = cursor.executed[1], cursor.executed[2]
+    assert lookup == ('SELECT id, created_at FROM game_keys WHERE id = ANY(%s)', ([5],))
+    assert 'AND created_at = %s' in update[0] and update[1] == (1, 5, CREATED)
+    # the key is cached for the process: a second lookup needs no query
+    assert partitions.game_created_at(cursor, [5]) == {5: CREATED}
+    assert len([sql for sql, _ in cursor.executed if sql.startswith('SELECT id, created_at FROM game_keys')]) == 1
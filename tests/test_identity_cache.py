@@ -0,0 +1,60 @@
+import pytest
+
+from models.game_model import Game, _participants_cache
+from models.user_model import User, _identity_cache
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+
+    def fake_find_by_id(cls, user_id):
+        calls.append(user_id)
+        return User(username="cached", email="cached@example.com",
+                    password_hash="x", id=user_id)
+
+    _identity_cache.clear()
+    monkeypatch.setattr(User, 'find_by_id', classmethod(fake_find_by_id))
+    return calls
+
+
+def test_get_cached_hits_database_once(lookups):
+    first = User.get_cached(42)
+    second = User.get_cached(42)
+    assert first is second
+    assert lookups == [42]
+
+
+def test_invalidate_cached_forces_reload(lookups):
+    User.get_cached(42)
+    User.invalidate_cached(42)
+    User.get_cached(42)
+    assert lookups == [42, 42]
+
+
+def test_participant_membership_uses_cache():
+    _participants_cache.set(7, frozenset({1, 2}))
+    assert Game.is_participant(7, 1)
+    assert not Game.is_participant(7, 3)
+
+
+def test_profile_update_leaves_the_cached_user_alone(lookups, monkeypatch):
+    from flask import Flask
+    from routes.user_routes import user_bp
+
+    def failing_update(self, data):
+        self.profile = dict(data)
+        raise Exception("connection lost")
+
+    monkeypatch.setattr(User, 'update', failing_update)
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    app.register_blueprint(user_bp)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 42
+    cached = User.get_cached(42)
+
+    response = client.put('/profile', json={'display_name': 'half-saved'})
+    assert response.status_code == 500
+    assert cached.profile == {} and User.get_cached(42) is cached
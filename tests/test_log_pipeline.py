@@ -0,0 +1,115 @@
+import json
+import logging
+import queue
+
+from werkzeug.datastructures import Headers
+
+from utils.log_pipeline import (BatchingFileHandler, JSONFormatter, LazyHeaders,
+                                LogWriter, NonBlockingQueueHandler,
+                                RequestLogSampler, dropped_records)
+
+
+def _record(message, **extra):
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, message, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_lazy_headers_are_redacted_when_formatted():
+    headers = Headers({'Cookie': 'session=abc', 'User-Agent': 'pytest'})
+    formatter = JSONFormatter('%(message)s')
+    line = formatter.format(_record('request', headers=LazyHeaders(headers)))
+    data = json.loads(line)
+    assert data['headers'] == {'Cookie': '[redacted]', 'User-Agent': 'pytest'}
+
+
+def test_batching_handler_writes_on_flush(tmp_path):
+    path = tmp_path / 'app.log'
+    handler = BatchingFileHandler(str(path), batch_size=100)
+    handler.setFormatter(JSONFormatter('%(message)s'))
+    for i in range(3):
+        handler.handle(_record(f'message {i}'))
+    assert not path.exists()
+
+    handler.flush()
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)['message'] for line in lines] == ['message 0', 'message 1', 'message 2']
+    handler.close()
+
+
+def test_batching_handler_keeps_writing_after_rollovers(tmp_path):
+    path = tmp_path / 'app.log'
+    handler = BatchingFileHandler(str(path), maxBytes=200, backupCount=2, batch_size=100)
+    handler.setFormatter(JSONFormatter('%(message)s'))
+    for batch in range(3):
+        for i in range(4):
+            handler.handle(_record(f'batch {batch} message {i}'))
+        handler.flush()
+    handler.close()
+
+    def messages(name):
+        return [json.loads(line)['message'] for line in (tmp_path / name).read_text().splitlines()]
+
+    assert messages('app.log.2') == [f'batch 0 message {i}' for i in range(4)]
+    assert messages('app.log.1') == [f'batch 1 message {i}' for i in range(4)]
+    assert messages('app.log') == [f'batch 2 message {i}' for i in range(4)]
+
+
+def test_writer_thread_drains_queue(tmp_path):
+    path = tmp_path / 'app.log'
+    handler = BatchingFileHandler(str(path), batch_size=100)
+    handler.setFormatter(JSONFormatter('%(message)s'))
+    log_queue = queue.Queue()
+    writer = LogWriter(log_queue, [handler], flush_interval=0.05)
+    writer.start()
+
+    logger = logging.getLogger('test.log_pipeline')
+    logger.propagate = False
+    logger.addHandler(NonBlockingQueueHandler(log_queue))
+    logger.warning('queued', extra={'status': 500})
+    writer.stop()
+
+    data = json.loads(path.read_text())
+    assert data['message'] == 'queued'
+    assert data['status'] == 500
+
+
+class BrokenHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.errors = 0
+
+    def emit(self, record):
+        raise OSError('disk full')
+
+    def flush(self):
+        raise OSError('disk full')
+
+    def handleError(self, record):
+        self.errors += 1
+
+
+def test_writer_thread_survives_handler_errors():
+    handler = BrokenHandler()
+    log_queue = queue.Queue()
+    writer = LogWriter(log_queue, [handler], flush_interval=0.01)
+    writer.start()
+    log_queue.put(_record('lost'))
+    log_queue.put(_record('also lost'))
+    writer.stop()
+    assert not writer.is_alive() and handler.errors >= 3
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    before = dropped_records.value()
+    handler.handle(_record('first'))
+    handler.handle(_record('second'))
+    assert dropped_records.value() == before + 1
+
+
+def test_sampler_keeps_errors_and_slow_requests():
+    sampler = RequestLogSampler(rate=0.0, slow_ms=100)
+    assert not sampler.should_log(200, 5)
+    assert sampler.should_log(500, 5)
+    assert sampler.should_log(200, 150)
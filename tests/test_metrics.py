@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+
+import pytest
+from flask import Flask
+
+from utils.lru import LRUCache
+from utils.metrics import (collect, counter, gauge, generate_latest, histogram,
+                           write_process_file)
+from utils.monitoring import game_state, init_metrics
+
+
+@pytest.fixture
+def metrics_app():
+    app = Flask(__name__)
+    app.config['METRICS_TOKEN'] = 'scrape-token'
+    game_state._expires_at = float('inf')  # keep the database out of scrapes
+    init_metrics(app)
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    return app
+
+
+def test_counter_merges_per_thread_shards():
+    hits = counter('test_threaded_total', 'test', ('kind',))
+    threads = [threading.Thread(target=lambda: [hits.inc(kind='a') for _ in range(1000)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    hits.inc(5, kind='b')
+    assert hits.value(kind='a') == 8000
+    assert hits.value(kind='b') == 5
+
+
+def test_histogram_exposition():
+    latency = histogram('test_latency_seconds', 'test', ('route',), buckets=(0.1, 1.0))
+    latency.observe(0.05, route='x')
+    latency.observe(0.5, route='x')
+    latency.observe(3, route='x')
+    text = generate_latest()
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_latency_seconds_bucket{route="x",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{route="x",le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{route="x",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{route="x"} 3' in text
+
+
+def test_other_workers_are_aggregated(tmp_path):
+    jobs = counter('test_jobs_total', 'test')
+    depth = gauge('test_depth', 'test')
+    jobs.inc(2)
+    depth.set(4)
+    write_process_file(str(tmp_path))
+
+    # an exited worker: its counters still count, its gauges don't
+    (tmp_path / 'metrics_999999999.json').write_text(json.dumps({
+        'pid': 999999999,
+        'metrics': {
+            'test_jobs_total': {'type': 'counter', 'doc': 'test', 'labelnames': [],
+                                'samples': [[[], 3]]},
+            'test_depth': {'type': 'gauge', 'doc': 'test', 'labelnames': [], 'mode': 'sum',
+                           'samples': [[[], 10]]}
+        }
+    }))
+    families = collect(str(tmp_path))
+    assert families['test_jobs_total'][2] == [({}, 5)]
+    assert families['test_depth'][2] == [({}, 4)]
+    assert (tmp_path / f'metrics_{os.getpid()}.json').exists()
+
+
+def test_named_lru_reports_hit_ratio(metrics_app):
+    cache = LRUCache(maxsize=4, name='test_lru')
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('missing')
+    body = metrics_app.test_client().get(
+        '/metrics', headers={'Authorization': 'Bearer scrape-token'}).get_data(as_text=True)
+    assert 'cache_hit_ratio{cache="test_lru"} 0.5' in body
+
+
+def test_metrics_endpoint_requires_token_and_times_requests(metrics_app):
+    client = metrics_app.test_client()
+    client.get('/ping')
+    assert client.get('/metrics').status_code == 401
+
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert ('http_request_duration_seconds_count{endpoint="ping",method="GET",status="200"}'
+            in response.get_data(as_text=True))
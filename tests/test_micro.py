@@ -0,0 +1,30 @@
+import random
+
+from bench import micro
+from manager.save_questions import shuffle_choices
+
+
+def test_measure_reports_per_call_stats():
+    stats = micro.measure(lambda: sum(range(10)), rounds=3, min_time=0.001)
+    assert stats['rounds'] == 3 and stats['iterations'] >= 1
+    assert 0 < stats['min'] <= stats['median']
+
+
+def test_compare_flags_only_regressions_past_threshold(tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    micro.save_baseline({'a': {'min': 1.0}, 'b': {'min': 1.0}}, path)
+    baseline = micro.load_baseline(path)
+    current = {'a': {'min': 1.1}, 'b': {'min': 1.5}, 'new': {'min': 9.0}}
+    assert micro.compare(current, baseline, threshold=0.2) == [('b', 1.0, 1.5, 1.5)]
+    assert micro.load_baseline(str(tmp_path / 'missing.json')) is None
+
+
+def test_every_benchmark_runs():
+    for name, setup in micro.BENCHMARKS.items():
+        setup()()
+
+
+def test_shuffle_choices_tracks_correct_letter():
+    choices, letter = shuffle_choices('right', ['a', 'b', 'c'], random.Random(3))
+    assert sorted(choices) == ['a', 'b', 'c', 'right']
+    assert choices['ABCD'.index(letter)] == 'right'
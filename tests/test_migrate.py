@@ -0,0 +1,176 @@
+import os
+
+import pytest
+
+from db import migrate
+from db.migrate import MigrationError
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 1
+        self._result = []
+
+    def execute(self, sql, params=None):
+        self.db.executed.append((self.connection.autocommit, sql, params))
+        if 'FROM schema_migrations' in sql:
+            self._result = self.db.applied
+        elif 'to_regclass' in sql:
+            self._result = [self.db.index_state.get(params[1], ('r', None))]
+        if self.db.fail_on and self.db.fail_on in sql:
+            raise migrate.psycopg2.ProgrammingError(self.db.fail_on)
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.autocommit = False
+
+    def cursor(self):
+        cursor = FakeCursor(self.db)
+        cursor.connection = self
+        return cursor
+
+    def commit(self):
+        self.db.commits += 1
+
+    def rollback(self):
+        self.db.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    def __init__(self, applied=(), fail_on=None):
+        self.applied = list(applied)
+        self.executed = []
+        self.commits = self.rollbacks = 0
+        self.index_state = {}
+        self.fail_on = fail_on
+
+    def connect(self):
+        return FakeConnection(self)
+
+    def statements(self, autocommit=None):
+        return [sql for mode, sql, _ in self.executed if autocommit is None or mode == autocommit]
+
+
+@pytest.fixture
+def migrations_dir(tmp_path):
+    (tmp_path / '001_users.sql').write_text(
+        "-- users; with a comment\n"
+        "CREATE TABLE IF NOT EXISTS users (id SERIAL PRIMARY KEY, name TEXT DEFAULT 'a;b');\n"
+        "CREATE INDEX idx_users_name ON users(name);\n")
+    (tmp_path / '002_user_indexes.sql').write_text(
+        "CREATE INDEX IF NOT EXISTS idx_users_lower ON users(lower(name));\n"
+        "CREATE UNIQUE INDEX idx_users_name_unique ON users(name) WHERE name <> '{}';\n"
+        "CREATE INDEX idx_games_status ON games(status);\n"
+        "UPDATE users SET name = 'x' WHERE name IS NULL;\n")
+    (tmp_path / 'notes.txt').write_text('not a migration')
+    return str(tmp_path)
+
+
+def test_split_statements_respects_quotes_comments_and_dollar_bodies():
+    sql = """
+        -- leading; comment
+        SELECT 'a;b', "odd;name" FROM t; /* block; comment */
+        DO $$ BEGIN PERFORM 1; END $$;
+        CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql;
+        SELECT 'it''s; fine'
+    """
+    assert migrate.split_statements(sql) == [
+        "SELECT 'a;b', \"odd;name\" FROM t",
+        "DO $$ BEGIN PERFORM 1; END $$",
+        "CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql",
+        "SELECT 'it''s; fine'",
+    ]
+
+
+def test_plan_defers_indexes_on_existing_tables_only():
+    with open(os.path.join(migrate.MIGRATIONS_DIR, '008_game_history_indexes.sql')) as f:
+        transactional, indexes = migrate.plan(f.read())
+    assert transactional == []
+    assert [i['name'] for i in indexes] == ['idx_game_participants_user_game', 'idx_games_completed_end']
+    assert indexes[0]['sql'].startswith('CREATE INDEX {mode}IF NOT EXISTS idx_game_participants_user_game')
+
+    # Tables created by the same migration are empty; their indexes stay in the transaction
+    for name in ('009_user_games.sql', '011_partition_game_tables.sql'):
+        with open(os.path.join(migrate.MIGRATIONS_DIR, name)) as f:
+            assert migrate.plan(f.read())[1] == []
+
+
+def test_repo_migrations_are_discovered_in_order():
+    versions = [m['version'] for m in migrate.discover()]
+    assert versions == sorted(versions) and versions[0] == '000'
+    assert all(len(m['checksum']) == 64 for m in migrate.discover())
+
+
+def test_migrate_applies_pending_and_builds_indexes_online(migrations_dir):
+    db = FakeDatabase()
+    report = migrate.migrate(connect=db.connect, directory=migrations_dir, jobs=2, log=lambda line: None)
+
+    assert [entry['version'] for entry in report] == ['001', '002']
+    in_transaction = db.statements(autocommit=False)
+    assert "CREATE INDEX idx_users_name ON users(name)" in in_transaction
+    assert "UPDATE users SET name = 'x' WHERE name IS NULL" in in_transaction
+    online = [sql for sql in db.statements(autocommit=True) if sql.startswith('CREATE')]
+    assert sorted(online) == [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_games_status ON games(status)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_lower ON users(lower(name))",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_users_name_unique ON users(name) WHERE name <> '{}'",
+    ]
+    inserts = [params for _, sql, params in db.executed if 'INSERT INTO schema_migrations' in sql]
+    assert [(p[0], p[3]) for p in inserts] == [('001', False), ('002', True)]
+    assert {i['name'] for i in report[1]['indexes']} == {'idx_users_lower', 'idx_users_name_unique',
+                                                         'idx_games_status'}
+    assert 'idx_users_lower' in migrate.format_report(report)
+
+
+def test_migrate_skips_applied_and_resumes_pending_indexes(migrations_dir):
+    checksums = {m['version']: m['checksum'] for m in migrate.discover(migrations_dir)}
+    db = FakeDatabase(applied=[('001', checksums['001'], False), ('002', checksums['002'], True)])
+    db.index_state['idx_users_lower'] = ('r', False)
+    db.index_state['idx_games_status'] = ('p', None)
+
+    report = migrate.migrate(connect=db.connect, directory=migrations_dir, log=lambda line: None)
+
+    assert [entry['version'] for entry in report] == ['002']
+    assert not any('UPDATE users' in sql or 'INSERT INTO' in sql for sql in db.statements())
+    online = db.statements(autocommit=True)
+    assert 'DROP INDEX CONCURRENTLY IF EXISTS idx_users_lower' in online
+    # Partitioned parents cannot build concurrently
+    assert 'CREATE INDEX IF NOT EXISTS idx_games_status ON games(status)' in online
+
+
+def test_edited_migration_stops_the_run(migrations_dir):
+    db = FakeDatabase(applied=[('001', '0' * 64, False)])
+    with pytest.raises(MigrationError, match='changed after it was applied'):
+        migrate.migrate(connect=db.connect, directory=migrations_dir, log=lambda line: None)
+    assert not any(sql.startswith('CREATE INDEX') for sql in db.statements())
+
+
+def test_failed_statement_rolls_back(migrations_dir):
+    db = FakeDatabase(fail_on='UPDATE users')
+    with pytest.raises(MigrationError, match='002_user_indexes'):
+        migrate.migrate(connect=db.connect, directory=migrations_dir, log=lambda line: None)
+    assert db.rollbacks == 1
+    recorded = [params[0] for _, sql, params in db.executed if 'INSERT INTO schema_migrations' in sql]
+    assert recorded == ['001']
+
+
+def test_status_is_read_only(migrations_dir):
+    db = FakeDatabase(applied=[('001', 'f' * 64, False)])
+    schema = migrate.status(connect=db.connect, directory=migrations_dir)
+    assert schema == {'current': '001', 'latest': '002', 'pending': ['002'], 'changed': ['001'], 'unknown': []}
+    assert all(sql.lstrip().startswith('SELECT') for sql in db.statements())
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pytest
+
+from models.category_model import Category
+from models.game_model import Game
+from models.question_model import Question
+from models.round_model import Round
+from models.user_model import User
+from models.user_stats_model import UserStats
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def test_models_have_no_instance_dict():
+    instances = [
+        Category(name='Science'),
+        Question(1, 'Q?', ['a', 'b'], 'a', 'Science'),
+        Round(game_id=1, round_number=1, question_id=1),
+        Game(game_type_id=1),
+        User('ann', 'ann@example.com', 'hash'),
+        UserStats(user_id=1),
+    ]
+    for instance in instances:
+        assert not hasattr(instance, '__dict__')
+        with pytest.raises(AttributeError):
+            instance.misspelled = 1
+
+
+def test_category_rows_map_in_bulk():
+    categories = Category.from_rows([(1, 'Science', 12), (2, 'History', 0)])
+    assert [(c.id, c.name, c.question_count) for c in categories] == [(1, 'Science', 12), (2, 'History', 0)]
+
+
+def test_user_from_row_keeps_column_order():
+    row = (7, 'ann', 'ann@example.com', 'hash', NOW, None, True, 'admin', 7,
+           None, None, None, None, None, None, None)
+    user = User._create_user_from_row(row)
+    assert (user.id, user.username, user.role, user.is_active) == (7, 'ann', 'admin', True)
+    assert user.profile == {}
+
+    with_profile = User._create_user_from_row(row[:9] + ('Ann', None, None, 'NL', 'UTC', None, NOW))
+    assert with_profile.profile['display_name'] == 'Ann' and with_profile.profile['preferences'] == {}
+
+
+def test_user_stats_from_row_matches_constructor():
+    row = (10, 6, 3, 1, 40, 50, 900, 20, 812.5, 4210.25, 4, 2, 1, 300, 1500, NOW)
+    built = UserStats.from_row(3, row)
+    expected = UserStats(3, *row)
+    assert built.to_dict() == expected.to_dict()
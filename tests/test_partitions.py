@@ -0,0 +1,72 @@
+from datetime import date, datetime
+
+from psycopg2 import sql
+
+from db.partitions import add_months, archive_before, ensure_partitions, month_start, partition_name
+
+
+def _render(query):
+    if isinstance(query, sql.Composed):
+        return ''.join(_render(part) for part in query.seq)
+    if isinstance(query, sql.Identifier):
+        return '.'.join(query.strings)
+    if isinstance(query, sql.SQL):
+        return query.string
+    return query
+
+
+class CatalogCursor:
+    """Answers the pg_inherits / pg_constraint lookups from a dict of partitions"""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+        self._result = []
+
+    def execute(self, query, params=None):
+        text = _render(query)
+        if 'pg_inherits' in text:
+            self._result = [(name,) for name in self.partitions.get(params[0], [])]
+        elif 'pg_constraint' in text:
+            self._result = [(f'{params[0]}_fkey',)] if not params[0].startswith('games_') else []
+        else:
+            self.statements.append((' '.join(text.split()), params))
+
+    def fetchall(self):
+        return self._result
+
+
+def test_month_arithmetic():
+    assert month_start(datetime(2026, 3, 17, 8)) == date(2026, 3, 1)
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name('games', date(2026, 2, 1)) == 'games_2026_02'
+
+
+def test_ensure_creates_only_missing_months_parents_first():
+    cur = CatalogCursor({'games': ['games_2026_01'], 'game_rounds': ['game_rounds_2026_01'],
+                         'round_answers': ['round_answers_2026_01']})
+    created = ensure_partitions(cur, date(2026, 1, 1), date(2026, 2, 1))
+    assert created == ['games_2026_02', 'game_rounds_2026_02', 'round_answers_2026_02']
+    text, params = cur.statements[0]
+    assert text == 'CREATE TABLE IF NOT EXISTS games_2026_02 PARTITION OF games FOR VALUES FROM (%s) TO (%s)'
+    assert params == (date(2026, 2, 1), date(2026, 3, 1))
+
+
+def test_archive_detaches_children_first_and_drops_their_keys():
+    months = ('2025_11', '2025_12', '2026_01')
+    cur = CatalogCursor({table: [f'{table}_{m}' for m in months]
+                         for table in ('games', 'game_rounds', 'round_answers')})
+    archived = archive_before(cur, date(2025, 12, 1))
+    assert archived == ['round_answers_2025_11', 'game_rounds_2025_11', 'games_2025_11']
+    statements = [text for text, _ in cur.statements]
+    assert statements[1:] == [
+        'ALTER TABLE round_answers DETACH PARTITION round_answers_2025_11',
+        'ALTER TABLE public.round_answers_2025_11 DROP CONSTRAINT round_answers_2025_11_fkey',
+        'ALTER TABLE round_answers_2025_11 SET SCHEMA archive',
+        'ALTER TABLE game_rounds DETACH PARTITION game_rounds_2025_11',
+        'ALTER TABLE public.game_rounds_2025_11 DROP CONSTRAINT game_rounds_2025_11_fkey',
+        'ALTER TABLE game_rounds_2025_11 SET SCHEMA archive',
+        'ALTER TABLE games DETACH PARTITION games_2025_11',
+        'ALTER TABLE games_2025_11 SET SCHEMA archive',
+    ]
@@ -0,0 +1,53 @@
+import pytest
+
+from security.passwords import (HashingBusyError, PasswordHasher, hasher,
+                                hash_password, verify_and_update,
+                                verify_password)
+
+FAST_METHOD = 'pbkdf2:sha256:1000'
+
+
+@pytest.fixture(autouse=True)
+def fast_hasher():
+    hasher.configure(method=FAST_METHOD, workers=0)
+    yield
+    hasher.configure(method=FAST_METHOD, workers=0)
+
+
+def test_hash_and_verify_inline():
+    hashed = hash_password('Secret123')
+    assert hashed.startswith(FAST_METHOD + '$')
+    assert verify_password('Secret123', hashed)
+    assert not verify_password('wrong', hashed)
+
+
+def test_verify_and_update_rehashes_outdated_parameters():
+    old_hash = hash_password('Secret123')
+    hasher.configure(method='pbkdf2:sha256:2000', workers=0)
+
+    is_valid, new_hash = verify_and_update('Secret123', old_hash)
+    assert is_valid
+    assert new_hash.startswith('pbkdf2:sha256:2000$')
+
+    assert verify_and_update('Secret123', new_hash) == (True, None)
+    assert verify_and_update('wrong', old_hash) == (False, None)
+
+
+def test_process_pool_hashing():
+    pooled = PasswordHasher(method=FAST_METHOD, workers=1)
+    try:
+        assert pooled.verify('Secret123', pooled.hash('Secret123'))
+        assert pooled._pool()._mp_context.get_start_method() != 'fork'
+    finally:
+        pooled.shutdown()
+
+
+def test_saturated_pool_rejects_quickly():
+    pooled = PasswordHasher(method=FAST_METHOD, workers=1, max_pending=1, timeout=0.01)
+    pooled._slots.acquire()
+    try:
+        with pytest.raises(HashingBusyError):
+            pooled.hash('Secret123')
+    finally:
+        pooled._slots.release()
+        pooled.shutdown()
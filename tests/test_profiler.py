@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from utils.profiler import (ProfilerBusyError, RequestProfiler, StackSampler,
+                            init_profiling, request_profiler)
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sampler_collapses_busy_thread_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,))
+    worker.start()
+    try:
+        sampler = StackSampler(interval=0.002).run(0.2)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert sampler.samples > 10
+    lines = sampler.collapsed().splitlines()
+    assert any('_busy_loop' in line for line in lines)
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0 and ';' in stack
+    assert any('_busy_loop' in row['function'] for row in sampler.top())
+
+
+def test_one_sampling_session_per_process():
+    StackSampler._lock.acquire()
+    try:
+        with pytest.raises(ProfilerBusyError):
+            StackSampler().run(0.01)
+    finally:
+        StackSampler._lock.release()
+
+
+def test_request_profiler_captures_matching_requests_only():
+    app = Flask(__name__)
+    init_profiling(app)
+
+    @app.route('/games/active')
+    def get_active_games():
+        return 'ok'
+
+    @app.route('/health')
+    def health():
+        return 'ok'
+
+    request_profiler.arm(r'get_active_games', count=1)
+    client = app.test_client()
+    client.get('/health')
+    client.get('/games/active')
+    client.get('/games/active')
+
+    assert not request_profiler.armed
+    assert [c['endpoint'] for c in request_profiler.captures] == ['get_active_games']
+    assert 'function calls' in request_profiler.captures[0]['stats']
+    request_profiler.captures.clear()
+
+
+def test_unarmed_profiler_is_inert():
+    profiler = RequestProfiler()
+    assert profiler.start('anything', '/anything') is None
+    profiler.arm('x', count=1, seconds=0)
+    time.sleep(0.001)
+    assert not profiler.armed
@@ -0,0 +1,24 @@
+import inspect
+import re
+
+import pytest
+
+from db.query_loader import load_queries
+from models import category_model, game_model
+
+
+@pytest.mark.parametrize('module', [category_model, game_model])
+def test_models_find_their_queries_in_the_real_files(module):
+    queries = load_queries(module.QUERIES.file_path)
+    used = set(re.findall(r'QUERIES\["(\w+)"\]', inspect.getsource(module)))
+    assert used and used <= set(queries)
+    for key in used:
+        sql = queries[key]
+        assert not re.search(r'\$\d', sql), f"{key} uses asyncpg placeholders"
+        assert not sql.startswith('--') and sql.endswith(';')
+
+
+def test_category_list_can_be_wrapped_for_database_json():
+    from db.query_loader import json_array
+    sql = json_array(category_model.QUERIES["get_all_categories_with_their_question_counts"])
+    assert sql.endswith('ORDER BY c.name) t') and ';' not in sql
@@ -0,0 +1,113 @@
+import json
+
+from sqlalchemy import create_engine, text
+
+from db.instrumentation import (QueryStats, instrument_engine, query_duration,
+                                redact, register_statement, statement_name)
+from db.query_loader import load_queries
+
+
+def _issue(sql):
+    return statement_name(sql)
+
+
+def test_inline_sql_is_named_after_calling_function():
+    assert _issue("SELECT 1 /* inline */") == f"{__name__}._issue"
+
+
+def test_loaded_queries_keep_their_file_key(tmp_path):
+    path = tmp_path / "game_queries.sql"
+    path.write_text("--:get_game\nSELECT * FROM games WHERE id = %s\n")
+    queries = load_queries(str(path))
+    assert statement_name(queries["get_game"]) == "game_queries.get_game"
+
+
+def test_params_are_redacted_but_keep_their_shape():
+    params = ("alice@example.com", 42, None, [b"\x00\x01", "token"])
+    assert redact(params) == ["<str:17>", 42, None, ["<bytes:2>", "<str:5>"]]
+
+
+def test_slow_queries_are_logged_and_reported(tmp_path):
+    stats = QueryStats(slow_ms=100, log_size=2)
+    register_statement("users.find", "SELECT * FROM users WHERE username = %s")
+    stats.record("users.find", "SELECT * FROM users WHERE username = %s", ("bob",), 0.01, 1)
+    stats.record("users.find", "SELECT * FROM users WHERE username = %s", ("bob",), 0.25, 1)
+
+    assert len(stats.slow_queries) == 1
+    entry = stats.slow_queries[0]
+    assert entry["params"] == ["<str:3>"]
+    assert entry["duration_ms"] == 250.0
+
+    written = stats.write_report(str(tmp_path / "report.json"))
+    report = json.loads(open(written).read())
+    row = next(r for r in report["statements"] if r["statement"] == "users.find")
+    assert row["calls"] >= 2
+    assert report["slow_queries"][0]["statement"] == "users.find"
+
+
+def test_sqlalchemy_statements_are_timed():
+    engine = instrument_engine(create_engine("sqlite://"))
+    before = query_duration.value(statement=f"{__name__}.test_sqlalchemy_statements_are_timed")["count"]
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    after = query_duration.value(statement=f"{__name__}.test_sqlalchemy_statements_are_timed")["count"]
+    assert after == before + 1
+
+
+class _ExplainCursor:
+    def __init__(self, log, fail):
+        self.log = log
+        self.fail = fail
+
+    def execute(self, sql, params=None):
+        self.log.append(sql.split(' (')[0])
+        if self.fail and sql.startswith('EXPLAIN'):
+            raise RuntimeError('canceled')
+
+    def fetchall(self):
+        return [('Seq Scan on games',)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _ExplainConnection:
+    autocommit = False
+
+    def __init__(self, fail=False):
+        self.log = []
+        self.fail = fail
+
+    def cursor(self, cursor_factory=None):
+        return _ExplainCursor(self.log, self.fail)
+
+
+def test_only_plain_selects_are_explained():
+    stats = QueryStats(slow_ms=1, explain=True, explain_interval=0)
+    conn = _ExplainConnection()
+    stats.record("games.forfeit", "WITH g AS (UPDATE games SET status = 'x') SELECT 1", (), 0.5, 1, conn)
+    stats.record("games.create", "INSERT INTO games DEFAULT VALUES", (), 0.5, 1, conn)
+    assert conn.log == []
+    assert "plan" not in stats.slow_queries[0]
+
+
+def test_explain_runs_in_a_savepoint_that_is_rolled_back():
+    stats = QueryStats(slow_ms=1, explain=True, explain_interval=0)
+    for fail in (False, True):
+        conn = _ExplainConnection(fail)
+        stats.record("games.find", "SELECT * FROM games", (), 0.5, 1, conn)
+        assert conn.log == ['SAVEPOINT query_stats_explain', 'EXPLAIN',
+                            'ROLLBACK TO SAVEPOINT query_stats_explain',
+                            'RELEASE SAVEPOINT query_stats_explain']
+    assert stats.slow_queries[0]["plan"] == "Seq Scan on games"
+    assert stats.slow_queries[1]["plan"] == "EXPLAIN failed: canceled"
+
+
+def test_call_site_names_are_bounded():
+    from db import instrumentation
+    for i in range(instrumentation._call_site_names.maxsize + 10):
+        _issue(f"SELECT {i}")
+    assert len(instrumentation._call_site_names) == instrumentation._call_site_names.maxsize
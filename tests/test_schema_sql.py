@@ -0,0 +1,171 @@
+"""Statements run against a migrated PostgreSQL database (see the
+``migrated_db`` fixture); skipped when no server is reachable."""
+import itertools
+import json
+
+import pytest
+
+from models.round_model import points_for
+from routes import async_routes
+
+_statement_ids = itertools.count(1)
+
+
+def run_asyncpg(cur, sql, *args):
+    """Run an asyncpg-style ($n) statement through a prepared statement"""
+    name = f"asyncpg_{next(_statement_ids)}"
+    cur.execute(f"PREPARE {name} AS {sql}")
+    try:
+        placeholders = ', '.join(['%s'] * len(args))
+        cur.execute(f"EXECUTE {name} ({placeholders})" if args else f"EXECUTE {name}", args)
+        return cur.fetchall()
+    finally:
+        cur.execute(f"DEALLOCATE {name}")
+
+
+@pytest.fixture
+def game(migrated_db):
+    """An active two-player game with an active, 10 second round; rolled back afterwards"""
+    conn = migrated_db()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO users (username, email, password_hash)
+        VALUES ('alice', 'alice@example.com', 'x'), ('bobby', 'bobby@example.com', 'x')
+        RETURNING id
+    """)
+    alice, bobby = [row[0] for row in cur.fetchall()]
+    cur.execute("INSERT INTO categories (name, slug) VALUES ('Science', 'science') RETURNING id")
+    category_id = cur.fetchone()[0]
+    cur.execute("""
+        INSERT INTO questions (text, category_id, difficulty)
+        VALUES ('Chemical symbol for gold?', %s, 'easy') RETURNING id
+    """, (category_id,))
+    question_id = cur.fetchone()[0]
+    cur.execute("""
+        INSERT INTO question_choices (question_id, choice_text, is_correct, position)
+        VALUES (%s, 'Au', TRUE, 'A'), (%s, 'Ag', FALSE, 'B')
+        RETURNING id
+    """, (question_id, question_id))
+    right, wrong = [row[0] for row in cur.fetchall()]
+    cur.execute("INSERT INTO game_types (name) VALUES ('duel') RETURNING id")
+    cur.execute("INSERT INTO games (game_type_id, status) VALUES (%s, 'active') RETURNING id, created_at",
+                (cur.fetchone()[0],))
+    game_id, created_at = cur.fetchone()
+    cur.execute("INSERT INTO game_keys (id, created_at) VALUES (%s, %s)", (game_id, created_at))
+    cur.execute("INSERT INTO game_participants (game_id, user_id) VALUES (%s, %s), (%s, %s)",
+                (game_id, alice, game_id, bobby))
+    cur.execute("""
+        INSERT INTO game_rounds (game_id, game_created_at, round_number, question_id, status,
+                                 time_limit_seconds, points_possible)
+        VALUES (%s, %s, 1, %s, 'active', 10, 100)
+    """, (game_id, created_at, question_id))
+    try:
+        yield {'conn': conn, 'cur': cur, 'id': game_id, 'alice': alice, 'bobby': bobby,
+               'right': right, 'wrong': wrong}
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def _submit(game, user_id, choice_id, response_time_ms):
+    cur = game['cur']
+    (status, round_id, created_at, question_id, points_possible, time_limit), = \
+        run_asyncpg(cur, async_routes.ANSWER_TARGET_SQL, game['id'])
+    assert status == 'active'
+    (is_correct,), = run_asyncpg(cur, async_routes.CHOICE_IS_CORRECT_SQL, choice_id, question_id)
+    points = points_for(points_possible, time_limit, response_time_ms) if is_correct else 0
+    return run_asyncpg(cur, async_routes.SUBMIT_ANSWER_SQL, round_id, created_at, user_id,
+                       choice_id, response_time_ms, is_correct, points, game['id'])
+
+
+def _score(game, user_id):
+    game['cur'].execute("SELECT score FROM game_participants WHERE game_id = %s AND user_id = %s",
+                        (game['id'], user_id))
+    return game['cur'].fetchone()[0]
+
+
+def test_async_answers_are_scored_like_round_save_answer(game):
+    assert _submit(game, game['alice'], game['right'], 2500) == [(True, 75)]
+    assert _submit(game, game['bobby'], game['wrong'], 1000) == [(False, 0)]
+    assert _score(game, game['alice']) == 75
+    assert _score(game, game['bobby']) == 0
+
+
+class SharedConnection:
+    """One test transaction handed out as every model's connection; commits
+    and closes are ignored so the fixture can roll it all back"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return self.conn.cursor(*args, **kwargs)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def shared_conn(migrated_db, monkeypatch):
+    conn = migrated_db()
+    shared = SharedConnection(conn)
+    for module in ('models.category_model', 'db.streaming'):
+        monkeypatch.setattr(f'{module}.get_connection', lambda: shared)
+    monkeypatch.setattr('models.category_model.invalidate', lambda tag: None)
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def test_category_queries_run_against_the_schema(shared_conn):
+    from models.category_model import Category
+
+    science = Category('Natural Science').save()
+    assert Category.find_by_name('Natural Science').id == science.id
+    assert science.update('Science')
+    assert [(c.id, c.name, c.question_count) for c in Category.all()] == [(science.id, 'Science', 0)]
+    assert json.loads(Category.all_json()) == [{'id': science.id, 'name': 'Science', 'question_count': 0}]
+    assert [row for batch in Category.iter_all(batch_size=10) for row in batch] == [(science.id, 'Science', 0)]
+    assert science.delete()
+
+
+def test_forfeit_satisfies_the_status_checks_and_settles(game, monkeypatch):
+    from models.game_model import Game
+
+    shared = SharedConnection(game['conn'])
+    monkeypatch.setattr('models.game_model.get_connection', lambda: shared)
+    monkeypatch.setattr('models.game_model.bump', lambda *names: None)
+    monkeypatch.setattr('models.game_model.invalidate', lambda tag: None)
+
+    assert Game(game_type_id=1, id=game['id'], status='active').forfeit(game['alice']) == game['bobby']
+    cur = game['cur']
+    cur.execute("SELECT user_id, games_won, games_lost FROM user_stats WHERE user_id = ANY(%s) ORDER BY user_id",
+                ([game['alice'], game['bobby']],))
+    assert cur.fetchall() == [(game['alice'], 0, 1), (game['bobby'], 1, 0)]
+    cur.execute("SELECT game_status FROM user_games WHERE game_id = %s", (game['id'],))
+    assert {row[0] for row in cur.fetchall()} == {'completed'}
+
+
+def test_cleanup_cancels_only_idle_games(game, monkeypatch):
+    from models.game_model import Game
+
+    shared = SharedConnection(game['conn'])
+    monkeypatch.setattr('models.game_model.get_connection', lambda: shared)
+    monkeypatch.setattr('models.game_model.bump', lambda *names: None)
+    cur = game['cur']
+
+    assert Game.cleanup_inactive_games(timeout_minutes=30) == 0
+    cur.execute("UPDATE games SET start_time = start_time - interval '2 hours' WHERE id = %s", (game['id'],))
+    cur.execute("UPDATE game_rounds SET start_time = start_time - interval '2 hours' WHERE game_id = %s",
+                (game['id'],))
+    assert Game.cleanup_inactive_games(timeout_minutes=30) == 1
+    cur.execute("SELECT status FROM games WHERE id = %s", (game['id'],))
+    assert cur.fetchone() == ('cancelled',)
@@ -0,0 +1,62 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from flask import Flask, jsonify
+
+import utils.serialization as serialization
+from utils.serialization import FastJSONProvider, RowShape, json_response
+
+
+def test_native_values_are_encoded_like_the_routes_did():
+    now = datetime(2026, 1, 2, 3, 4, 5, 600)
+    document = json.loads(serialization.dumps({'at': now, 'rate': Decimal('58.33'), 'ids': {1}}))
+    assert document == {'at': now.isoformat(), 'rate': 58.33, 'ids': [1]}
+
+
+def test_stdlib_fallback_produces_the_same_bytes():
+    value = {'name': 'zoë', 'at': datetime(2026, 1, 1), 'n': [1, 2.5, None, True]}
+    fast = serialization.dumps(value)
+    encoder = json.JSONEncoder(default=serialization._default, separators=(',', ':'),
+                               ensure_ascii=False)
+    assert encoder.encode(value).encode('utf-8') == fast
+
+
+def test_row_shape_maps_positions_and_skips_converting_nulls():
+    shape = RowShape('username', ('rate', 2, float), ('score', 1))
+    assert shape.names == ['username', 'rate', 'score']
+    assert shape.rows([('ann', 10, Decimal('1.5')), ('bob', 3, None)]) == [
+        {'username': 'ann', 'rate': 1.5, 'score': 10},
+        {'username': 'bob', 'rate': None, 'score': 3},
+    ]
+
+
+def test_provider_serves_jsonify_and_json_response():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    @app.route('/a')
+    def a():
+        return jsonify({'at': datetime(2026, 1, 1)})
+
+    @app.route('/b')
+    def b():
+        return json_response({'ok': True}, 201)
+
+    client = app.test_client()
+    assert client.get('/a').get_json() == {'at': '2026-01-01T00:00:00'}
+    response = client.get('/b')
+    assert response.status_code == 201 and response.data == b'{"ok":true}'
+
+
+def test_database_json_is_spliced_into_the_envelope():
+    from db.query_loader import json_array
+    from utils.serialization import json_response_with
+
+    assert json_array('SELECT 1 AS n;') == \
+        "SELECT COALESCE(json_agg(row_to_json(t)), '[]')::text FROM (SELECT 1 AS n) t"
+
+    app = Flask(__name__)
+    with app.app_context():
+        response = json_response_with({'status': 'success'}, data='[{"n":1}]')
+    assert json.loads(response.data) == {'status': 'success', 'data': [{'n': 1}]}
@@ -0,0 +1,159 @@
+import pytest
+from flask import Flask, jsonify, session
+
+from utils.lru import LRUCache
+from utils.sessions import (LocalSessionStore, SessionValidator,
+                            TieredSessionInterface)
+
+
+@pytest.fixture
+def active_tokens():
+    return {'good-token'}
+
+
+@pytest.fixture
+def session_app(active_tokens):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    store = LocalSessionStore()
+    validator = SessionValidator(
+        lambda tokens: [t for t in tokens if t in active_tokens],
+        lambda batch_size: []
+    )
+    app.session_interface = TieredSessionInterface(
+        store, validator=validator, validate_interval=0, cleanup_interval=0
+    )
+
+    @app.route('/login/<token>', methods=['POST'])
+    def login(token):
+        session['user_id'] = 1
+        session['session_token'] = token
+        return jsonify({})
+
+    @app.route('/me')
+    def me():
+        return jsonify({'user_id': session.get('user_id')})
+
+    @app.route('/logout', methods=['POST'])
+    def logout():
+        session.clear()
+        return jsonify({})
+
+    app.store = store
+    app.validator = validator
+    return app
+
+
+def test_session_round_trip_uses_compact_json(session_app):
+    client = session_app.test_client()
+    client.post('/login/good-token')
+    assert client.get('/me').get_json() == {'user_id': 1}
+
+    sid = client.get_cookie('session').value
+    payload = session_app.store.get(sid)
+    assert isinstance(payload, str)
+    assert ' ' not in payload
+
+
+def test_shared_store_serves_other_workers(session_app):
+    client = session_app.test_client()
+    client.post('/login/good-token')
+    # A fresh LRU behaves like a different worker process
+    session_app.session_interface.lru.clear()
+    assert client.get('/me').get_json() == {'user_id': 1}
+
+
+def test_logout_discards_both_tiers(session_app):
+    client = session_app.test_client()
+    client.post('/login/good-token')
+    sid = client.get_cookie('session').value
+    client.post('/logout')
+    assert session_app.store.get(sid) is None
+    assert session_app.session_interface.lru.get(sid) is None
+
+
+def test_revoked_tokens_are_dropped_after_batch_validation(session_app, active_tokens):
+    client = session_app.test_client()
+    client.post('/login/good-token')
+    client.get('/me')
+
+    active_tokens.clear()
+    assert session_app.validator.validate_pending() == 1
+    assert client.get('/me').get_json() == {'user_id': None}
+
+
+def test_revocation_evicts_the_cached_session(session_app, active_tokens):
+    client = session_app.test_client()
+    client.post('/login/good-token')
+    sid = client.get_cookie('session').value
+    client.get('/me')
+
+    active_tokens.clear()
+    session_app.validator.validate_pending()
+    assert session_app.session_interface.lru.get(sid) is None
+
+
+class CountingStore(LocalSessionStore):
+    def __init__(self):
+        super().__init__()
+        self.touches = 0
+
+    def touch(self, sid, ttl):
+        self.touches += 1
+        return super().touch(sid, ttl)
+
+
+def test_reads_refresh_the_store_ttl_at_most_once_per_interval(session_app, monkeypatch):
+    store = CountingStore()
+    interface = session_app.session_interface
+    interface.store = store
+    client = session_app.test_client()
+    client.post('/login/good-token')
+    sid = client.get_cookie('session').value
+
+    now = [0.0]
+    monkeypatch.setattr('utils.sessions.time.time', lambda: now[0])
+    store.set(sid, store.get(sid), 10)
+    client.get('/me')
+    client.get('/me')
+    assert store.touches == 0
+
+    # Interval elapsed: the next read extends the stored session
+    now[0] = 8
+    interface._touched.clear()
+    assert client.get('/me').get_json() == {'user_id': 1}
+    assert store.touches == 1
+    now[0] = 8 + interface.session_ttl - 1
+    assert store.get(sid) is not None
+
+
+def test_logout_on_another_worker_ends_cached_sessions(session_app):
+    other = Flask(__name__)
+    other.config['SECRET_KEY'] = 'test'
+    other.session_interface = TieredSessionInterface(session_app.store, validate_interval=0, cleanup_interval=0)
+    other.add_url_rule('/me', view_func=session_app.view_functions['me'])
+
+    client = session_app.test_client()
+    client.post('/login/good-token')
+    sid = client.get_cookie('session').value
+    other_client = other.test_client()
+    other_client.set_cookie('session', sid)
+    assert other_client.get('/me').get_json() == {'user_id': 1}
+
+    client.post('/logout')
+    other.session_interface._touched.clear()
+    assert other_client.get('/me').get_json() == {'user_id': None}
+    assert other.session_interface.lru.get(sid) is None
+
+
+def test_lru_evicts_oldest_and_expires():
+    cache = LRUCache(maxsize=2, ttl=None)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+
+    cache.set('d', 4, ttl=-1)
+    assert cache.get('d') is None
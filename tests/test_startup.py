@@ -0,0 +1,83 @@
+import db.database as database
+import db.query_loader as query_loader
+from bench import startup as startup_report
+from db.query_loader import LazyQueries
+from startup import StartupTimer
+
+
+def test_lazy_queries_read_the_file_on_first_lookup(tmp_path, monkeypatch):
+    path = tmp_path / 'q.sql'
+    path.write_text('--:first\nSELECT 1;\n--:second\nSELECT 2;\n')
+    loads = []
+    real = query_loader.load_queries
+    monkeypatch.setattr(query_loader, 'load_queries', lambda p: loads.append(p) or real(p))
+
+    queries = LazyQueries(str(path))
+    assert loads == []
+    assert queries['first'] == 'SELECT 1;'
+    assert sorted(queries) == ['first', 'second'] and len(queries) == 2
+    assert loads == [str(path)]
+
+
+def test_lazy_queries_resolve_against_the_project_root():
+    queries = LazyQueries('sql/queries/game_queries.sql')
+    assert queries.file_path == f"{query_loader.PROJECT_ROOT}/sql/queries/game_queries.sql"
+
+
+class FakeEngine:
+    def __init__(self, url, **options):
+        self.url = url
+        self.options = options
+        self.pool = object()
+        self.disposed = None
+
+    def dispose(self, close=True):
+        self.disposed = close
+
+
+def test_engine_is_created_on_first_use_and_per_process(monkeypatch):
+    pid = [100]
+    listened = []
+    monkeypatch.setattr(database, '_engine', None)
+    monkeypatch.setattr(database, '_pool_options', None)
+    monkeypatch.setattr(database, 'create_engine', FakeEngine)
+    monkeypatch.setattr(database.event, 'listen', lambda target, name, fn: listened.append(name))
+    monkeypatch.setattr(database, 'instrument_engine', lambda engine: engine)
+    monkeypatch.setattr(database.os, 'getpid', lambda: pid[0])
+
+    first = database.get_engine()
+    assert database.get_engine() is first and database.engine is first
+    assert first.options['creator'] is database._connect and 'pool_size' in first.options
+    assert listened == ['checkin']
+
+    pid[0] = 101  # forked worker
+    second = database.get_engine()
+    assert second is not first
+    assert first.disposed is False
+    assert database.SessionLocal.kw['bind'] is second
+
+
+def test_startup_timer_records_steps_in_order():
+    timer = StartupTimer()
+    with timer.step('config'):
+        pass
+    with timer.step('blueprints'):
+        pass
+    report = timer.to_dict()
+    assert [step['name'] for step in report['steps']] == ['config', 'blueprints']
+    assert report['total_ms'] >= 0
+
+
+def test_importtime_output_is_grouped_by_package():
+    output = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       120 |        120 |     flask.json',
+        'import time:       300 |        420 |   flask',
+        'import time:        50 |         50 |   models.user_model',
+        'import time:        80 |        130 | models',
+        'some warning line',
+    ])
+    modules = startup_report.parse_importtime(output)
+    assert modules[0] == {'module': 'flask.json', 'self_us': 120, 'cumulative_us': 120}
+    assert startup_report.by_package(modules) == [{'package': 'flask', 'self_us': 420},
+                                                  {'package': 'models', 'self_us': 130}]
@@ -0,0 +1,82 @@
+import json
+
+from flask import Flask
+
+import db.streaming as streaming
+from utils.serialization import RowShape, streamed_rows
+
+SHAPE = RowShape('id', 'name', ('rate', 2, float))
+
+
+class NamedCursor:
+    def __init__(self, rows, name):
+        self.rows = list(rows)
+        self.name = name
+        self.fetches = []
+        self.closed = False
+
+    def execute(self, sql, params=None):
+        self.sql = sql
+
+    def fetchmany(self, size):
+        self.fetches.append(size)
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.cursors = []
+        self.closed = False
+
+    def cursor(self, name=None):
+        cursor = NamedCursor(self.rows, name)
+        self.cursors.append(cursor)
+        return cursor
+
+    def close(self):
+        self.closed = True
+
+
+def test_batches_come_from_a_named_cursor_and_release_it(monkeypatch):
+    conn = FakeConnection([(i,) for i in range(5)])
+    monkeypatch.setattr(streaming, 'get_connection', lambda: conn)
+
+    batches = list(streaming.iter_batches("SELECT id FROM t", batch_size=2))
+
+    cursor, = conn.cursors
+    assert cursor.name and cursor.itersize == 2
+    assert batches == [[(0,), (1,)], [(2,), (3,)], [(4,)]]
+    assert cursor.closed and conn.closed
+
+
+def test_closing_the_stream_early_releases_the_connection(monkeypatch):
+    conn = FakeConnection([(i,) for i in range(5)])
+    monkeypatch.setattr(streaming, 'get_connection', lambda: conn)
+
+    batches = streaming.iter_batches("SELECT id FROM t", batch_size=2)
+    next(batches)
+    batches.close()
+    assert conn.cursors[0].closed and conn.closed
+
+
+def test_streamed_json_and_ndjson_decode_to_the_rows():
+    app = Flask(__name__)
+    batches = [[(1, 'ann', 1.5), (2, 'bob', None)], [], [(3, 'cy', 0)]]
+    expected = [{'id': 1, 'name': 'ann', 'rate': 1.5}, {'id': 2, 'name': 'bob', 'rate': None},
+                {'id': 3, 'name': 'cy', 'rate': 0.0}]
+
+    with app.test_request_context():
+        array = streamed_rows(iter(batches), SHAPE)
+        lines = streamed_rows(iter(batches), SHAPE, 'ndjson')
+        wrapped = streamed_rows(iter(batches), SHAPE, envelope={'status': 'success'})
+        empty = streamed_rows(iter([]), SHAPE, envelope={})
+        assert array.is_streamed and lines.mimetype == 'application/x-ndjson'
+        assert json.loads(b''.join(array.response)) == expected
+        assert [json.loads(line) for line in b''.join(lines.response).splitlines()] == expected
+        assert json.loads(b''.join(wrapped.response)) == {'status': 'success', 'data': expected}
+        assert json.loads(b''.join(empty.response)) == {'data': []}
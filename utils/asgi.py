@@ -0,0 +1,197 @@
+import asyncio
+import re
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl
+
+from utils.serialization import dumps, loads
+
+
+class Response:
+    def __init__(self, body=b'', status=200, headers=None):
+        self.body = body
+        self.status = status
+        self.headers = dict(headers or {})
+
+
+def json_response(data, status=200, headers=None):
+    response = Response(dumps(data), status, headers)
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+
+class Request:
+    """The parts of an ASGI HTTP scope the async handlers need"""
+
+    def __init__(self, scope, body=b'', params=None):
+        self.scope = scope
+        self.method = scope['method']
+        self.path = scope['path']
+        self.body = body
+        self.params = params or {}
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1')
+                        for k, v in scope.get('headers', [])}
+        self.args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        self.user_id = None
+
+    @property
+    def cookies(self):
+        cookie = SimpleCookie()
+        cookie.load(self.headers.get('cookie', ''))
+        return {name: morsel.value for name, morsel in cookie.items()}
+
+    @property
+    def if_none_match(self):
+        header = self.headers.get('if-none-match', '')
+        return {tag.strip().removeprefix('W/').strip('"') for tag in header.split(',') if tag.strip()}
+
+    def get_json(self):
+        try:
+            return loads(self.body) if self.body else None
+        except ValueError:
+            return None
+
+
+class Router:
+    """Maps ``(method, path)`` to coroutine handlers.
+
+    Patterns use Flask's ``<int:name>`` syntax so a route here can shadow the
+    blueprint route with the same URL. Handlers receive a Request (with
+    path parameters in ``request.params``) and return a Response. A
+    ``defer(request)`` predicate sends matching requests on to Flask instead.
+    """
+
+    _CONVERTERS = {'int': (r'\d+', int), 'string': (r'[^/]+', str)}
+
+    def __init__(self):
+        self.routes = []
+
+    def route(self, pattern, methods=('GET',), login=False, defer=None):
+        converters = {}
+
+        def replace(match):
+            kind, name = match.group(1) or 'string', match.group(2)
+            regex, converters[name] = self._CONVERTERS[kind]
+            return f"(?P<{name}>{regex})"
+
+        regex = re.compile('^' + re.sub(r'<(?:(\w+):)?(\w+)>', replace, pattern) + '$')
+
+        def decorator(handler):
+            handler.login_required = login
+            handler.defer = defer
+            self.routes.append((regex, frozenset(methods), converters, handler))
+            return handler
+        return decorator
+
+    def match(self, method, path):
+        for regex, methods, converters, handler in self.routes:
+            if method not in methods:
+                continue
+            found = regex.match(path)
+            if found:
+                params = {name: converters[name](value) for name, value in found.groupdict().items()}
+                return handler, params
+        return None, None
+
+
+class AsgiApp:
+    """Serve the router's coroutine handlers and hand every other request to
+    the Flask app through asgiref's WSGI adapter (which runs it on a thread
+    pool), so one process serves both.
+
+    ``startup`` and ``shutdown`` are coroutines run from the ASGI lifespan.
+    """
+
+    def __init__(self, flask_app, router, startup=None, shutdown=None):
+        from asgiref.wsgi import WsgiToAsgi
+        self.flask_app = flask_app
+        self.router = router
+        self.fallback = WsgiToAsgi(flask_app)
+        self.startup = startup
+        self.shutdown = shutdown
+        self.cookie_name = flask_app.config.get('SESSION_COOKIE_NAME', 'session')
+        self.extra_headers = dict(flask_app.config.get('SECURITY_HEADERS', {}))
+        origins = flask_app.config.get('CORS_ORIGINS', '*')
+        self.cors_origins = {origins} if isinstance(origins, str) else set(origins)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return await self.fallback(scope, receive, send)
+
+        handler, params = self.router.match(scope['method'], scope['path'])
+        if handler is None:
+            return await self.fallback(scope, receive, send)
+
+        if handler.defer is not None and handler.defer(Request(scope, params=params)):
+            return await self.fallback(scope, receive, send)
+
+        request = Request(scope, await self._read_body(receive), params)
+        try:
+            response = await self._dispatch(handler, request)
+        except Exception:
+            self.flask_app.logger.error("Unhandled exception in %s", handler.__name__, exc_info=True)
+            response = json_response({
+                'error': 'Internal server error',
+                'message': 'An unexpected error occurred'
+            }, 500)
+        await self._send(send, request, response)
+
+    async def _dispatch(self, handler, request):
+        if handler.login_required:
+            request.user_id = await self.session_user(request)
+            if request.user_id is None:
+                return json_response({'error': 'Authentication required'}, 401)
+        return await handler(request)
+
+    async def session_user(self, request):
+        """user_id of the request's session, read through the Flask app's
+        session store (on a thread: the shared store may be Redis)"""
+        sid = request.cookies.get(self.cookie_name)
+        if not sid:
+            return None
+        data = await asyncio.to_thread(self.flask_app.session_interface.peek, sid)
+        return data.get('user_id') if data else None
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def _send(self, send, request, response):
+        headers = dict(self.extra_headers)
+        headers.update(response.headers)
+        origin = request.headers.get('origin')
+        if origin and ('*' in self.cors_origins or origin in self.cors_origins):
+            headers['Access-Control-Allow-Origin'] = origin
+            headers['Access-Control-Allow-Credentials'] = 'true'
+            headers['Vary'] = 'Origin'
+        headers['Content-Length'] = str(len(response.body))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status,
+            'headers': [(k.lower().encode('latin-1'), str(v).encode('latin-1'))
+                        for k, v in headers.items()]
+        })
+        await send({'type': 'http.response.body', 'body': response.body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    if self.startup is not None:
+                        await self.startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.shutdown is not None:
+                    await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,33 @@
+from functools import wraps
+
+from flask import g, jsonify, session
+
+
+def current_user():
+    """Return the logged-in User, resolved at most once per request"""
+    if 'current_user' not in g:
+        from models.user_model import User
+        user_id = session.get('user_id')
+        g.current_user = User.get_cached(user_id) if user_id else None
+    return g.current_user
+
+
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
+        if not user or user.role != 'admin':
+            return jsonify({'error': 'Admin privileges required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
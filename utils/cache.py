@@ -0,0 +1,150 @@
+import hashlib
+import threading
+from functools import wraps
+
+from flask import Response, current_app, make_response, request
+from flask_caching import Cache
+
+from utils.metrics import counter
+from utils.versions import resource_versions
+
+cache_lookups = counter(
+    'cache_lookups_total',
+    'Cache lookups by cache and result',
+    ('cache', 'result')
+)
+
+
+class CacheManager:
+    """Response cache with per-endpoint TTLs, tag invalidation and request coalescing.
+
+    Storage is delegated to Flask-Caching, so ``CACHE_TYPE`` selects the backend
+    (``SimpleCache`` in-process, ``RedisCache`` shared, ``NullCache`` disabled).
+    Every tag is a resource in ``utils.versions``; cached keys embed the
+    versions of their tags, so bumping a tag makes all dependent entries
+    unreachable at once.
+    """
+
+    def __init__(self, app=None):
+        self.cache = Cache()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_TYPE', 'SimpleCache')
+        app.config.setdefault('CACHE_DEFAULT_TIMEOUT', 300)
+        app.config.setdefault('CACHE_KEY_PREFIX', 'dbback:')
+        app.config.setdefault('CACHE_TIMEOUTS', {})
+        self.cache.init_app(app)
+        resource_versions.init_app(app)
+        app.extensions['cache_manager'] = self
+
+    @staticmethod
+    def tag_stamp(tags):
+        """Return a string identifying the current version of every tag"""
+        epoch, versions = resource_versions.stamp(list(tags))
+        return epoch + ':' + '.'.join(str(v) for v in versions)
+
+    @staticmethod
+    def invalidate(*tags):
+        """Bump tag versions so every entry cached under them is discarded"""
+        resource_versions.bump(*tags)
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def get_or_compute(self, key, compute, timeout):
+        """Return the cached value for key, computing it at most once per process.
+
+        ``compute`` returns a ``(value, cacheable)`` pair. Concurrent misses for
+        the same key wait on a per-key lock instead of each hitting the
+        database; the first caller fills the cache and the rest read its result.
+        """
+        value = self.cache.get(key)
+        if value is not None:
+            cache_lookups.inc(cache='response', result='hit')
+            return value
+
+        lock = self._lock_for(key)
+        with lock:
+            value = self.cache.get(key)
+            if value is not None:
+                cache_lookups.inc(cache='response', result='coalesced')
+                return value
+            cache_lookups.inc(cache='response', result='miss')
+            try:
+                value, cacheable = compute()
+                if cacheable:
+                    self.cache.set(key, value, timeout=timeout)
+                return value
+            finally:
+                with self._locks_guard:
+                    self._locks.pop(key, None)
+
+    @staticmethod
+    def stats():
+        hits = cache_lookups.value(cache='response', result='hit')
+        misses = cache_lookups.value(cache='response', result='miss')
+        coalesced = cache_lookups.value(cache='response', result='coalesced')
+        lookups = hits + misses + coalesced
+        return {
+            'hits': hits,
+            'misses': misses,
+            'coalesced': coalesced,
+            'hit_ratio': round((hits + coalesced) / lookups, 4) if lookups else 0.0
+        }
+
+
+cache_manager = CacheManager()
+
+
+def request_digest():
+    """Stable digest of the request path and its (sorted) query arguments"""
+    args = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    return hashlib.md5(f"{request.path}?{args}".encode('utf-8')).hexdigest()
+
+
+def _request_key(tags):
+    return f"view:{request.endpoint}:{request_digest()}:{cache_manager.tag_stamp(tags)}"
+
+
+def cached(timeout=None, tags=()):
+    """Cache successful JSON responses of a view under the given invalidation tags.
+
+    The TTL can be overridden per endpoint through ``CACHE_TIMEOUTS`` in the
+    config, keyed by endpoint name (e.g. ``'category.list_categories'``).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if 'cache_manager' not in current_app.extensions:
+                return f(*args, **kwargs)
+
+            ttl = current_app.config['CACHE_TIMEOUTS'].get(request.endpoint, timeout)
+            if ttl is None:
+                ttl = current_app.config['CACHE_DEFAULT_TIMEOUT']
+
+            def compute():
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+                    # Errors and streams are not cached; hand the response back untouched
+                    return response, False
+                return (response.get_data(), response.mimetype), True
+
+            result = cache_manager.get_or_compute(_request_key(tags), compute, ttl)
+            if isinstance(result, Response):
+                return result
+            body, mimetype = result
+            return Response(body, mimetype=mimetype)
+        return decorated_function
+    return decorator
+
+
+def invalidate(*tags):
+    cache_manager.invalidate(*tags)
@@ -0,0 +1,63 @@
+import hashlib
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+
+from utils.cache import request_digest
+from utils.metrics import counter
+from utils.versions import resource_versions
+
+conditional_requests = counter(
+    'http_conditional_requests_total',
+    'Conditional GETs answered from version stamps (hit) or by running the view (miss)',
+    ('endpoint', 'result')
+)
+
+
+def _etag_for(resources, ttl, per_user):
+    epoch, versions = resource_versions.stamp(resources)
+    parts = [epoch, request.endpoint, request_digest(), '.'.join(str(v) for v in versions)]
+    if ttl:
+        # Writes made outside the app (imports, cron SQL) cannot bump versions,
+        # so stamps also roll over once per cache TTL
+        parts.append(str(int(time.time() // ttl)))
+    if per_user:
+        parts.append(str(session.get('user_id')))
+    return hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def conditional(resources, ttl=False, per_user=False):
+    """Answer ``If-None-Match`` with 304 when none of the resources changed.
+
+    ``resources`` is a tuple of version names or a callable receiving the view
+    arguments (``lambda game_id: (f"game:{game_id}",)``). The ETag is derived
+    from version counters only, so a matching request never reaches the
+    database or builds a body. ``ttl=True`` rolls the ETag over with the
+    endpoint's ``CACHE_TIMEOUTS`` entry; ``per_user`` scopes it to the
+    session user so private resources can't be probed with a guessed tag.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            names = list(resources(**kwargs) if callable(resources) else resources)
+            lifetime = None
+            if ttl:
+                lifetime = current_app.config.get('CACHE_TIMEOUTS', {}).get(
+                    request.endpoint, current_app.config.get('CACHE_DEFAULT_TIMEOUT', 300))
+            etag = _etag_for(names, lifetime, per_user)
+
+            if etag in request.if_none_match:
+                conditional_requests.inc(endpoint=request.endpoint, result='hit')
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            conditional_requests.inc(endpoint=request.endpoint, result='miss')
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache' if per_user else 'no-cache'
+            return response
+        return decorated_function
+    return decorator
@@ -8,4 +8,11 @@ class ValidationError(Exception):
     """Exception raised for validation errors"""
     def __init__(self, message="Validation error occurred"):
         self.message = message
-        super().__init__(self.message) 
\ No newline at end of file
+        super().__init__(self.message) 
+
+class ArchiveError(Exception):
+    """Exception raised when an archive file does not match the rows it holds,
+    or when an operation would lose what only archived games recorded"""
+    def __init__(self, message="Archive verification failed"):
+        self.message = message
+        super().__init__(self.message)
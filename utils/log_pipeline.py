@@ -0,0 +1,245 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+from flask import g, request
+from pythonjsonlogger import jsonlogger
+
+from utils.metrics import counter
+
+dropped_records = counter(
+    'log_records_dropped_total',
+    'Log records discarded because the logging queue was full'
+)
+
+REDACTED_HEADERS = frozenset({
+    'authorization', 'cookie', 'set-cookie', 'proxy-authorization', 'x-api-key'
+})
+
+
+class LazyHeaders:
+    """Request headers captured by reference and rendered only when a record is written"""
+
+    __slots__ = ('_headers',)
+
+    def __init__(self, headers):
+        self._headers = headers
+
+    def resolve(self):
+        return {
+            name: '[redacted]' if name.lower() in REDACTED_HEADERS else value
+            for name, value in self._headers.items()
+        }
+
+
+class JSONFormatter(jsonlogger.JsonFormatter):
+    """One compact JSON object per line; lazy fields are resolved here, off the request thread"""
+
+    def process_log_record(self, log_record):
+        for key, value in log_record.items():
+            if isinstance(value, LazyHeaders):
+                log_record[key] = value.resolve()
+        return log_record
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records.inc()
+
+
+class BatchingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that buffers formatted records and writes them in one call"""
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, batch_size=256):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, delay=True)
+        self.batch_size = batch_size
+        self._buffer = []
+
+    def emit(self, record):
+        try:
+            self._buffer.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._buffer:
+                data = ''.join(self._buffer)
+                self._buffer.clear()
+                if self.stream is None:
+                    self.stream = self._open()
+                position = self.stream.tell()
+                if self.maxBytes > 0 and position and position + len(data) >= self.maxBytes:
+                    self.doRollover()
+                    # delay=True leaves the new file unopened after a rollover
+                    if self.stream is None:
+                        self.stream = self._open()
+                self.stream.write(data)
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class LogWriter(threading.Thread):
+    """Background thread draining the log queue into the real handlers.
+
+    Handlers are flushed when ``flush_interval`` seconds pass, so disk I/O
+    happens in a few large writes instead of once per record.
+    """
+
+    _STOP = object()
+
+    def __init__(self, log_queue, handlers, flush_interval=1.0):
+        super().__init__(name='log-writer', daemon=True)
+        self.queue = log_queue
+        self.handlers = handlers
+        self.flush_interval = flush_interval
+
+    def run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                record = None
+            if record is self._STOP:
+                break
+            if record is not None:
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        # A failing handler must not kill the only writer thread
+                        try:
+                            handler.handle(record)
+                        except Exception:
+                            handler.handleError(record)
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+        self._flush()
+
+    def _flush(self):
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                handler.handleError(None)
+
+    def stop(self):
+        self.queue.put(self._STOP)
+        self.join()
+        for handler in self.handlers:
+            handler.close()
+
+
+class RequestLogSampler:
+    """Decides which requests get an access-log record.
+
+    Errors and slow requests are always kept; everything else is sampled at
+    ``rate`` so steady traffic costs one random() call per request.
+    """
+
+    def __init__(self, rate=1.0, slow_ms=500):
+        self.rate = rate
+        self.slow_ms = slow_ms
+
+    def should_log(self, status_code, duration_ms):
+        if status_code >= 400 or duration_ms >= self.slow_ms:
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+_pipeline = {}
+
+
+def _start_pipeline(app):
+    if _pipeline.get('pid') == os.getpid():
+        return _pipeline['handler']
+
+    if not os.path.exists('logs'):
+        os.mkdir('logs')
+    file_handler = BatchingFileHandler(
+        app.config.get('LOG_FILE', 'logs/app.log'),
+        maxBytes=app.config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backupCount=app.config.get('LOG_BACKUP_COUNT', 10),
+        batch_size=app.config.get('LOG_BATCH_SIZE', 256)
+    )
+    file_handler.setFormatter(JSONFormatter(
+        '%(asctime)s %(levelname)s %(name)s %(message)s %(pathname)s %(lineno)d'
+    ))
+    file_handler.setLevel(logging.INFO)
+
+    log_queue = queue.Queue(maxsize=app.config.get('LOG_QUEUE_SIZE', 10000))
+    writer = LogWriter(log_queue, [file_handler], app.config.get('LOG_FLUSH_INTERVAL', 1.0))
+    writer.start()
+    atexit.register(writer.stop)
+
+    _pipeline.update(pid=os.getpid(), handler=NonBlockingQueueHandler(log_queue), writer=writer)
+    return _pipeline['handler']
+
+
+def init_logging(app):
+    """Route app and request logs through the queue-backed JSON pipeline"""
+    queue_handler = _start_pipeline(app)
+    level = getattr(logging, app.config.get('LOG_LEVEL', 'INFO'), logging.INFO)
+
+    for logger in (app.logger, logging.getLogger('app.requests')):
+        if queue_handler not in logger.handlers:
+            logger.addHandler(queue_handler)
+        logger.setLevel(level)
+
+    request_logger = logging.getLogger('app.requests')
+    request_logger.propagate = False
+    sampler = RequestLogSampler(
+        rate=app.config.get('REQUEST_LOG_SAMPLE_RATE', 1.0),
+        slow_ms=app.config.get('REQUEST_LOG_SLOW_MS', 500)
+    )
+    capture_headers = app.config.get('REQUEST_LOG_HEADERS', True)
+
+    @app.before_request
+    def start_request_log():
+        g.request_started = time.perf_counter()
+        request.environ.setdefault('REQUEST_ID', request.headers.get('X-Request-ID') or uuid.uuid4().hex)
+
+    @app.after_request
+    def write_request_log(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        duration_ms = (time.perf_counter() - started) * 1000
+        if not sampler.should_log(response.status_code, duration_ms):
+            return response
+        fields = {
+            'request_id': request.environ.get('REQUEST_ID'),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 2),
+            'remote_addr': request.remote_addr,
+            'sample_rate': sampler.rate
+        }
+        if capture_headers:
+            fields['headers'] = LazyHeaders(request.headers)
+        request_logger.info('request', extra=fields)
+        return response
+
+    return app
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import counter
+
+cache_lookups = counter(
+    'cache_lookups_total',
+    'Cache lookups by cache and result',
+    ('cache', 'result')
+)
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with an optional time-to-live per entry.
+
+    Named caches also report their hits and misses to ``cache_lookups_total``.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, name=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] is not None and item[1] < time.monotonic():
+                del self._data[key]
+                item = None
+            if item is None:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+        if self.name:
+            cache_lookups.inc(cache=self.name, result='miss' if item is None else 'hit')
+        return default if item is None else item[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._data)
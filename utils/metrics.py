@@ -0,0 +1,446 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class _ThreadSharded:
+    """Per-thread value storage: writers never contend, readers merge the shards.
+
+    Each thread only ever mutates its own dict, so the hot path takes no lock.
+    Shards of exited threads are folded into ``_retired`` so short-lived
+    request threads don't accumulate.
+    """
+
+    _COMPACT_AFTER = 64
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+                if len(self._shards) > self._COMPACT_AFTER:
+                    self._compact()
+            return values
+
+    def _compact(self):
+        live = []
+        for thread, values in self._shards:
+            if thread.is_alive():
+                live.append((thread, values))
+            else:
+                for key, value in values.copy().items():
+                    self._retired[key] = self._merge(self._retired.get(key), value)
+        self._shards = live
+
+    def _merged(self):
+        with self._lock:
+            self._compact()
+            shards = [values.copy() for _, values in self._shards]
+            merged = dict(self._retired)
+        for values in shards:
+            for key, value in values.items():
+                merged[key] = self._merge(merged.get(key), value)
+        return merged
+
+    @staticmethod
+    def _merge(total, value):
+        return value if total is None else total + value
+
+
+class Counter(_ThreadSharded):
+    """Monotonic counter, optionally split by label values"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        values = self._shard()
+        values[key] = values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        return self._merged().get(key, 0)
+
+    def samples(self):
+        return [(dict(zip(self.labelnames, key)), value) for key, value in self._merged().items()]
+
+
+class Gauge:
+    """Value that can go up and down, optionally split by label values.
+
+    ``multiprocess_mode`` decides how workers are combined: ``sum`` (queue
+    depths, in-flight work), ``max`` (values every worker sees the same),
+    or ``all`` (one series per pid).
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), multiprocess_mode='sum'):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.multiprocess_mode = multiprocess_mode
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _HistogramState(list):
+    """Per-bucket counts (last slot is +Inf) followed by the running sum"""
+
+    def __add__(self, other):
+        return _HistogramState(a + b for a, b in zip(self, other))
+
+
+class Histogram(_ThreadSharded):
+    """Cumulative-bucket histogram of observed values (seconds by convention)"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        values = self._shard()
+        state = values.get(key)
+        if state is None:
+            state = values[key] = _HistogramState([0] * (len(self.buckets) + 1) + [0.0])
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the ``with`` block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        state = self._merged().get(key) or [0] * (len(self.buckets) + 1) + [0.0]
+        return _summary(self.buckets, state)
+
+    def samples(self):
+        return [(dict(zip(self.labelnames, key)), _summary(self.buckets, state))
+                for key, state in self._merged().items()]
+
+
+def _summary(buckets, state):
+    cumulative, running = [], 0
+    for bound, count in zip(tuple(buckets) + (float('inf'),), state[:-1]):
+        running += count
+        cumulative.append((bound, running))
+    return {'buckets': cumulative, 'sum': state[-1], 'count': running}
+
+
+def quantile(summary, q):
+    """Estimate a quantile from a histogram summary by interpolating inside its bucket"""
+    total = summary['count']
+    if not total:
+        return 0.0
+    rank = q * total
+    lower_bound, lower_count = 0.0, 0
+    for bound, count in summary['buckets']:
+        if count >= rank:
+            if bound == float('inf'):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+REGISTRY = {}
+COLLECTORS = []
+_registry_lock = threading.Lock()
+
+
+def _register(cls, name, documentation, labelnames, **kwargs):
+    with _registry_lock:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = REGISTRY[name] = cls(name, documentation, labelnames, **kwargs)
+        return metric
+
+
+def counter(name, documentation, labelnames=()):
+    """Get or create the counter registered under name"""
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=(), multiprocess_mode='sum'):
+    """Get or create the gauge registered under name"""
+    return _register(Gauge, name, documentation, labelnames, multiprocess_mode=multiprocess_mode)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Get or create the histogram registered under name"""
+    return _register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+def register_collector(collect):
+    """Add a scrape-time callback.
+
+    ``collect(families)`` receives the aggregated families and returns more
+    ``(name, type, documentation, [(labels, value), ...])`` tuples. Use it for
+    values that are read on demand (pool sizes, table counts, ratios) rather
+    than counted in the request path.
+    """
+    if collect not in COLLECTORS:
+        COLLECTORS.append(collect)
+    return collect
+
+
+def snapshot():
+    """Current value of every registered metric, keyed by metric name"""
+    return {
+        name: [{'labels': labels, 'value': value} for labels, value in metric.samples()]
+        for name, metric in REGISTRY.items()
+    }
+
+
+# --- multi-process aggregation -------------------------------------------------
+#
+# Each worker periodically dumps its registry to <dir>/metrics_<pid>.json
+# (point the directory at tmpfs, e.g. /dev/shm, and empty it on deploy).
+# Whichever worker serves the scrape merges every file: counters and
+# histograms are summed across all pids, including exited ones, so totals
+# never go backwards; gauges only count live pids.
+
+def _dump():
+    metrics = {}
+    for name, metric in list(REGISTRY.items()):
+        entry = {'type': metric.type, 'doc': metric.documentation,
+                 'labelnames': list(metric.labelnames)}
+        if metric.type == 'histogram':
+            entry['buckets'] = list(metric.buckets)
+            entry['samples'] = [[list(key), list(state)] for key, state in metric._merged().items()]
+        elif metric.type == 'counter':
+            entry['samples'] = [[list(key), value] for key, value in metric._merged().items()]
+        else:
+            entry['mode'] = metric.multiprocess_mode
+            with metric._lock:
+                entry['samples'] = [[list(key), value] for key, value in metric._values.items()]
+        metrics[name] = entry
+    return {'pid': os.getpid(), 'metrics': metrics}
+
+
+def write_process_file(directory):
+    """Atomically publish this process's metrics into the shared directory"""
+    path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(_dump(), f)
+    os.replace(tmp, path)
+    return path
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _load_dumps(directory):
+    dumps = [_dump()]
+    if not directory or not os.path.isdir(directory):
+        return dumps
+    own = os.getpid()
+    for filename in os.listdir(directory):
+        if not (filename.startswith('metrics_') and filename.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if data.get('pid') != own:
+            dumps.append(data)
+    return dumps
+
+
+def collect(directory=None):
+    """Aggregate every process's metrics into {name: (type, doc, samples)}"""
+    merged = {}
+    for dump in _load_dumps(directory):
+        pid = dump['pid']
+        alive = pid == os.getpid() or _pid_alive(pid)
+        for name, entry in dump['metrics'].items():
+            kind = entry['type']
+            if kind == 'gauge' and not alive:
+                continue
+            family = merged.setdefault(name, {
+                'type': kind, 'doc': entry['doc'], 'labelnames': entry['labelnames'],
+                'buckets': entry.get('buckets'), 'mode': entry.get('mode'), 'values': {}
+            })
+            for key, value in entry['samples']:
+                key = tuple(key)
+                if kind == 'gauge' and family['mode'] == 'all':
+                    key = key + (str(pid),)
+                current = family['values'].get(key)
+                if current is None:
+                    family['values'][key] = value
+                elif kind == 'histogram':
+                    family['values'][key] = [a + b for a, b in zip(current, value)]
+                elif kind == 'gauge' and family['mode'] == 'max':
+                    family['values'][key] = max(current, value)
+                else:
+                    family['values'][key] = current + value
+
+    families = {}
+    for name, family in merged.items():
+        labelnames = list(family['labelnames'])
+        if family['type'] == 'gauge' and family['mode'] == 'all':
+            labelnames.append('pid')
+        samples = []
+        for key, value in family['values'].items():
+            labels = dict(zip(labelnames, key))
+            if family['type'] == 'histogram':
+                value = _summary(family['buckets'], value)
+            samples.append((labels, value))
+        families[name] = (family['type'], family['doc'], samples)
+
+    for collect_more in list(COLLECTORS):
+        try:
+            for name, kind, doc, samples in collect_more(families):
+                families[name] = (kind, doc, samples)
+        except Exception:
+            logger.exception('metrics collector %r failed', collect_more)
+    return families
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def generate_latest(directory=None):
+    """Render all metrics in the Prometheus text exposition format (0.0.4)"""
+    lines = []
+    for name, (kind, doc, samples) in sorted(collect(directory).items()):
+        lines.append(f'# HELP {name} {doc}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            if kind == 'histogram':
+                for bound, count in value['buckets']:
+                    bucket_labels = dict(labels, le=_format_value(bound))
+                    lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {count}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value["sum"])}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value["count"]}')
+            else:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsPublisher(threading.Thread):
+    """Writes this worker's metrics file every ``interval`` seconds"""
+
+    def __init__(self, directory, interval=5.0):
+        super().__init__(name='metrics-publisher', daemon=True)
+        self.directory = directory
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.publish()
+
+    def publish(self):
+        try:
+            write_process_file(self.directory)
+        except OSError:
+            logger.exception('could not write metrics file to %s', self.directory)
+
+    def stop(self):
+        self._stop_event.set()
+        self.publish()
+
+
+_publisher = {}
+
+
+def start_publisher(directory, interval=5.0):
+    """Start (once per process) the thread publishing metrics to directory"""
+    if _publisher.get('pid') == os.getpid():
+        return _publisher['thread']
+    os.makedirs(directory, exist_ok=True)
+    thread = MetricsPublisher(directory, interval)
+    thread.start()
+    atexit.register(thread.stop)
+    _publisher.update(pid=os.getpid(), thread=thread)
+    return thread
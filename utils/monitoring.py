@@ -0,0 +1,111 @@
+import hmac
+import logging
+import threading
+import time
+
+from flask import Response, abort, request
+
+from utils.metrics import (CONTENT_TYPE_LATEST, generate_latest, histogram,
+                           register_collector, start_publisher)
+
+logger = logging.getLogger(__name__)
+
+request_latency = histogram(
+    'http_request_duration_seconds',
+    'Request handling time by endpoint, method and status',
+    ('endpoint', 'method', 'status')
+)
+
+
+class GameStateCollector:
+    """Scrape-time gauges read from the database (matchmaking queue, active games).
+
+    Results are cached for ``ttl`` seconds so frequent or parallel scrapes
+    cost at most one pair of COUNT queries per interval.
+    """
+
+    def __init__(self, ttl=10):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._expires_at = 0
+        self._families = []
+
+    def __call__(self, families):
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                self._families = self._read()
+                self._expires_at = time.monotonic() + self.ttl
+            return self._families
+
+    @staticmethod
+    def _read():
+        from models.game_model import Game
+        from models.matchmaking import Matchmaker
+        try:
+            queue_depth = Matchmaker.queue_depth()
+            active_games = Game.count_active()
+        except Exception:
+            logger.warning('could not read game state for metrics', exc_info=True)
+            return []
+        return [
+            ('matchmaking_queue_depth', 'gauge', 'Players waiting for an opponent',
+             [({}, queue_depth)]),
+            ('games_active', 'gauge', 'Games currently in progress', [({}, active_games)])
+        ]
+
+
+game_state = GameStateCollector()
+
+
+def cache_hit_ratio(families):
+    """Derive per-cache hit ratios from the aggregated lookup counters"""
+    _, _, samples = families.get('cache_lookups_total', (None, None, []))
+    totals = {}
+    for labels, value in samples:
+        hits, lookups = totals.get(labels['cache'], (0, 0))
+        if labels['result'] in ('hit', 'coalesced'):
+            hits += value
+        totals[labels['cache']] = (hits, lookups + value)
+    return [('cache_hit_ratio', 'gauge', 'Fraction of cache lookups served from cache', [
+        ({'cache': name}, hits / lookups) for name, (hits, lookups) in sorted(totals.items()) if lookups
+    ])]
+
+
+def init_metrics(app):
+    """Time every request and serve the registry at /metrics"""
+    directory = app.config.get('METRICS_MULTIPROC_DIR')
+    interval = app.config.get('METRICS_PUBLISH_INTERVAL', 5.0)
+    token = app.config.get('METRICS_TOKEN')
+
+    game_state.ttl = app.config.get('METRICS_DB_GAUGE_TTL', 10)
+    register_collector(cache_hit_ratio)
+    register_collector(game_state)
+
+    @app.before_request
+    def start_request_timer():
+        request.environ['metrics.started'] = time.perf_counter()
+        if directory:
+            # Lazily, so each forked worker gets its own publisher
+            start_publisher(directory, interval)
+
+    @app.after_request
+    def observe_request(response):
+        started = request.environ.pop('metrics.started', None)
+        if started is not None:
+            request_latency.observe(
+                time.perf_counter() - started,
+                endpoint=request.endpoint or 'unmatched',
+                method=request.method,
+                status=str(response.status_code)
+            )
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if token:
+            supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+            if not hmac.compare_digest(supplied, token):
+                abort(401)
+        return Response(generate_latest(directory), content_type=CONTENT_TYPE_LATEST)
+
+    return app
@@ -0,0 +1,23 @@
+import base64
+import json
+from datetime import datetime
+
+from utils.exceptions import ValidationError
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Opaque keyset cursor for a ``(timestamp, id)`` sort position"""
+    raw = json.dumps([sort_value.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor; raises ValidationError for anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if not isinstance(row_id, int) or isinstance(row_id, bool):
+            raise ValueError(row_id)
+        return datetime.fromisoformat(sort_value), row_id
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValidationError("Invalid cursor")
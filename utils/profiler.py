@@ -0,0 +1,230 @@
+import cProfile
+import collections
+import io
+import os
+import pstats
+import re
+import sys
+import sysconfig
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import g, request
+
+# Standard-library leaf functions meaning "this thread is parked", not busy
+_STDLIB = sysconfig.get_paths()['stdlib']
+IDLE_FUNCTIONS = frozenset({
+    'wait', 'select', 'poll', 'epoll', 'accept', 'sleep', 'get', 'recv', 'recv_into',
+    'readinto', 'read', '_wait_for_tstate_lock', 'serve_forever', 'handle_request'
+})
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a sampling session is already running in this process"""
+    def __init__(self, message="A profiling session is already running"):
+        self.message = message
+        super().__init__(self.message)
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    for path in sys.path:
+        if path and filename.startswith(path):
+            filename = filename[len(path):].lstrip(os.sep)
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _is_idle(code):
+    return code.co_name in IDLE_FUNCTIONS and code.co_filename.startswith(_STDLIB)
+
+
+class StackSampler:
+    """Statistical profiler: snapshots every thread's stack at a fixed interval.
+
+    The calling thread polls ``sys._current_frames()``, so the profiled code
+    runs unmodified and cost scales with the sample rate, not the request
+    rate. Output is in collapsed-stack format, one ``a;b;c count``
+    line per distinct stack, ready for flamegraph.pl or speedscope.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, interval=0.005, include_idle=False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._labels = {}
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _sample(self, ignore):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id in ignore:
+                continue
+            if not self.include_idle and _is_idle(frame.f_code):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[';'.join(stack)] += 1
+        self.samples += 1
+
+    def run(self, seconds):
+        """Sample for ``seconds`` and return self; one session per process at a time"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError()
+        try:
+            ignore = {threading.get_ident()}
+            deadline = time.monotonic() + seconds
+            next_tick = time.monotonic()
+            while next_tick < deadline:
+                self._sample(ignore)
+                next_tick += self.interval
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # fell behind (GIL contention); skip ahead instead of bursting
+                    next_tick = time.monotonic()
+        finally:
+            self._lock.release()
+        return self
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit=25):
+        """Functions ranked by samples where they were on the stack (inclusive)"""
+        inclusive = collections.Counter()
+        for stack, count in self.stacks.items():
+            for label in set(stack.split(';')):
+                inclusive[label] += count
+        return [{'function': label, 'samples': count} for label, count in inclusive.most_common(limit)]
+
+
+class RequestProfiler:
+    """Attaches cProfile to the next requests whose endpoint or path matches a filter.
+
+    Armed from the admin API with a pattern and a capture budget; once the
+    budget is spent or the window expires, matching costs one attribute check
+    per request. Requests are profiled one at a time.
+    """
+
+    def __init__(self, max_captures=20, sort='cumulative', limit=40):
+        self.captures = collections.deque(maxlen=max_captures)
+        self.sort = sort
+        self.limit = limit
+        self._pattern = None
+        self._remaining = 0
+        self._expires_at = 0
+        self._busy = threading.Lock()
+        self._state = threading.Lock()
+
+    def arm(self, pattern, count=1, seconds=300):
+        with self._state:
+            self._pattern = re.compile(pattern)
+            self._remaining = count
+            self._expires_at = time.monotonic() + seconds
+
+    def disarm(self):
+        with self._state:
+            self._pattern = None
+            self._remaining = 0
+
+    @property
+    def armed(self):
+        return self._pattern is not None and self._remaining > 0 and time.monotonic() < self._expires_at
+
+    def status(self):
+        return {
+            'armed': self.armed,
+            'pattern': self._pattern.pattern if self._pattern is not None else None,
+            'remaining': self._remaining,
+            'captured': len(self.captures)
+        }
+
+    def _claim(self, endpoint, path):
+        with self._state:
+            if not self.armed:
+                return False
+            if not (self._pattern.search(endpoint or '') or self._pattern.search(path)):
+                return False
+            if not self._busy.acquire(blocking=False):
+                return False
+            self._remaining -= 1
+            return True
+
+    def start(self, endpoint, path):
+        if not self.armed or not self._claim(endpoint, path):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another profiler owns the interpreter hook
+            self._busy.release()
+            return None
+        return profile
+
+    def finish(self, profile, endpoint, path, status, duration_ms):
+        try:
+            profile.disable()
+        finally:
+            self._busy.release()
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats(self.sort).print_stats(self.limit)
+        self.captures.append({
+            'endpoint': endpoint,
+            'path': path,
+            'status': status,
+            'duration_ms': round(duration_ms, 2),
+            'at': datetime.now(timezone.utc).isoformat(),
+            'pid': os.getpid(),
+            'stats': out.getvalue()
+        })
+
+
+request_profiler = RequestProfiler()
+
+
+def init_profiling(app):
+    """Hook the per-request cProfile capture into the request cycle"""
+    request_profiler.captures = collections.deque(
+        request_profiler.captures, maxlen=app.config.get('PROFILER_MAX_CAPTURES', 20))
+
+    @app.before_request
+    def start_request_profile():
+        if request_profiler.armed:
+            profile = request_profiler.start(request.endpoint, request.path)
+            if profile is not None:
+                g.request_profile = (profile, time.perf_counter())
+
+    @app.after_request
+    def finish_request_profile(response):
+        captured = g.pop('request_profile', None)
+        if captured is not None:
+            profile, started = captured
+            request_profiler.finish(profile, request.endpoint, request.path,
+                                    response.status_code, (time.perf_counter() - started) * 1000)
+        return response
+
+    @app.teardown_request
+    def abandon_request_profile(exc):
+        # after_request is skipped when an exception propagates
+        captured = g.pop('request_profile', None)
+        if captured is not None:
+            profile, started = captured
+            request_profiler.finish(profile, request.endpoint, request.path,
+                                    500, (time.perf_counter() - started) * 1000)
+
+    return app
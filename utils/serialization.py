@@ -0,0 +1,177 @@
+"""Response JSON encoding.
+
+Uses orjson when it is installed and the stdlib encoder otherwise; both
+produce the same document. Datetimes are written as ISO 8601 (what the routes
+used to build with ``isoformat()``), Decimals as numbers and sets as arrays,
+so models can hand values over as the driver returned them.
+
+``RowShape`` is the per-endpoint field map: it is compiled once into a
+function that turns a cursor row straight into the response object.
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from flask import current_app, stream_with_context
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    BACKEND = 'orjson'
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+    loads = orjson.loads
+else:
+    BACKEND = 'json'
+    _encoder = json.JSONEncoder(default=_default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps(obj) -> bytes:
+        return _encoder.encode(obj).encode('utf-8')
+
+    loads = json.loads
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by ``dumps``, so ``jsonify`` and
+    ``request.get_json`` use the fast encoder too"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def json_response(obj, status: int = 200):
+    """Like ``jsonify(obj), status`` without the round trip through str"""
+    return current_app.response_class(dumps(obj), status=status, mimetype='application/json')
+
+
+def raw_json_response(document: str, status: int = 200):
+    """Serve JSON text produced elsewhere (e.g. by PostgreSQL) as is"""
+    return current_app.response_class(document, status=status, mimetype='application/json')
+
+
+def json_response_with(envelope: dict, status: int = 200, **documents):
+    """``json_response`` for an envelope whose remaining keys are ready JSON
+    text, appended after the encoded ones without being parsed"""
+    body = dumps(envelope)[:-1]
+    parts = [body]
+    for key, document in documents.items():
+        parts.append(b',' if len(parts) > 1 or len(body) > 1 else b'')
+        parts.append(dumps(key) + b':' + (document.encode('utf-8') if isinstance(document, str) else document))
+    parts.append(b'}')
+    return current_app.response_class(b''.join(parts), status=status, mimetype='application/json')
+
+
+class RowShape:
+    """Compiled mapping from cursor rows to JSON objects.
+
+    Fields are names (taken from the row position they are listed at),
+    ``(name, index)`` pairs or ``(name, index, convert)`` triples; ``convert``
+    is skipped for NULLs::
+
+        PLAYER = RowShape('username', 'score', ('win_rate', 4, float))
+        PLAYER.rows(cur.fetchall())  # -> [{'username': ..., ...}, ...]
+    """
+
+    def __init__(self, *fields):
+        self.fields = []
+        namespace = {}
+        items = []
+        for position, field in enumerate(fields):
+            if isinstance(field, str):
+                field = (field, position)
+            name, index, convert = (tuple(field) + (None,))[:3]
+            self.fields.append((name, index, convert))
+            value = f"row[{index}]"
+            if convert is not None:
+                namespace[f"_c{position}"] = convert
+                value = f"(_c{position}({value}) if {value} is not None else None)"
+            items.append(f"{name!r}: {value}")
+        # One dict display per row instead of a loop over the field list
+        self.row = eval(f"lambda row: {{{', '.join(items)}}}", namespace)
+
+    @property
+    def names(self):
+        return [name for name, _, _ in self.fields]
+
+    def rows(self, rows):
+        row = self.row
+        return [row(r) for r in rows]
+
+    def dumps(self, rows) -> bytes:
+        return dumps(self.rows(rows))
+
+
+def iter_json_array(batches, shape: RowShape):
+    """Encode batches of rows as one JSON array, a chunk per batch"""
+    yield b'['
+    separator = b''
+    for batch in batches:
+        if batch:
+            yield separator + shape.dumps(batch)[1:-1]
+            separator = b','
+    yield b']'
+
+
+def iter_ndjson(batches, shape: RowShape):
+    """Encode batches of rows as newline-delimited JSON, a chunk per batch"""
+    row = shape.row
+    for batch in batches:
+        yield b''.join([dumps(row(r)) + b'\n' for r in batch])
+
+
+STREAM_FORMATS = {
+    'json': (iter_json_array, 'application/json'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+}
+
+
+def _enveloped(chunks, envelope, key):
+    head = dumps(envelope)[:-1]
+    yield head + (b',' if len(head) > 1 else b'') + dumps(key) + b':'
+    yield from chunks
+    yield b'}'
+
+
+def streamed_rows(batches, shape: RowShape, format: str = 'json', envelope: dict = None,
+                  key: str = 'data'):
+    """Response that encodes and sends each batch as it is fetched.
+
+    With ``envelope`` a JSON array is sent as ``envelope[key]`` (NDJSON has
+    no envelope). The request context stays open until the last chunk, so
+    the connection or ORM session the batches come from is released after it.
+    """
+    encode, mimetype = STREAM_FORMATS[format]
+    chunks = encode(batches, shape)
+    if envelope is not None and format == 'json':
+        chunks = _enveloped(chunks, envelope, key)
+    return current_app.response_class(stream_with_context(chunks), mimetype=mimetype)
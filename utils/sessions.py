@@ -0,0 +1,308 @@
+import os
+import secrets
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from utils.lru import LRUCache
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class LocalSessionStore:
+    """In-process stand-in for the shared store, for tests and single-worker runs"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None:
+                return None
+            payload, expires_at = item
+            if expires_at < time.time():
+                del self._data[sid]
+                return None
+            return payload
+
+    def set(self, sid, payload, ttl):
+        with self._lock:
+            self._data[sid] = (payload, time.time() + ttl)
+
+    def touch(self, sid, ttl):
+        """Extend a live session's TTL; False if it is gone"""
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None or item[1] < time.time():
+                self._data.pop(sid, None)
+                return False
+            self._data[sid] = (item[0], time.time() + ttl)
+            return True
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+
+class RedisSessionStore:
+    """Shared session store visible to every worker and host"""
+
+    def __init__(self, url, prefix='session:'):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, sid):
+        payload = self._redis.get(self._prefix + sid)
+        return payload.decode('utf-8') if payload is not None else None
+
+    def set(self, sid, payload, ttl):
+        self._redis.set(self._prefix + sid, payload, ex=ttl)
+
+    def touch(self, sid, ttl):
+        return bool(self._redis.expire(self._prefix + sid, ttl))
+
+    def delete(self, sid):
+        self._redis.delete(self._prefix + sid)
+
+
+class SessionValidator:
+    """Checks session tokens against ``user_sessions`` in batches.
+
+    Requests only record the tokens they see; a background pass looks all of
+    them up with one query and marks the ones that were logged out or expired
+    as revoked. A second, slower pass deactivates expired rows.
+    """
+
+    def __init__(self, check_tokens, expire_sessions, revalidate_after=60,
+                 max_revoked=100000):
+        self._check_tokens = check_tokens
+        self._expire_sessions = expire_sessions
+        self.revalidate_after = revalidate_after
+        self._pending = set()
+        self._validated = LRUCache(maxsize=max_revoked, ttl=revalidate_after)
+        self._revoked = LRUCache(maxsize=max_revoked)
+        self._lock = threading.Lock()
+        # Set by the session interface to drop cached sessions on revocation
+        self.on_revoke = None
+
+    def observe(self, token):
+        if token in self._validated:
+            return
+        with self._lock:
+            self._pending.add(token)
+
+    def is_revoked(self, token):
+        return token in self._revoked
+
+    def revoke(self, token):
+        self._revoked.set(token, True)
+        if self.on_revoke is not None:
+            self.on_revoke(token)
+
+    def validate_pending(self):
+        with self._lock:
+            tokens, self._pending = list(self._pending), set()
+        if not tokens:
+            return 0
+        active = set(self._check_tokens(tokens))
+        for token in tokens:
+            if token in active:
+                self._validated.set(token, True)
+            else:
+                self.revoke(token)
+        return len(tokens) - len(active)
+
+    def evict_expired(self, batch_size=1000):
+        tokens = self._expire_sessions(batch_size)
+        for token in tokens:
+            self.revoke(token)
+        return len(tokens)
+
+
+class TieredSessionInterface(SessionInterface):
+    """Server-side sessions with an in-process LRU in front of a shared store.
+
+    Session payloads are Flask's tagged JSON (compact, no pickle). The LRU
+    absorbs repeated reads on the same worker; its short TTL bounds how long a
+    session changed on another worker can be served stale, and revoked
+    tokens are evicted as soon as the validator sees them.
+
+    At most once per ``refresh_interval`` a read also extends the session's
+    TTL in the store, so sessions that are only read stay alive, and finds
+    out if the session was deleted (logged out) on another worker.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, validator=None, lru_size=10000, lru_ttl=30,
+                 validate_interval=5, cleanup_interval=300, session_ttl=86400,
+                 refresh_interval=5):
+        self.store = store
+        self.validator = validator
+        self.lru = LRUCache(maxsize=lru_size, ttl=lru_ttl, name='sessions')
+        self.session_ttl = session_ttl
+        self._touched = LRUCache(maxsize=lru_size, ttl=refresh_interval)
+        self._token_sids = LRUCache(maxsize=lru_size, ttl=lru_ttl)
+        if validator is not None:
+            validator.on_revoke = self._evict_token
+        self.validate_interval = validate_interval
+        self.cleanup_interval = cleanup_interval
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
+
+    def _ensure_workers(self, app):
+        if self.validator is None or self._worker_pid == os.getpid():
+            return
+        with self._worker_lock:
+            if self._worker_pid == os.getpid():
+                return
+            # (Re)started lazily so forked workers get their own threads
+            self._worker_pid = os.getpid()
+            if self.validate_interval:
+                self._start(app, self.validator.validate_pending, self.validate_interval)
+            if self.cleanup_interval:
+                self._start(app, self.validator.evict_expired, self.cleanup_interval)
+
+    @staticmethod
+    def _start(app, task, interval):
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    task()
+                except Exception:
+                    app.logger.warning("Session maintenance task failed", exc_info=True)
+        threading.Thread(target=run, name=f"session-{task.__name__}", daemon=True).start()
+
+    def _cache(self, sid, data):
+        self.lru.set(sid, data)
+        token = data.get('session_token')
+        if token:
+            self._token_sids.set(token, sid)
+
+    def _load(self, sid):
+        data = self.lru.get(sid)
+        if data is None:
+            payload = self.store.get(sid)
+            if payload is None:
+                return None
+            data = self.serializer.loads(payload)
+            self._cache(sid, data)
+        if sid not in self._touched:
+            if not self.store.touch(sid, self.session_ttl):
+                self.lru.pop(sid)
+                return None
+            self._touched.set(sid, True)
+        return data
+
+    def _evict_token(self, token):
+        sid = self._token_sids.pop(token)
+        if sid is not None:
+            self.lru.pop(sid)
+            self._touched.pop(sid)
+
+    def _discard(self, sid):
+        data = self.lru.pop(sid)
+        self._touched.pop(sid)
+        self.store.delete(sid)
+        token = data and data.get('session_token')
+        if token and self.validator is not None:
+            self.validator.revoke(token)
+
+    def peek(self, sid):
+        """Session data for sid, or None if it is missing or was revoked.
+
+        Read-only, for callers outside a Flask request (the ASGI handlers).
+        """
+        data = self._load(sid)
+        if data is None:
+            return None
+        token = data.get('session_token')
+        if token and self.validator is not None:
+            if self.validator.is_revoked(token):
+                self._discard(sid)
+                return None
+            self.validator.observe(token)
+        return data
+
+    def open_session(self, app, request):
+        self._ensure_workers(app)
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.peek(sid)
+            if data is not None:
+                return ServerSideSession(dict(data), sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                self._discard(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        if session.modified:
+            data = dict(session)
+            ttl = int(app.permanent_session_lifetime.total_seconds())
+            self.store.set(session.sid, self.serializer.dumps(data), ttl)
+            self._cache(session.sid, data)
+            self._touched.set(session.sid, True)
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def init_sessions(app):
+    """Install the tiered session backend configured by SESSION_* settings"""
+    url = app.config.get('SESSION_REDIS_URL')
+    store = RedisSessionStore(url) if url else LocalSessionStore()
+
+    validator = None
+    if app.config.get('SESSION_VALIDATE_TOKENS', True):
+        from models.user_model import User
+        validator = SessionValidator(
+            User.active_session_tokens,
+            User.expire_sessions,
+            revalidate_after=app.config.get('SESSION_REVALIDATE_AFTER', 60)
+        )
+
+    app.session_interface = TieredSessionInterface(
+        store,
+        validator=validator,
+        lru_size=app.config.get('SESSION_LRU_SIZE', 10000),
+        lru_ttl=app.config.get('SESSION_LRU_TTL', 30),
+        validate_interval=app.config.get('SESSION_VALIDATE_INTERVAL', 5),
+        cleanup_interval=app.config.get('SESSION_CLEANUP_INTERVAL', 300),
+        session_ttl=int(app.permanent_session_lifetime.total_seconds()),
+        refresh_interval=app.config.get('SESSION_REFRESH_INTERVAL', 5)
+    )
+    return app
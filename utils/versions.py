@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+
+
+class VersionStore:
+    """Per-resource monotonic counters bumped on every write.
+
+    Readers compare versions instead of data: the response cache embeds them
+    in its keys and conditional GETs derive ETags from them, so neither has to
+    query the database to know whether a resource changed. Counters live in
+    Redis when one is configured (shared by every worker), otherwise in this
+    process. The epoch changes whenever the counters are reset (process
+    restart, Redis flush), so old ETags can never match again.
+
+    In-process counters only see this worker's writes, so without a shared
+    store the epoch also rolls over every ``local_ttl`` seconds (on the wall
+    clock, so all workers roll together): another worker's stale stamp is
+    then trusted for at most that long.
+    """
+
+    EPOCH_KEY = 'versions:epoch'
+
+    def __init__(self, local_ttl=5):
+        self._local = {}
+        self._local_ttl = local_ttl
+        self._lock = threading.Lock()
+        self._redis = None
+        self._prefix = 'version:'
+        self._epoch = os.urandom(8).hex()
+
+    def init_app(self, app):
+        self._local_ttl = app.config.get('VERSION_LOCAL_TTL', self._local_ttl)
+        url = app.config.get('VERSION_STORE_URL')
+        if not url and app.config.get('CACHE_TYPE') == 'RedisCache':
+            url = app.config.get('CACHE_REDIS_URL')
+        if url:
+            import redis
+            self._redis = redis.Redis.from_url(url)
+            self._prefix = app.config.get('CACHE_KEY_PREFIX', '') + 'version:'
+        app.extensions['version_store'] = self
+
+    def stamp(self, names):
+        """Return ``(epoch, [version, ...])`` for names in a single round trip"""
+        if self._redis is None:
+            epoch = self._epoch
+            if self._local_ttl:
+                epoch = f"{epoch}.{int(time.time() // self._local_ttl)}"
+            return epoch, [self._local.get(name, 0) for name in names]
+        keys = [self._prefix + self.EPOCH_KEY] + [self._prefix + name for name in names]
+        values = self._redis.mget(keys)
+        if values[0] is None:
+            self._redis.set(keys[0], self._epoch, nx=True)
+            values[0] = self._redis.get(keys[0])
+        return values[0].decode('ascii'), [int(v) if v is not None else 0 for v in values[1:]]
+
+    def bump(self, *names):
+        if self._redis is None:
+            with self._lock:
+                for name in names:
+                    self._local[name] = self._local.get(name, 0) + 1
+            return
+        pipe = self._redis.pipeline(transaction=False)
+        for name in names:
+            pipe.incr(self._prefix + name)
+        pipe.execute()
+
+
+resource_versions = VersionStore()
+
+
+def bump(*names):
+    """Mark resources as changed, e.g. ``bump("categories", f"game:{game_id}")``"""
+    resource_versions.bump(*names)